@@ -1,16 +1,29 @@
 from django.contrib.auth.models import User
 from rest_framework import serializers, exceptions
 
+from utils.serializers import TimedListSerializer, TimedSerializerMixin
 
-class UserSerializer(serializers.ModelSerializer):
+
+class UserSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ['id', 'username', 'email']
 
 
-class UserSerializerForTweet(serializers.ModelSerializer):
+class UserSerializerWithStats(TimedSerializerMixin, serializers.ModelSerializer):
+    followers_count = serializers.IntegerField(source='stats.followers_count', default=0)
+    followings_count = serializers.IntegerField(source='stats.followings_count', default=0)
+
+    class Meta:
+        model = User
+        list_serializer_class = TimedListSerializer
+        fields = ['id', 'username', 'email', 'followers_count', 'followings_count']
+
+
+class UserSerializerForTweet(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = User
+        list_serializer_class = TimedListSerializer
         fields = ('id', 'username')
 
 
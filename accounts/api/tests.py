@@ -1,10 +1,16 @@
+from unittest import mock
+
+from django.core.cache import cache
 from rest_framework.test import APIClient
+from accounts.services import user_prefix_index
+from accounts.tasks import get_rebuild_lock_key, rebuild_user_index_task
 from testing.testcases import TestCase
 
 LOGIN_URL = '/api/accounts/login/'
 LOGOUT_URL = '/api/accounts/logout/'
 SIGNUP_URL = '/api/accounts/signup/'
 LOGIN_STATUS_URL = '/api/accounts/login_status/'
+USER_TYPEAHEAD_URL = '/api/users/typeahead/'
 
 
 class AccountApiTests(TestCase):
@@ -121,3 +127,49 @@ class AccountApiTests(TestCase):
 
 
 
+
+
+class UserTypeaheadApiTests(TestCase):
+
+    def setUp(self):
+        self.linghu = self.create_user('linghu')
+        self.lingling = self.create_user('lingling')
+        self.dongxie = self.create_user('dongxie')
+        self.create_follow_graph([self.linghu, self.dongxie], [self.lingling])
+        self.client = APIClient()
+        self.client.force_authenticate(self.dongxie)
+
+    def test_typeahead(self):
+        response = APIClient().get(USER_TYPEAHEAD_URL, {'q': 'ling'})
+        self.assertEqual(response.status_code, 403)
+        response = self.client.get(USER_TYPEAHEAD_URL)
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.get(USER_TYPEAHEAD_URL, {'q': 'Ling'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [user['username'] for user in response.data['users']],
+            ['lingling', 'linghu'],
+        )
+        response = self.client.get(USER_TYPEAHEAD_URL, {'q': 'ling', 'size': 1})
+        self.assertEqual([user['id'] for user in response.data['users']], [self.lingling.id])
+        # the emails are neither searched nor returned
+        self.assertEqual(set(response.data['users'][0]), {'id', 'username'})
+        response = self.client.get(USER_TYPEAHEAD_URL, {'q': 'dongxie@gmail'})
+        self.assertEqual(response.data['users'], [])
+
+    def test_typeahead_queues_one_rebuild(self):
+        with mock.patch.object(rebuild_user_index_task, 'delay') as delay:
+            for _ in range(3):
+                response = self.client.get(USER_TYPEAHEAD_URL, {'q': 'ling'})
+                # the database is searched while the rebuild is queued
+                self.assertEqual(
+                    [user['username'] for user in response.data['users']],
+                    ['lingling', 'linghu'],
+                )
+        self.assertEqual(delay.call_count, 1)
+        self.assertIsNone(user_prefix_index.built_at)
+
+        rebuild_user_index_task()
+        self.assertIsNotNone(user_prefix_index.built_at)
+        self.assertIsNone(cache.get(get_rebuild_lock_key()))
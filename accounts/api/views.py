@@ -1,13 +1,18 @@
+from django.conf import settings
 from django.contrib.auth.models import User, Group
-from rest_framework import viewsets, permissions
+from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
 from accounts.api.serializers import (
     UserSerializer,
+    UserSerializerForTweet,
+    UserSerializerWithStats,
     LoginSerializer,
     SignUpSerializer
 )
+from accounts.services import UserSearchService, UserService
+from accounts.tasks import queue_user_index_rebuild
 from django.contrib.auth import (
     authenticate as django_authenticate,
     login as django_login,
@@ -19,10 +24,40 @@ class UserViewSet(viewsets.ReadOnlyModelViewSet):
     """
     API endpoint that allows users to be viewed or edited.
     """
-    queryset = User.objects.all().order_by('-date_joined')
-    serializer_class = UserSerializer
+    # stats are joined so that the counters cost no extra query
+    queryset = User.objects.all().select_related('stats').order_by('-date_joined')
+    serializer_class = UserSerializerWithStats
     permission_classes = [permissions.IsAuthenticated]
 
+    @action(methods=['GET'], detail=False)
+    def typeahead(self, request):
+        """
+        users whose username starts with q, most followed first. Only their
+        id and username are returned, the emails are private.
+        - size: number of users, USER_TYPEAHEAD_SIZE by default
+        """
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({
+                'success': False,
+                'message': 'q is required.',
+            }, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            size = int(request.query_params.get('size', settings.USER_TYPEAHEAD_SIZE))
+        except ValueError:
+            size = settings.USER_TYPEAHEAD_SIZE
+        size = min(max(size, 1), settings.USER_TYPEAHEAD_MAX_SIZE)
+
+        if UserSearchService.is_index_stale():
+            queue_user_index_rebuild()
+        user_ids = UserSearchService.search(query, size)
+        users = UserService.get_users_through_cache(user_ids)
+        serializer = UserSerializerForTweet(
+            [users[user_id] for user_id in user_ids if user_id in users],
+            many=True,
+        )
+        return Response({'users': serializer.data})
+
 
 class AccountViewSet(viewsets.ViewSet):
     permission_classes = (AllowAny,)
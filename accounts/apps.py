@@ -3,3 +3,19 @@ from django.apps import AppConfig
 
 class AccountsConfig(AppConfig):
     name = 'accounts'
+
+    def ready(self):
+        from django.contrib.auth.models import User
+        from django.db.models.signals import post_delete, post_save
+        from accounts.listeners import create_user_stats, index_user, unindex_user, user_changed
+        from accounts.services import UserService
+        from utils.loaders import register_fetcher
+
+        post_save.connect(user_changed, sender=User)
+        post_delete.connect(user_changed, sender=User)
+        post_save.connect(create_user_stats, sender=User)
+        # typeahead index of the process
+        post_save.connect(index_user, sender=User)
+        post_delete.connect(unindex_user, sender=User)
+        # users rendered by list serializers are read through the user cache
+        register_fetcher(User, UserService.get_users_through_cache)
@@ -0,0 +1,19 @@
+from accounts.models import UserStats
+from accounts.services import UserSearchService, UserService
+
+
+def user_changed(sender, instance, **kwargs):
+    UserService.invalidate_user(instance.id)
+
+
+def index_user(sender, instance, **kwargs):
+    UserSearchService.index_user(instance)
+
+
+def unindex_user(sender, instance, **kwargs):
+    UserSearchService.unindex_user(instance.id)
+
+
+def create_user_stats(sender, instance, created, **kwargs):
+    if created:
+        UserStats.objects.get_or_create(user_id=instance.id)
@@ -1,3 +1,18 @@
+from django.contrib.auth.models import User
 from django.db import models
 
-# Create your models here.
+
+class UserStats(models.Model):
+    # denormalized counters of a user, maintained with F() expressions
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='stats')
+    followers_count = models.IntegerField(default=0)
+    followings_count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return '{} has {} followers and {} followings'.format(
+            self.user_id,
+            self.followers_count,
+            self.followings_count,
+        )
+
@@ -0,0 +1,201 @@
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db.models import F
+from accounts.models import UserStats
+from friendships.models import Friendship
+from utils.db_routers import read_from_primary
+from utils.lru_cache import LRUCache
+from utils.prefix_index import PrefixIndex
+
+USER_CACHE_KEY = 'user_fields:{user_id}'
+# the fields rendered by the user serializers are the only ones cached,
+# never the password hash
+CACHED_USER_FIELDS = ('id', 'username', 'email')
+
+# first tier: per-process, second tier: the shared cache (memcached)
+local_user_cache = LRUCache(
+    max_size=settings.USER_LOCAL_CACHE_SIZE,
+    timeout=settings.USER_LOCAL_CACHE_TIMEOUT,
+)
+
+# per-process index of the users by username and email, ranked by followers
+user_prefix_index = PrefixIndex(
+    max_candidates=settings.USER_TYPEAHEAD_MAX_CANDIDATES,
+    cache_size=settings.USER_TYPEAHEAD_CACHE_SIZE,
+    cache_timeout=settings.USER_TYPEAHEAD_CACHE_TIMEOUT,
+)
+_index_rebuild_lock = threading.Lock()
+
+
+def to_cached_user(user):
+    return tuple(getattr(user, field) for field in CACHED_USER_FIELDS)
+
+
+def from_cached_user(values):
+    # a new instance on every read, threads never share a cached user
+    return User(**dict(zip(CACHED_USER_FIELDS, values)))
+
+
+class UserService(object):
+
+    @classmethod
+    def get_user_through_cache(cls, user_id):
+        return cls.get_users_through_cache([user_id]).get(user_id)
+
+    @classmethod
+    def get_users_through_cache(cls, user_ids):
+        """
+        returns {user_id: user}, users that do not exist are left out. The
+        users only hold CACHED_USER_FIELDS, they are for rendering and must
+        not be saved.
+        """
+        cached_users = {}
+        missing_ids = []
+        for user_id in set(user_ids):
+            values = local_user_cache.get(user_id)
+            if values is None:
+                missing_ids.append(user_id)
+            else:
+                cached_users[user_id] = values
+        if missing_ids:
+            keys = {USER_CACHE_KEY.format(user_id=user_id): user_id for user_id in missing_ids}
+            for key, values in cache.get_many(keys.keys()).items():
+                cached_users[keys[key]] = values
+                local_user_cache.set(keys[key], values)
+            missing_ids = [user_id for user_id in missing_ids if user_id not in cached_users]
+        if missing_ids:
+            # a lagging replica would put back the users changed meanwhile
+            with read_from_primary():
+                db_users = {
+                    user.id: to_cached_user(user)
+                    for user in User.objects.filter(id__in=missing_ids).only(*CACHED_USER_FIELDS)
+                }
+            cache.set_many({
+                USER_CACHE_KEY.format(user_id=user_id): values
+                for user_id, values in db_users.items()
+            }, settings.USER_CACHE_TIMEOUT)
+            for user_id, values in db_users.items():
+                cached_users[user_id] = values
+                local_user_cache.set(user_id, values)
+        return {
+            user_id: from_cached_user(values)
+            for user_id, values in cached_users.items()
+        }
+
+    @classmethod
+    def invalidate_user(cls, user_id):
+        local_user_cache.delete(user_id)
+        cache.delete(USER_CACHE_KEY.format(user_id=user_id))
+
+
+class UserStatsService(object):
+
+    @classmethod
+    def count_stats(cls, user_id):
+        return {
+            'followers_count': Friendship.objects.filter(to_user_id=user_id).count(),
+            'followings_count': Friendship.objects.filter(from_user_id=user_id).count(),
+        }
+
+    @classmethod
+    def get_stats(cls, user_id):
+        stats, _ = UserStats.objects.get_or_create(
+            user_id=user_id,
+            defaults=cls.count_stats(user_id),
+        )
+        return stats
+
+    @classmethod
+    def incr(cls, user_id, **deltas):
+        """
+        e.g. incr(user_id, followers_count=1), atomic thanks to F().
+        """
+        updated = UserStats.objects.filter(user_id=user_id).update(**{
+            field: F(field) + delta
+            for field, delta in deltas.items()
+        })
+        if not updated:
+            # the counts of a new stats record already include this change
+            cls.get_stats(user_id)
+        if 'followers_count' in deltas:
+            user_prefix_index.incr_score(user_id, deltas['followers_count'])
+
+
+class UserSearchService(object):
+    """
+    typeahead of the users by the prefix of their username, on
+    user_prefix_index. Emails are not indexed, they are private. The index
+    is built in the background when the process starts, kept up to date by
+    the signals of the process and rebuilt every
+    USER_TYPEAHEAD_REBUILD_INTERVAL seconds for the changes made by the
+    other processes. Until it is built, searches query the database.
+    """
+
+    @classmethod
+    def get_keys(cls, username):
+        return [username.lower()] if username else []
+
+    @classmethod
+    def rebuild_index(cls):
+        followers_counts = dict(UserStats.objects.values_list('user_id', 'followers_count'))
+        users = User.objects.values_list('id', 'username').iterator(
+            chunk_size=settings.USER_TYPEAHEAD_REBUILD_BATCH_SIZE,
+        )
+        user_prefix_index.rebuild(
+            (user_id, cls.get_keys(username), followers_counts.get(user_id, 0))
+            for user_id, username in users
+        )
+
+    @classmethod
+    def is_index_stale(cls):
+        built_at = user_prefix_index.built_at
+        return (
+            built_at is None
+            or time.monotonic() - built_at > settings.USER_TYPEAHEAD_REBUILD_INTERVAL
+        )
+
+    @classmethod
+    def rebuild_index_if_stale(cls):
+        # one rebuild at a time per process, the others keep the index they have
+        if not _index_rebuild_lock.acquire(blocking=False):
+            return
+        try:
+            if cls.is_index_stale():
+                cls.rebuild_index()
+        finally:
+            _index_rebuild_lock.release()
+
+    @classmethod
+    def index_user(cls, user):
+        if user_prefix_index.built_at is not None:
+            user_prefix_index.set(user.id, cls.get_keys(user.username))
+
+    @classmethod
+    def unindex_user(cls, user_id):
+        user_prefix_index.remove(user_id)
+
+    @classmethod
+    def search(cls, query, size):
+        """
+        ids of the size users with the most followers among the users whose
+        username starts with query, case insensitive.
+        """
+        query = query.strip().lower()
+        if not query:
+            return []
+        if user_prefix_index.built_at is None:
+            return cls.search_database(query, size)
+        return user_prefix_index.search(query, size)
+
+    @classmethod
+    def search_database(cls, query, size):
+        # same ranking as the index, for the searches made before it is built
+        return list(
+            User.objects.filter(username__istartswith=query)
+            .order_by('-stats__followers_count', 'username')
+            .values_list('id', flat=True)[:size]
+        )
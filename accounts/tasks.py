@@ -0,0 +1,34 @@
+import os
+import socket
+
+from django.conf import settings
+from django.core.cache import cache
+
+from accounts.services import UserSearchService
+from utils.tasks import task
+
+# the index is per process, so is the lock of its rebuild
+REBUILD_LOCK_KEY = 'user_prefix_index:rebuild_lock:{host}:{pid}'
+
+
+def get_rebuild_lock_key():
+    return REBUILD_LOCK_KEY.format(host=socket.gethostname(), pid=os.getpid())
+
+
+def queue_user_index_rebuild():
+    """
+    queues a rebuild of the typeahead index of the process, unless one is
+    queued or running already.
+    """
+    if cache.add(get_rebuild_lock_key(), 1, settings.USER_TYPEAHEAD_REBUILD_INTERVAL):
+        rebuild_user_index_task.delay()
+
+
+@task()
+def rebuild_user_index_task():
+    try:
+        UserSearchService.rebuild_index_if_stale()
+    finally:
+        # a failed rebuild is retried by the next search
+        cache.delete(get_rebuild_lock_key())
+    return 'user index rebuilt.'
@@ -0,0 +1,154 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import override_settings
+from accounts.services import (
+    USER_CACHE_KEY,
+    UserSearchService,
+    UserService,
+    local_user_cache,
+    user_prefix_index,
+)
+from friendships.models import Friendship
+from utils.db_routers import read_from_replica
+from utils.prefix_index import PrefixIndex
+from testing.testcases import TestCase
+
+
+class UserServiceTests(TestCase):
+
+    def setUp(self):
+        self.linghu = self.create_user('linghu')
+        self.dongxie = self.create_user('dongxie')
+
+    def test_get_users_through_cache(self):
+        user_ids = [self.linghu.id, self.dongxie.id, -1]
+        with self.assertNumQueries(1):
+            users = UserService.get_users_through_cache(user_ids)
+        self.assertEqual(users, {self.linghu.id: self.linghu, self.dongxie.id: self.dongxie})
+
+        # both tiers are filled
+        with self.assertNumQueries(0):
+            users = UserService.get_users_through_cache(user_ids[:2])
+        self.assertEqual(users[self.linghu.id].username, 'linghu')
+
+        # falls back to the shared cache when the process cache is cold
+        local_user_cache.clear()
+        with self.assertNumQueries(0):
+            user = UserService.get_user_through_cache(self.dongxie.id)
+        self.assertEqual(user.username, 'dongxie')
+
+    def test_cached_users(self):
+        UserService.get_user_through_cache(self.linghu.id)
+        # no password hash in the caches
+        cached = cache.get(USER_CACHE_KEY.format(user_id=self.linghu.id))
+        self.assertEqual(cached, (self.linghu.id, 'linghu', 'linghu@gmail.com'))
+        self.assertNotIn(self.linghu.password, cached)
+        # every read gets its own instance
+        user = UserService.get_user_through_cache(self.linghu.id)
+        user.username = 'changed'
+        self.assertEqual(UserService.get_user_through_cache(self.linghu.id).username, 'linghu')
+
+    def test_invalidate_on_save_and_delete(self):
+        UserService.get_user_through_cache(self.linghu.id)
+        self.linghu.username = 'linghuchong'
+        self.linghu.save()
+        self.assertIsNone(local_user_cache.get(self.linghu.id))
+        self.assertIsNone(cache.get(USER_CACHE_KEY.format(user_id=self.linghu.id)))
+        user = UserService.get_user_through_cache(self.linghu.id)
+        self.assertEqual(user.username, 'linghuchong')
+
+        user_id = self.linghu.id
+        self.linghu.delete()
+        self.assertIsNone(UserService.get_user_through_cache(user_id))
+
+
+class UserServiceReplicaTests(TestCase):
+    databases = {'default', 'replica'}
+
+    @override_settings(DATABASE_REPLICAS=['replica'])
+    def test_rename_not_undone_by_replica(self):
+        linghu = self.create_user('linghu')
+        # a replica that has not caught up with the rename
+        User.objects.using('replica').create(id=linghu.id, username='linghu')
+        linghu.username = 'linghuchong'
+        linghu.save()
+        with read_from_replica():
+            self.assertEqual(UserService.get_user_through_cache(linghu.id).username, 'linghuchong')
+        self.assertEqual(cache.get(USER_CACHE_KEY.format(user_id=linghu.id))[1], 'linghuchong')
+
+
+class PrefixIndexTests(TestCase):
+
+    def test_search(self):
+        index = PrefixIndex(max_candidates=2, cache_size=10, cache_timeout=60)
+        index.rebuild([
+            (1, ['linghu', 'linghu@gmail.com'], 5),
+            (2, ['lingling', 'll@gmail.com'], 10),
+            (3, ['dongxie', 'dongxie@gmail.com'], 1),
+        ])
+        self.assertEqual(index.search('ling', 10), [2, 1])
+        self.assertEqual(index.search('linghu', 10), [1])
+        self.assertEqual(index.search('l', 1), [2])
+        self.assertEqual(index.search('x', 10), [])
+
+        index.set(3, ['linghai', 'dongxie@gmail.com'])
+        index.incr_score(3, 20)
+        self.assertEqual(index.search('lingh', 10), [3, 1])
+        self.assertEqual(index.search('dongxie', 10), [3])
+        index.remove(1)
+        self.assertEqual(index.search('lingh', 10), [3])
+
+        # the top of the ranges over max_candidates is cached
+        self.assertEqual(index.search('l', 10), [3, 2])
+        index.incr_score(2, 100)
+        self.assertEqual(index.search('l', 10), [3, 2])
+        index.top_cache.clear()
+        self.assertEqual(index.search('l', 10), [2, 3])
+
+
+class UserSearchServiceTests(TestCase):
+
+    def setUp(self):
+        self.linghu = self.create_user('linghu')
+        self.lingling = self.create_user('lingling', email='ll@jiuzhang.com')
+        self.dongxie = self.create_user('dongxie')
+
+    def test_search(self):
+        self.create_follow_graph([self.dongxie], [self.lingling])
+        # until the index is built, the database is searched
+        self.assertIsNone(user_prefix_index.built_at)
+        self.assertEqual(UserSearchService.search('LING', 10), [self.lingling.id, self.linghu.id])
+        self.assertIsNone(user_prefix_index.built_at)
+
+        UserSearchService.rebuild_index()
+        with self.assertNumQueries(0):
+            self.assertEqual(UserSearchService.search('LING', 10), [self.lingling.id, self.linghu.id])
+            self.assertEqual(UserSearchService.search('dongxie', 10), [self.dongxie.id])
+            # emails are not indexed
+            self.assertEqual(UserSearchService.search('ll@', 10), [])
+            self.assertEqual(UserSearchService.search(' ', 10), [])
+
+    def test_kept_up_to_date(self):
+        UserSearchService.rebuild_index()
+        Friendship.objects.create(from_user=self.dongxie, to_user=self.linghu)
+        Friendship.objects.create(from_user=self.lingling, to_user=self.linghu)
+        self.assertEqual(UserSearchService.search('ling', 10), [self.linghu.id, self.lingling.id])
+
+        self.linghu.username = 'linghuchong'
+        self.linghu.save()
+        ouyang = self.create_user('lingouyang')
+        self.assertEqual(
+            UserSearchService.search('ling', 10),
+            [self.linghu.id, self.lingling.id, ouyang.id],
+        )
+        self.linghu.delete()
+        self.assertEqual(UserSearchService.search('ling', 10), [self.lingling.id, ouyang.id])
+
+    def test_rebuild_if_stale(self):
+        UserSearchService.rebuild_index()
+        self.assertFalse(UserSearchService.is_index_stale())
+        with override_settings(USER_TYPEAHEAD_REBUILD_INTERVAL=-1):
+            self.assertTrue(UserSearchService.is_index_stale())
+            built_at = user_prefix_index.built_at
+            UserSearchService.rebuild_index_if_stale()
+            self.assertGreater(user_prefix_index.built_at, built_at)
@@ -0,0 +1,159 @@
+import itertools
+import time
+from contextlib import ExitStack
+
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from testing.factories import create_follow_graph, create_tweets, create_users
+
+SIGNUP_URL = '/api/accounts/signup/'
+FOLLOW_URL = '/api/friendships/{}/follow/'
+TWEET_CREATE_URL = '/api/tweets/'
+NEWSFEED_LIST_URL = '/api/newsfeeds/'
+COMMENT_CREATE_URL = '/api/comments/'
+
+
+def zipf_cum_weights(count, exponent):
+    # the user of rank r is picked with a probability proportional to r^-exponent
+    return list(itertools.accumulate(
+        1 / rank ** exponent for rank in range(1, count + 1)
+    ))
+
+
+def seed(num_users, num_tweets, follows_per_user, exponent, rng):
+    """
+    num_users users following follows_per_user users each, picked with a
+    power law: a few users have most of the followers, and write most of
+    the num_tweets tweets.
+    """
+    users = create_users(num_users, prefix='seeduser')
+    cum_weights = zipf_cum_weights(num_users, exponent)
+    create_follow_graph(
+        (user.id, followee.id)
+        for user in users
+        for followee in rng.choices(users, cum_weights=cum_weights, k=follows_per_user)
+    )
+    create_tweets(rng.choices(users, cum_weights=cum_weights, k=num_tweets))
+    return users, cum_weights
+
+
+def percentile(sorted_values, fraction):
+    # nearest rank
+    index = max(0, int(round(fraction * len(sorted_values))) - 1)
+    return sorted_values[index]
+
+
+class EndpointStats(object):
+
+    def __init__(self):
+        self.latencies = []
+        self.query_counts = []
+        self.errors = 0
+
+    def record(self, latency, query_count, status_code):
+        self.latencies.append(latency)
+        self.query_counts.append(query_count)
+        if status_code >= 400:
+            self.errors += 1
+
+    def to_dict(self):
+        latencies = sorted(self.latencies)
+        total_time = sum(latencies)
+        return {
+            'requests': len(latencies),
+            'errors': self.errors,
+            # requests per second of a single client
+            'throughput': len(latencies) / total_time if total_time else None,
+            'latency_ms': {
+                'mean': total_time / len(latencies) * 1000,
+                'p50': percentile(latencies, 0.5) * 1000,
+                'p90': percentile(latencies, 0.9) * 1000,
+                'p99': percentile(latencies, 0.99) * 1000,
+                'max': latencies[-1] * 1000,
+            },
+            'queries': {
+                'mean': sum(self.query_counts) / len(self.query_counts),
+                'max': max(self.query_counts),
+            },
+        }
+
+
+class FlowRunner(object):
+    """
+    drives signup -> follow -> tweet -> read feed -> comment through the
+    test client, for new users following seeded users, and records the
+    latency and the number of queries of every request by endpoint.
+    """
+
+    def __init__(self, seeded_users, cum_weights, follows_per_flow, rng):
+        self.seeded_users = seeded_users
+        self.cum_weights = cum_weights
+        self.follows_per_flow = follows_per_flow
+        self.rng = rng
+        self.stats = {}
+
+    def request(self, client, endpoint, method, path, data=None):
+        with ExitStack() as stack:
+            contexts = [
+                stack.enter_context(CaptureQueriesContext(connection))
+                for connection in connections.all()
+            ]
+            start = time.perf_counter()
+            response = getattr(client, method)(path, data)
+            latency = time.perf_counter() - start
+        self.stats.setdefault(endpoint, EndpointStats()).record(
+            latency,
+            sum(len(context) for context in contexts),
+            response.status_code,
+        )
+        return response
+
+    def run_flow(self, index):
+        client = APIClient()
+        username = 'flowuser{}'.format(index)
+        self.request(client, 'signup', 'post', SIGNUP_URL, {
+            'username': username,
+            'email': '{}@gmail.com'.format(username),
+            'password': 'generic password',
+        })
+
+        followees = {
+            user.id
+            for user in self.rng.choices(
+                self.seeded_users,
+                cum_weights=self.cum_weights,
+                k=self.follows_per_flow,
+            )
+        }
+        for followee_id in followees:
+            self.request(client, 'follow', 'post', FOLLOW_URL.format(followee_id))
+
+        self.request(client, 'tweet', 'post', TWEET_CREATE_URL, {
+            'content': 'tweet of {}'.format(username),
+        })
+        response = self.request(client, 'read-feed', 'get', NEWSFEED_LIST_URL)
+
+        newsfeeds = response.data.get('newsfeeds') if response.status_code == 200 else None
+        if newsfeeds:
+            tweet_id = self.rng.choice(newsfeeds)['tweet']['id']
+            self.request(client, 'comment', 'post', COMMENT_CREATE_URL, {
+                'tweet_id': tweet_id,
+                'content': 'comment of {}'.format(username),
+            })
+
+    def run(self, num_flows):
+        start = time.perf_counter()
+        for index in range(num_flows):
+            self.run_flow(index)
+        duration = time.perf_counter() - start
+        return {
+            'flows': num_flows,
+            'duration': duration,
+            'flows_per_second': num_flows / duration if duration else None,
+            'endpoints': {
+                endpoint: stats.to_dict()
+                for endpoint, stats in self.stats.items()
+            },
+        }
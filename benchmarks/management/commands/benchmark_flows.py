@@ -0,0 +1,103 @@
+import json
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+from benchmarks.flows import FlowRunner, seed
+from utils.redis_client import RedisClient
+
+# the benchmark runs against test databases and in-process caches, as the
+# unit tests do, and never touches the data of the configured servers.
+# Tasks run in the request, so that fanouts are part of the measurements.
+BENCHMARK_SETTINGS = {
+    'TESTING': True,
+    'CACHES': {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'TIMEOUT': 86400,
+        },
+    },
+    'TASK_BACKEND': 'utils.tasks.EagerTaskBackend',
+    'TASK_RETRY_DELAY': 0,
+    'SQLITE_STORAGE_PATH': ':memory:',
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a power law follower graph in test databases, run the signup, '
+        'follow, tweet, read feed and comment flow through the test client '
+        'and report the throughput, latencies and queries of each endpoint.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--tweets', type=int, default=5000)
+        parser.add_argument('--follows-per-user', type=int, default=20)
+        parser.add_argument(
+            '--exponent',
+            type=float,
+            default=1.0,
+            help='exponent of the power law of the followers',
+        )
+        parser.add_argument('--flows', type=int, default=100)
+        parser.add_argument('--seed', type=int, default=0, help='seed of the random generator')
+        parser.add_argument('--output', help='file to write the JSON results to')
+
+    def handle(self, *args, **options):
+        with override_settings(**BENCHMARK_SETTINGS):
+            runner = DiscoverRunner(verbosity=0, interactive=False)
+            runner.setup_test_environment()
+            old_config = runner.setup_databases()
+            RedisClient.conn = None
+            try:
+                results = self.run_benchmark(options)
+            finally:
+                RedisClient.conn = None
+                runner.teardown_databases(old_config)
+                runner.teardown_test_environment()
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(results, f, indent=2, sort_keys=True)
+        self.stdout.write('{} flows in {:.1f}s, {:.1f} flows/s'.format(
+            results['flows'],
+            results['duration'],
+            results['flows_per_second'],
+        ))
+        for endpoint, stats in results['endpoints'].items():
+            self.stdout.write(
+                '{:<10} {:>5} requests  {:>3} errors  p50 {:7.1f}ms  p99 {:7.1f}ms  '
+                '{:5.1f} queries'.format(
+                    endpoint,
+                    stats['requests'],
+                    stats['errors'],
+                    stats['latency_ms']['p50'],
+                    stats['latency_ms']['p99'],
+                    stats['queries']['mean'],
+                )
+            )
+
+    def run_benchmark(self, options):
+        rng = random.Random(options['seed'])
+        start = time.perf_counter()
+        users, cum_weights = seed(
+            options['users'],
+            options['tweets'],
+            options['follows_per_user'],
+            options['exponent'],
+            rng,
+        )
+        seed_duration = time.perf_counter() - start
+
+        flow_runner = FlowRunner(users, cum_weights, options['follows_per_user'], rng)
+        results = flow_runner.run(options['flows'])
+        results['seed_duration'] = seed_duration
+        results['config'] = {
+            key: options[key]
+            for key in ('users', 'tweets', 'follows_per_user', 'exponent', 'flows', 'seed')
+        }
+        return results
@@ -0,0 +1,102 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from comments.api.serializers import CommentSerializer
+from comments.models import Comment
+from friendships.api.serializers import FollowerSerializer
+from friendships.models import Friendship
+from newsfeeds.api.serializers import NewsFeedSerializer
+from newsfeeds.models import NewsFeed
+from tweets.api.serializers import TweetSerializer
+from tweets.models import Tweet
+from utils.loaders import BatchLoadListSerializer
+from utils.renderers import FastJSONRenderer
+
+
+def build_instances(size):
+    """
+    unsaved instances with their foreign keys attached, as the list views
+    get them from the caches: the benchmark does not touch the database.
+    """
+    now = timezone.now()
+    users = [
+        User(id=i, username='user{}'.format(i), email='user{}@gmail.com'.format(i))
+        for i in range(1, size + 1)
+    ]
+    tweets = [
+        Tweet(
+            id=i,
+            user=user,
+            content='tweet {} of {}, caf\xe9'.format(i, user.username),
+            created_at=now,
+            likes_count=i % 7,
+            comments_count=i % 3,
+        )
+        for i, user in enumerate(users, 1)
+    ]
+    return {
+        TweetSerializer: tweets,
+        NewsFeedSerializer: [
+            NewsFeed(id=i, user=users[0], tweet=tweet, created_at=now)
+            for i, tweet in enumerate(tweets, 1)
+        ],
+        CommentSerializer: [
+            Comment(id=i, user=user, tweet=tweets[0], content='comment', created_at=now)
+            for i, user in enumerate(users, 1)
+        ],
+        FollowerSerializer: [
+            Friendship(id=i, from_user=user, to_user=users[0], created_at=now)
+            for i, user in enumerate(users, 1)
+        ],
+    }
+
+
+def render_regular(serializer_class, instances):
+    serializer = BatchLoadListSerializer(child=serializer_class(), instance=instances)
+    return JSONRenderer().render(serializer.data)
+
+
+def render_fast(serializer_class, instances):
+    serializer = serializer_class(instances, many=True)
+    return FastJSONRenderer().render(serializer.data)
+
+
+def measure(render, serializer_class, instances, repeat):
+    # best of repeat, the least disturbed by the rest of the machine
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        render(serializer_class, instances)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the time to serialize and render a page of the hot list '
+        'endpoints with the regular DRF path and with the fast path.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=100, help='items per page')
+        parser.add_argument('--repeat', type=int, default=50)
+
+    def handle(self, *args, **options):
+        size, repeat = options['size'], options['repeat']
+        for serializer_class, instances in build_instances(size).items():
+            if render_fast(serializer_class, instances) != render_regular(serializer_class, instances):
+                raise CommandError('{} renders different bytes on the fast path'.format(
+                    serializer_class.__name__,
+                ))
+            regular = measure(render_regular, serializer_class, instances, repeat)
+            fast = measure(render_fast, serializer_class, instances, repeat)
+            self.stdout.write('{:<20} regular {:8.3f}ms  fast {:8.3f}ms  x{:.1f}'.format(
+                serializer_class.__name__,
+                regular * 1000,
+                fast * 1000,
+                regular / fast,
+            ))
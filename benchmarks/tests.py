@@ -0,0 +1,33 @@
+import random
+
+from accounts.models import UserStats
+from benchmarks.flows import FlowRunner, seed
+from friendships.models import Friendship
+from newsfeeds.models import NewsFeed
+from testing.testcases import TestCase
+
+
+class FlowBenchmarkTests(TestCase):
+
+    def test_seed(self):
+        users, cum_weights = seed(20, 30, 3, 1.0, random.Random(0))
+        self.assertEqual(len(users), 20)
+        self.assertEqual(len(cum_weights), 20)
+        top_user = users[0]
+        self.assertEqual(
+            UserStats.objects.get(user=top_user).followers_count,
+            Friendship.objects.filter(to_user=top_user).count(),
+        )
+        # the tweets are in the newsfeeds of their authors at least
+        self.assertGreaterEqual(NewsFeed.objects.count(), 30)
+
+    def test_run(self):
+        rng = random.Random(0)
+        users, cum_weights = seed(20, 30, 3, 1.0, rng)
+        results = FlowRunner(users, cum_weights, 3, rng).run(2)
+        self.assertEqual(results['flows'], 2)
+        endpoints = results['endpoints']
+        for endpoint in ('signup', 'follow', 'tweet', 'read-feed', 'comment'):
+            self.assertEqual(endpoints[endpoint]['errors'], 0)
+        self.assertEqual(endpoints['signup']['requests'], 2)
+        self.assertGreater(endpoints['read-feed']['queries']['mean'], 0)
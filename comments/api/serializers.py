@@ -3,19 +3,22 @@ from comments.models import Comment
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 from tweets.models import Tweet
+from utils.serializers import FastListSerializer, TimedSerializerMixin
 
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     user = UserSerializerForComment()
 
     class Meta:
         model = Comment
+        list_serializer_class = FastListSerializer
         fields = (
             'id',
             'tweet_id',
             'user',
             'content',
-            'created_at'
+            'created_at',
+            'likes_count',
         )
 
 
@@ -33,7 +36,7 @@ class CommentSerializerForCreate(serializers.ModelSerializer):
 
     def validate(self, data):
         tweet_id = data['tweet_id']
-        if not Tweet.objects.filter(id=tweet_id).exists():
+        if not Tweet.objects.filter(id=tweet_id, is_deleted=False).exists():
             raise ValidationError({'message': 'tweet does not exist.'})
         # must return validated data
         return data
@@ -120,3 +120,66 @@ class CommentApiTest(TestCase):
 
         response = self.anonymous_client.get(COMMENT_URL, {'tweet_id': self.tweet.id, 'user_id': self.linghu.id})
         self.assertEqual(len(response.data['comments']), 2)
+
+    def test_list_number_of_queries(self):
+        self.create_comment(self.linghu, self.tweet)
+        # tweet_id filter validation + comments + their authors
+        with self.assertNumQueries(3):
+            self.anonymous_client.get(COMMENT_URL, {'tweet_id': self.tweet.id})
+        for i in range(5):
+            user = self.create_user('user{}'.format(i))
+            self.create_comment(user, self.tweet)
+        with self.assertNumQueries(3):
+            response = self.anonymous_client.get(COMMENT_URL, {'tweet_id': self.tweet.id})
+        self.assertEqual(len(response.data['comments']), 6)
+
+    def test_comments_count(self):
+        response = self.linghu_client.post(COMMENT_URL, {'tweet_id': self.tweet.id, 'content': 'first comment'})
+        self.linghu_client.post(COMMENT_URL, {'tweet_id': self.tweet.id, 'content': 'second comment'})
+        self.tweet.refresh_from_db()
+        self.assertEqual(self.tweet.comments_count, 2)
+
+        self.linghu_client.delete('{}{}/'.format(COMMENT_URL, response.data['id']))
+        self.tweet.refresh_from_db()
+        self.assertEqual(self.tweet.comments_count, 1)
+
+    def test_list_conditional_get(self):
+        params = {'tweet_id': self.tweet.id}
+        etag = self.anonymous_client.get(COMMENT_URL, params)['ETag']
+        response = self.anonymous_client.get(COMMENT_URL, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        comment = self.create_comment(self.dongxie, self.tweet)
+        response = self.anonymous_client.get(COMMENT_URL, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+
+        # edits change the response too
+        self.dongxie_client.put('{}{}/'.format(COMMENT_URL, comment.id), {'content': 'edited'})
+        response = self.anonymous_client.get(COMMENT_URL, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['comments'][0]['content'], 'edited')
+
+
+class CommentQueryBudgetTests(TestCase):
+
+    def setUp(self):
+        self.viewer = self.create_user('viewer')
+        self.viewer_client = APIClient()
+        self.viewer_client.force_authenticate(self.viewer)
+        self.tweet = self.create_tweet(self.viewer)
+
+    def test_list(self):
+        def add_comments(count):
+            # a new author for every comment, the worst case
+            authors = self.create_users(count, prefix='author{}_'.format(Comment.objects.count()))
+            Comment.objects.bulk_create([
+                Comment(user=author, tweet=self.tweet, content='comment')
+                for author in authors
+            ])
+
+        def render():
+            response = self.viewer_client.get(COMMENT_URL, {'tweet_id': self.tweet.id, 'size': 100})
+            return response.data['comments']
+
+        self.assertConstantQueries(add_comments, render)
@@ -1,13 +1,18 @@
 from rest_framework import viewsets, status
+from rest_framework.renderers import BrowsableAPIRenderer
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from comments.models import Comment
 from comments.api.serializers import CommentSerializer, CommentSerializerForCreate, CommentSerializerForUpdate
 from comments.api.permissions import IsObjectOwner
+from utils.db_routers import ReplicaReadMixin
 from utils.decorators import required_params
+from utils.http_cache import COMMENTS_SCOPE, conditional_get
+from utils.paginations import AscendingEndlessPagination
+from utils.renderers import FastJSONRenderer
 
 
-class CommentViewSet(viewsets.GenericViewSet):
+class CommentViewSet(ReplicaReadMixin, viewsets.GenericViewSet):
     """
     methods include list, create, update, destroy
     methods do not include retrieve (pull single comment), since it is not a required function.
@@ -17,6 +22,8 @@ class CommentViewSet(viewsets.GenericViewSet):
     queryset = Comment.objects.all()
     # can add other filter set in the future.
     filterset_fields = ('tweet_id',)
+    pagination_class = AscendingEndlessPagination
+    renderer_classes = (FastJSONRenderer, BrowsableAPIRenderer)
 
     def get_permissions(self):
         # return an instance using AllowAny()/IsAuthenticated()
@@ -27,6 +34,9 @@ class CommentViewSet(viewsets.GenericViewSet):
         return [AllowAny()]
 
     @required_params(params=['tweet_id'])
+    @conditional_get(lambda request, *args, **kwargs: [
+        COMMENTS_SCOPE.format(tweet_id=request.query_params['tweet_id']),
+    ])
     def list(self, request, *args, **kwargs):
         """
         GET: query_params
@@ -39,13 +49,14 @@ class CommentViewSet(viewsets.GenericViewSet):
                 'success': False,
             }, status=status.HTTP_400_BAD_REQUEST)
         queryset = self.get_queryset()
-        # use prefetch_related to reduce sql query
-        # comments = self.filter_queryset(queryset).prefetch_related('user').order_by('created_at')
-        comments = self.filter_queryset(queryset).order_by('created_at')
-        serializer = CommentSerializer(comments, many=True)
-        return Response({
-            'comments': serializer.data,
-        }, status=status.HTTP_200_OK)
+        # comment authors are batch loaded by CommentSerializer's list serializer
+        comments = self.paginate_queryset(self.filter_queryset(queryset))
+        serializer = CommentSerializer(
+            comments,
+            context={'request': request},
+            many=True,
+        )
+        return self.paginator.get_paginated_response(serializer.data, 'comments')
 
     def create(self, request, *args, **kwargs):
         data = {
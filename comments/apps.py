@@ -3,3 +3,17 @@ from django.apps import AppConfig
 
 class CommentsConfig(AppConfig):
     name = 'comments'
+
+    def ready(self):
+        from django.db.models.signals import post_delete, post_save
+        from comments.listeners import (
+            bump_comment_versions,
+            decr_comments_count,
+            incr_comments_count,
+        )
+        from comments.models import Comment
+
+        post_save.connect(incr_comments_count, sender=Comment)
+        post_delete.connect(decr_comments_count, sender=Comment)
+        post_save.connect(bump_comment_versions, sender=Comment)
+        post_delete.connect(bump_comment_versions, sender=Comment)
@@ -0,0 +1,33 @@
+from django.db.models import F
+from django.db.models.signals import post_delete
+from tweets.models import Tweet
+from utils.http_cache import COMMENTS_SCOPE, TWEETS_SCOPE, bump_versions
+
+
+def incr_comments_count(sender, instance, created, **kwargs):
+    if not created or instance.tweet_id is None:
+        return
+    Tweet.objects.filter(id=instance.tweet_id).update(
+        comments_count=F('comments_count') + 1,
+    )
+
+
+def decr_comments_count(sender, instance, **kwargs):
+    if instance.tweet_id is None:
+        return
+    Tweet.objects.filter(id=instance.tweet_id).update(
+        comments_count=F('comments_count') - 1,
+    )
+
+
+def bump_comment_versions(sender, instance, created=False, **kwargs):
+    if instance.tweet_id is None:
+        return
+    scopes = [COMMENTS_SCOPE.format(tweet_id=instance.tweet_id)]
+    # comments_count changed, unless the comment was only edited
+    if created or kwargs['signal'] is post_delete:
+        tweet_user_id = Tweet.objects.filter(
+            id=instance.tweet_id,
+        ).values_list('user_id', flat=True).first()
+        scopes.append(TWEETS_SCOPE.format(user_id=tweet_user_id))
+    bump_versions(*scopes)
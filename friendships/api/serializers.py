@@ -3,6 +3,8 @@ from rest_framework.exceptions import ValidationError
 
 from accounts.api.serializers import UserSerializer
 from friendships.models import Friendship
+from friendships.services import FriendshipService
+from utils.serializers import FastListSerializer, TimedSerializerMixin
 
 
 class FriendshipSerializerForCreate(serializers.ModelSerializer):
@@ -29,19 +31,51 @@ class FriendshipSerializerForCreate(serializers.ModelSerializer):
         )
 
 
-class FollowerSerializer(serializers.ModelSerializer):
+class FriendshipUserSerializerMixin(object):
+    """
+    has_followed tells whether the current user follows the listed user.
+    For a list, it is looked up for the whole page at once in prepare_batch.
+    """
+    user_id_field = None
+
+    def prepare_batch(self, friendships):
+        self._has_followed = self.get_following_map([
+            getattr(friendship, self.user_id_field)
+            for friendship in friendships
+        ])
+
+    def get_following_map(self, user_ids):
+        request = self.context.get('request')
+        if request is None or not request.user.is_authenticated:
+            return {}
+        return FriendshipService.is_following(request.user.id, user_ids)
+
+    def get_has_followed(self, obj):
+        user_id = getattr(obj, self.user_id_field)
+        if not hasattr(self, '_has_followed'):
+            return self.get_following_map([user_id]).get(user_id, False)
+        return self._has_followed.get(user_id, False)
+
+
+class FollowerSerializer(FriendshipUserSerializerMixin, TimedSerializerMixin, serializers.ModelSerializer):
     user = UserSerializer(source='from_user')
     created_at = serializers.DateTimeField()
+    has_followed = serializers.SerializerMethodField()
+    user_id_field = 'from_user_id'
 
     class Meta:
         model = Friendship
-        fields = ('user', 'created_at')
+        list_serializer_class = FastListSerializer
+        fields = ('user', 'created_at', 'has_followed')
 
 
-class FollowingSerializer(serializers.ModelSerializer):
+class FollowingSerializer(FriendshipUserSerializerMixin, TimedSerializerMixin, serializers.ModelSerializer):
     user = UserSerializer(source='to_user')
     created_at = serializers.DateTimeField()
+    has_followed = serializers.SerializerMethodField()
+    user_id_field = 'to_user_id'
 
     class Meta:
         model = Friendship
-        fields = ('user', 'created_at')
+        list_serializer_class = FastListSerializer
+        fields = ('user', 'created_at', 'has_followed')
@@ -133,3 +133,98 @@ class FriendshipApiTests(TestCase):
 
 
 
+
+    def test_user_stats(self):
+        self.assertEqual(self.sheldon.stats.followers_count, 2)
+        self.assertEqual(self.sheldon.stats.followings_count, 3)
+
+        self.sheldon_client.post(FOLLOW_URL.format(self.leonard.id))
+        self.sheldon_client.post(FOLLOW_URL.format(self.leonard.id))
+        self.sheldon.stats.refresh_from_db()
+        self.leonard.stats.refresh_from_db()
+        self.assertEqual(self.sheldon.stats.followings_count, 4)
+        self.assertEqual(self.leonard.stats.followers_count, 1)
+
+        self.sheldon_client.post(UNFOLLOW_URL.format(self.leonard.id))
+        self.sheldon.stats.refresh_from_db()
+        self.leonard.stats.refresh_from_db()
+        self.assertEqual(self.sheldon.stats.followings_count, 3)
+        self.assertEqual(self.leonard.stats.followers_count, 0)
+
+    def test_has_followed(self):
+        follower = Friendship.objects.filter(to_user=self.sheldon).first().from_user
+        Friendship.objects.create(from_user=self.leonard, to_user=follower)
+
+        response = self.leonard_client.get(FOLLOWERS_URL.format(self.sheldon.id))
+        has_followed = {
+            item['user']['id']: item['has_followed']
+            for item in response.data['followers']
+        }
+        self.assertEqual(has_followed[follower.id], True)
+        self.assertEqual(list(has_followed.values()).count(True), 1)
+
+        response = self.anonymous_client.get(FOLLOWINGS_URL.format(self.sheldon.id))
+        self.assertEqual(
+            [item['has_followed'] for item in response.data['followings']],
+            [False, False, False],
+        )
+
+    def test_followers_conditional_get(self):
+        url = FOLLOWERS_URL.format(self.sheldon.id)
+        etag = self.leonard_client.get(url)['ETag']
+        response = self.leonard_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        # has_followed of the viewer changed
+        follower = Friendship.objects.filter(to_user=self.sheldon).first().from_user
+        self.leonard_client.post(FOLLOW_URL.format(follower.id))
+        response = self.leonard_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+
+        self.leonard_client.post(FOLLOW_URL.format(self.sheldon.id))
+        response = self.leonard_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['followers']), 3)
+        response = self.leonard_client.get(
+            FOLLOWINGS_URL.format(self.leonard.id),
+            HTTP_IF_NONE_MATCH=etag,
+        )
+        self.assertEqual(response.status_code, 200)
+
+
+class FriendshipQueryBudgetTests(TestCase):
+
+    def setUp(self):
+        self.user = self.create_user('user')
+        self.viewer = self.create_user('viewer')
+        self.viewer_client = APIClient()
+        self.viewer_client.force_authenticate(self.viewer)
+
+    def new_users(self, count):
+        return self.create_users(count, prefix='user{}_'.format(Friendship.objects.count()))
+
+    def test_followers(self):
+        def add_followers(count):
+            followers = self.new_users(count)
+            self.create_follow_graph(followers, [self.user])
+            # has_followed is true for some of them
+            self.create_follow_graph([self.viewer], followers[::2])
+
+        def render():
+            response = self.viewer_client.get(FOLLOWERS_URL.format(self.user.id), {'size': 100})
+            return response.data['followers']
+
+        self.assertConstantQueries(add_followers, render)
+
+    def test_followings(self):
+        def add_followings(count):
+            followings = self.new_users(count)
+            self.create_follow_graph([self.user], followings)
+            self.create_follow_graph([self.viewer], followings[::2])
+
+        def render():
+            response = self.viewer_client.get(FOLLOWINGS_URL.format(self.user.id), {'size': 100})
+            return response.data['followings']
+
+        self.assertConstantQueries(add_followings, render)
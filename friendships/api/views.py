@@ -1,31 +1,61 @@
 from django.shortcuts import render
 from rest_framework.decorators import action
+from rest_framework.renderers import BrowsableAPIRenderer
 from rest_framework.response import Response
 from rest_framework import viewsets, status
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from friendships.api.serializers import FollowerSerializer, FriendshipSerializerForCreate, FollowingSerializer
 from django.contrib.auth.models import User
 from friendships.models import Friendship
+from friendships.services import FriendshipService
+from utils.db_routers import ReplicaReadMixin
+from utils.http_cache import FOLLOWERS_SCOPE, FOLLOWINGS_SCOPE, conditional_get
+from utils.paginations import EndlessPagination
+from utils.renderers import FastJSONRenderer
 
 
-class FriendshipViewSet(viewsets.GenericViewSet):
+def viewer_scopes(request):
+    # has_followed depends on whom the viewer follows
+    if request.user.is_anonymous:
+        return []
+    return [FOLLOWINGS_SCOPE.format(user_id=request.user.id)]
+
+
+class FriendshipViewSet(ReplicaReadMixin, viewsets.GenericViewSet):
     queryset = User.objects.all()
+    replica_actions = ('followers', 'followings')
+    pagination_class = EndlessPagination
+    renderer_classes = (FastJSONRenderer, BrowsableAPIRenderer)
 
     @action(methods=['GET'], detail=True, permission_classes=[AllowAny])
+    @conditional_get(lambda request, pk: viewer_scopes(request) + [
+        FOLLOWERS_SCOPE.format(user_id=pk),
+    ])
     def followers(self, request, pk):
-        friendships = Friendship.objects.filter(to_user_id=pk).order_by('-created_at')
-        serializer = FollowerSerializer(friendships, many=True)
-        return Response({'followers': serializer.data}, status=status.HTTP_200_OK,)
+        friendships = self.paginate_queryset(Friendship.objects.filter(to_user_id=pk))
+        serializer = FollowerSerializer(
+            friendships,
+            context={'request': request},
+            many=True,
+        )
+        return self.paginator.get_paginated_response(serializer.data, 'followers')
 
     @action(methods=['GET'], detail=True, permission_classes=[AllowAny])
+    @conditional_get(lambda request, pk: viewer_scopes(request) + [
+        FOLLOWINGS_SCOPE.format(user_id=pk),
+    ])
     def followings(self, request, pk):
-        friendships = Friendship.objects.filter(from_user_id=pk).order_by('-created_at')
-        serializer = FollowingSerializer(friendships, many=True)
-        return Response({'followings': serializer.data}, status=status.HTTP_200_OK, )
+        friendships = self.paginate_queryset(Friendship.objects.filter(from_user_id=pk))
+        serializer = FollowingSerializer(
+            friendships,
+            context={'request': request},
+            many=True,
+        )
+        return self.paginator.get_paginated_response(serializer.data, 'followings')
 
     @action(methods=['POST'], detail=True, permission_classes=[IsAuthenticated])
     def follow(self, request, pk):
-        if Friendship.objects.filter(from_user=request.user, to_user=pk).exists():
+        if FriendshipService.has_followed(request.user.id, int(pk)):
             return Response({
                 'success': True,
                 'duplicate': True,
@@ -3,3 +3,28 @@ from django.apps import AppConfig
 
 class FriendshipsConfig(AppConfig):
     name = 'friendships'
+
+    def ready(self):
+        from django.db.models.signals import post_delete, post_save
+        from friendships.listeners import (
+            bump_friendship_versions,
+            add_following_to_cache,
+            decr_friendship_counts,
+            delete_stored_friendship,
+            incr_friendship_counts,
+            remove_following_from_cache,
+            store_friendship,
+        )
+        from friendships.models import Friendship
+
+        post_save.connect(incr_friendship_counts, sender=Friendship)
+        post_delete.connect(decr_friendship_counts, sender=Friendship)
+        # write-through of the following sets cached in redis
+        post_save.connect(add_following_to_cache, sender=Friendship)
+        post_delete.connect(remove_following_from_cache, sender=Friendship)
+        # followers / followings tables kept in a storage other than the ORM
+        post_save.connect(store_friendship, sender=Friendship)
+        post_delete.connect(delete_stored_friendship, sender=Friendship)
+        # ETags of the followers / followings endpoints
+        post_save.connect(bump_friendship_versions, sender=Friendship)
+        post_delete.connect(bump_friendship_versions, sender=Friendship)
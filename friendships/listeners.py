@@ -0,0 +1,58 @@
+from accounts.services import UserStatsService
+from friendships.services import FriendshipService
+from friendships.storages import FOLLOWER_TABLE, FOLLOWING_TABLE
+from utils.http_cache import FOLLOWERS_SCOPE, FOLLOWINGS_SCOPE, bump_versions
+from utils.tasks import on_commit
+
+
+def incr_friendship_counts(sender, instance, created, **kwargs):
+    if not created:
+        return
+    if instance.from_user_id is not None:
+        UserStatsService.incr(instance.from_user_id, followings_count=1)
+    if instance.to_user_id is not None:
+        UserStatsService.incr(instance.to_user_id, followers_count=1)
+
+
+def decr_friendship_counts(sender, instance, **kwargs):
+    if instance.from_user_id is not None:
+        UserStatsService.incr(instance.from_user_id, followings_count=-1)
+    if instance.to_user_id is not None:
+        UserStatsService.incr(instance.to_user_id, followers_count=-1)
+
+
+def add_following_to_cache(sender, instance, created, **kwargs):
+    if created and instance.from_user_id is not None and instance.to_user_id is not None:
+        FriendshipService.add_following_to_cache(instance.from_user_id, instance.to_user_id)
+
+
+def remove_following_from_cache(sender, instance, **kwargs):
+    if instance.from_user_id is not None and instance.to_user_id is not None:
+        FriendshipService.remove_following_from_cache(instance.from_user_id, instance.to_user_id)
+
+
+# the storage tables are written once the friendship transaction commits,
+# a rolled back follow or unfollow leaves them alone
+
+def store_friendship(sender, instance, created, **kwargs):
+    def sync_saved():
+        FOLLOWER_TABLE.sync_saved([instance])
+        FOLLOWING_TABLE.sync_saved([instance])
+    if created:
+        on_commit(sync_saved)
+
+
+def delete_stored_friendship(sender, instance, **kwargs):
+    def sync_deleted():
+        FOLLOWER_TABLE.sync_deleted([instance])
+        FOLLOWING_TABLE.sync_deleted([instance])
+    on_commit(sync_deleted)
+
+
+def bump_friendship_versions(sender, instance, created=True, **kwargs):
+    # post_delete sends no created argument
+    if created:
+        bump_versions(
+            FOLLOWERS_SCOPE.format(user_id=instance.to_user_id),
+            FOLLOWINGS_SCOPE.format(user_id=instance.from_user_id),
+        )
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from friendships.models import Friendship
+from friendships.storages import FOLLOWER_TABLE, FOLLOWING_TABLE
+
+
+class Command(BaseCommand):
+    help = (
+        'Copy the friendships to the followers and followings tables, e.g. '
+        'the friendships created before the tables moved to another storage '
+        'backend. Stored cells are kept.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        last_id = 0
+        copied = 0
+        while True:
+            friendships = list(
+                Friendship.objects.filter(id__gt=last_id).order_by('id')[:batch_size]
+            )
+            if not friendships:
+                break
+            FOLLOWER_TABLE.sync_saved(friendships)
+            FOLLOWING_TABLE.sync_saved(friendships)
+            copied += len(friendships)
+            last_id = friendships[-1].id
+        self.stdout.write('{} friendships copied.'.format(copied))
@@ -1,12 +1,131 @@
-from friendships.models import Friendship
+from django.conf import settings
+from accounts.models import UserStats
+from accounts.services import UserService, UserStatsService
+from friendships.storages import FOLLOWER_TABLE, FOLLOWING_TABLE
+from utils.db_routers import read_from_primary
+from utils.redis_client import RedisClient
+from utils.time_helpers import datetime_to_microseconds
+
+FOLLOWINGS_KEY = 'followings:{user_id}'
+# member marking a following set as fully loaded, user ids start at 1
+FOLLOWINGS_LOADED_MARKER = 0
 
 
 class FriendshipService(object):
 
     @classmethod
     def get_followers(cls, user):
-        friendships = Friendship.objects.filter(
-            to_user=user,
-        ).prefetch_related('from_user')
-        return [friendship.from_user for friendship in friendships]
+        follower_ids = [
+            friendship.from_user_id
+            for friendship in FOLLOWER_TABLE.scan(user.id)
+        ]
+        users = UserService.get_users_through_cache(follower_ids)
+        return [users[user_id] for user_id in follower_ids if user_id in users]
+
+    @classmethod
+    def get_follower_ids_batch(cls, user_id, start, batch_size):
+        """
+        (follower ids, next start) of the batch_size followers of the user
+        from the (created_at, follower id) key start, None for the first
+        one. The next start is None after the last batch.
+        """
+        friendships = FOLLOWER_TABLE.scan(user_id, start=start, limit=batch_size)
+        follower_ids = [friendship.from_user_id for friendship in friendships]
+        if len(friendships) < batch_size:
+            return follower_ids, None
+        last = friendships[-1]
+        return follower_ids, (datetime_to_microseconds(last.created_at), last.from_user_id + 1)
+
+    @classmethod
+    def iterate_follower_ids(cls, user_id, batch_size):
+        """
+        yields the follower ids of the user in lists of at most batch_size,
+        without loading any User. Each batch scans the followers row from
+        the key following the previous batch.
+        """
+        start = None
+        while True:
+            follower_ids, start = cls.get_follower_ids_batch(user_id, start, batch_size)
+            if follower_ids:
+                yield follower_ids
+            if start is None:
+                return
+
+    @classmethod
+    def get_following_ids(cls, user_id):
+        return [
+            friendship.to_user_id
+            for friendship in FOLLOWING_TABLE.scan(user_id)
+        ]
+
+    @classmethod
+    def get_follower_count(cls, user_id):
+        return UserStatsService.get_stats(user_id).followers_count
+
+    @classmethod
+    def get_celebrity_ids(cls, user_ids, threshold):
+        # users among user_ids who have at least threshold followers
+        if not user_ids:
+            return []
+        return list(UserStats.objects.filter(
+            user_id__in=user_ids,
+            followers_count__gte=threshold,
+        ).values_list('user_id', flat=True))
 
+    @classmethod
+    def get_followings_key(cls, user_id):
+        return FOLLOWINGS_KEY.format(user_id=user_id)
+
+    @classmethod
+    def load_followings_to_cache(cls, user_id):
+        # the set is kept alive by its readers, it must not be built from
+        # the lagging rows of a replica
+        with read_from_primary():
+            following_ids = cls.get_following_ids(user_id)
+        key = cls.get_followings_key(user_id)
+        pipe = RedisClient.get_connection().pipeline()
+        pipe.delete(key)
+        pipe.sadd(key, FOLLOWINGS_LOADED_MARKER, *following_ids)
+        pipe.expire(key, settings.FOLLOWINGS_CACHE_TIMEOUT)
+        pipe.execute()
+        return set(following_ids)
+
+    @classmethod
+    def is_following(cls, from_user_id, to_user_ids):
+        """
+        returns {to_user_id: whether from_user follows to_user} in a single
+        redis round trip. The following set is loaded from the database the
+        first time it is needed.
+        """
+        to_user_ids = list(to_user_ids)
+        key = cls.get_followings_key(from_user_id)
+        pipe = RedisClient.get_connection().pipeline()
+        pipe.sismember(key, FOLLOWINGS_LOADED_MARKER)
+        for to_user_id in to_user_ids:
+            pipe.sismember(key, to_user_id)
+        pipe.expire(key, settings.FOLLOWINGS_CACHE_TIMEOUT)
+        results = pipe.execute()
+        if not results[0]:
+            following_ids = cls.load_followings_to_cache(from_user_id)
+            return {
+                to_user_id: to_user_id in following_ids
+                for to_user_id in to_user_ids
+            }
+        return dict(zip(to_user_ids, results[1:len(to_user_ids) + 1]))
+
+    @classmethod
+    def has_followed(cls, from_user_id, to_user_id):
+        return cls.is_following(from_user_id, [to_user_id])[to_user_id]
+
+    @classmethod
+    def add_following_to_cache(cls, from_user_id, to_user_id):
+        # a set without the loaded marker is ignored and reloaded by readers
+        key = cls.get_followings_key(from_user_id)
+        pipe = RedisClient.get_connection().pipeline()
+        pipe.sadd(key, to_user_id)
+        pipe.expire(key, settings.FOLLOWINGS_CACHE_TIMEOUT)
+        pipe.execute()
+
+    @classmethod
+    def remove_following_from_cache(cls, from_user_id, to_user_id):
+        RedisClient.get_connection().srem(cls.get_followings_key(from_user_id), to_user_id)
@@ -0,0 +1,19 @@
+from friendships.models import Friendship
+from utils.storage import Table
+
+# followers of each user, in the order they followed
+FOLLOWER_TABLE = Table(
+    'followers',
+    Friendship,
+    row_key='to_user_id',
+    timestamp='created_at',
+    column='from_user_id',
+)
+# users followed by each user, in the order they were followed
+FOLLOWING_TABLE = Table(
+    'followings',
+    Friendship,
+    row_key='from_user_id',
+    timestamp='created_at',
+    column='to_user_id',
+)
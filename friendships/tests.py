@@ -0,0 +1,118 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import override_settings
+from friendships.models import Friendship
+from friendships.services import FriendshipService
+from testing.testcases import TestCase
+from utils.db_routers import read_from_replica
+from utils.storage import SQLiteBackend
+
+
+class FriendshipServiceTests(TestCase):
+
+    def test_iterate_follower_ids(self):
+        linghu = self.create_user('linghu')
+        follower_ids = []
+        for i in range(5):
+            follower = self.create_user('follower{}'.format(i))
+            Friendship.objects.create(from_user=follower, to_user=linghu)
+            follower_ids.append(follower.id)
+        # ties on created_at must neither skip nor repeat followers
+        created_at = Friendship.objects.filter(to_user=linghu).first().created_at
+        Friendship.objects.filter(from_user_id__in=follower_ids[1:4]).update(created_at=created_at)
+
+        batches = list(FriendshipService.iterate_follower_ids(linghu.id, 2))
+        self.assertEqual([len(batch) for batch in batches], [2, 2, 1])
+        self.assertEqual(sorted(sum(batches, [])), sorted(follower_ids))
+        nobody = self.create_user('nobody')
+        with self.assertNumQueries(1):
+            self.assertEqual(list(FriendshipService.iterate_follower_ids(nobody.id, 2)), [])
+
+    def test_is_following(self):
+        linghu = self.create_user('linghu')
+        users = [self.create_user('user{}'.format(i)) for i in range(3)]
+        Friendship.objects.create(from_user=linghu, to_user=users[0])
+        user_ids = [user.id for user in users]
+
+        # the following set is loaded from the database once
+        with self.assertNumQueries(1):
+            following = FriendshipService.is_following(linghu.id, user_ids)
+        self.assertEqual(following, {users[0].id: True, users[1].id: False, users[2].id: False})
+        with self.assertNumQueries(0):
+            self.assertTrue(FriendshipService.has_followed(linghu.id, users[0].id))
+
+        # follow and unfollow write through to the cache
+        Friendship.objects.create(from_user=linghu, to_user=users[2])
+        Friendship.objects.filter(from_user=linghu, to_user=users[0]).delete()
+        with self.assertNumQueries(0):
+            following = FriendshipService.is_following(linghu.id, user_ids)
+        self.assertEqual(following, {users[0].id: False, users[1].id: False, users[2].id: True})
+
+        # users following nobody are cached as well
+        with self.assertNumQueries(1):
+            self.assertFalse(FriendshipService.has_followed(users[1].id, linghu.id))
+        with self.assertNumQueries(0):
+            self.assertFalse(FriendshipService.has_followed(users[1].id, linghu.id))
+
+    @override_settings(STORAGE_BACKENDS={
+        'followers': 'utils.storage.SQLiteBackend',
+        'followings': 'utils.storage.SQLiteBackend',
+    })
+    def test_sqlite_storage(self):
+        linghu = self.create_user('linghu')
+        followers = [self.create_user('follower{}'.format(i)) for i in range(3)]
+        for follower in followers:
+            Friendship.objects.create(from_user=follower, to_user=linghu)
+        Friendship.objects.create(from_user=linghu, to_user=followers[0])
+        follower_ids = [follower.id for follower in followers]
+
+        # reads do not touch the friendships table
+        with self.assertNumQueries(0):
+            batches = list(FriendshipService.iterate_follower_ids(linghu.id, 2))
+            following_ids = FriendshipService.get_following_ids(linghu.id)
+        self.assertEqual(batches, [follower_ids[:2], follower_ids[2:]])
+        self.assertEqual(following_ids, [followers[0].id])
+
+        Friendship.objects.filter(from_user=followers[1]).delete()
+        self.assertEqual(
+            list(FriendshipService.iterate_follower_ids(linghu.id, 2)),
+            [[follower_ids[0], follower_ids[2]]],
+        )
+        self.assertEqual(FriendshipService.get_following_ids(followers[1].id), [])
+
+    @override_settings(STORAGE_BACKENDS={
+        'followers': 'utils.storage.SQLiteBackend',
+        'followings': 'utils.storage.SQLiteBackend',
+    })
+    def test_rebuild_friendship_tables(self):
+        linghu = self.create_user('linghu')
+        followers = [self.create_user('follower{}'.format(i)) for i in range(3)]
+        for follower in followers:
+            Friendship.objects.create(from_user=follower, to_user=linghu)
+        # friendships created before the tables moved to sqlite
+        SQLiteBackend.clear_all()
+        self.assertEqual(list(FriendshipService.iterate_follower_ids(linghu.id, 10)), [])
+
+        out = StringIO()
+        call_command('rebuild_friendship_tables', batch_size=2, stdout=out)
+        self.assertEqual(out.getvalue().strip(), '3 friendships copied.')
+        self.assertEqual(
+            list(FriendshipService.iterate_follower_ids(linghu.id, 10)),
+            [[follower.id for follower in followers]],
+        )
+        self.assertEqual(FriendshipService.get_following_ids(followers[0].id), [linghu.id])
+
+
+class FriendshipServiceReplicaTests(TestCase):
+    databases = {'default', 'replica'}
+
+    @override_settings(DATABASE_REPLICAS=['replica'])
+    def test_following_set_loaded_from_primary(self):
+        linghu = self.create_user('linghu')
+        dongxie = self.create_user('dongxie')
+        # the replica has not received the follow yet
+        Friendship.objects.create(from_user=linghu, to_user=dongxie)
+        with read_from_replica():
+            self.assertTrue(FriendshipService.has_followed(linghu.id, dongxie.id))
+        self.assertTrue(FriendshipService.has_followed(linghu.id, dongxie.id))
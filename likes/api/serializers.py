@@ -0,0 +1,64 @@
+from django.contrib.contenttypes.models import ContentType
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+
+from accounts.api.serializers import UserSerializer
+from comments.models import Comment
+from likes.models import Like
+from tweets.models import Tweet
+from utils.serializers import TimedSerializerMixin
+
+
+class LikeSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    user = UserSerializer()
+
+    class Meta:
+        model = Like
+        fields = ('user', 'created_at')
+
+
+class BaseLikeSerializerForCreateAndCancel(serializers.ModelSerializer):
+    content_type = serializers.ChoiceField(choices=['comment', 'tweet'])
+    object_id = serializers.IntegerField()
+
+    class Meta:
+        model = Like
+        fields = ('content_type', 'object_id')
+
+    def _get_model_class(self, data):
+        if data['content_type'] == 'comment':
+            return Comment
+        if data['content_type'] == 'tweet':
+            return Tweet
+        return None
+
+    def validate(self, data):
+        model_class = self._get_model_class(data)
+        target = model_class.objects.filter(id=data['object_id']).first()
+        if target is None or getattr(target, 'is_deleted', False):
+            raise ValidationError({'object_id': 'Object does not exist.'})
+        data['target'] = target
+        return data
+
+
+class LikeSerializerForCreate(BaseLikeSerializerForCreateAndCancel):
+
+    def get_or_create(self):
+        target = self.validated_data['target']
+        return Like.objects.get_or_create(
+            content_type=ContentType.objects.get_for_model(target.__class__),
+            object_id=target.id,
+            user=self.context['request'].user,
+        )
+
+
+class LikeSerializerForCancel(BaseLikeSerializerForCreateAndCancel):
+
+    def cancel(self):
+        target = self.validated_data['target']
+        deleted, _ = Like.objects.filter(
+            content_type=ContentType.objects.get_for_model(target.__class__),
+            object_id=target.id,
+            user=self.context['request'].user,
+        ).delete()
+        return deleted
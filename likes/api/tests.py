@@ -0,0 +1,118 @@
+from unittest import mock
+
+from redis import Redis
+from rest_framework.test import APIClient
+from likes.models import Like
+from likes.tasks import flush_likes_count_task, flush_pending_likes_count, get_pending_key
+from testing.testcases import TestCase
+from tweets.models import Tweet
+from utils.redis_client import RedisClient
+
+
+LIKE_BASE_URL = '/api/likes/'
+LIKE_CANCEL_URL = '/api/likes/cancel/'
+TWEET_LIST_API = '/api/tweets/'
+
+
+class LikeApiTests(TestCase):
+
+    def setUp(self):
+        self.linghu = self.create_user('linghu')
+        self.linghu_client = APIClient()
+        self.linghu_client.force_authenticate(self.linghu)
+
+        self.dongxie = self.create_user('dongxie')
+        self.dongxie_client = APIClient()
+        self.dongxie_client.force_authenticate(self.dongxie)
+
+        self.tweet = self.create_tweet(self.linghu)
+
+    def test_like_and_cancel(self):
+        data = {'content_type': 'tweet', 'object_id': self.tweet.id}
+
+        # 403 for anonymous user
+        response = self.anonymous_client.post(LIKE_BASE_URL, data)
+        self.assertEqual(response.status_code, 403)
+
+        # 400 for missing params, unknown type or object
+        response = self.linghu_client.post(LIKE_BASE_URL, {'content_type': 'tweet'})
+        self.assertEqual(response.status_code, 400)
+        response = self.linghu_client.post(LIKE_BASE_URL, {'content_type': 'coment', 'object_id': self.tweet.id})
+        self.assertEqual(response.status_code, 400)
+        response = self.linghu_client.post(LIKE_BASE_URL, {'content_type': 'tweet', 'object_id': -1})
+        self.assertEqual(response.status_code, 400)
+
+        # liking twice creates one like
+        response = self.linghu_client.post(LIKE_BASE_URL, data)
+        self.assertEqual(response.status_code, 201)
+        self.linghu_client.post(LIKE_BASE_URL, data)
+        self.assertEqual(Like.objects.count(), 1)
+
+        comment = self.create_comment(self.linghu, self.tweet)
+        response = self.dongxie_client.post(LIKE_BASE_URL, {'content_type': 'comment', 'object_id': comment.id})
+        self.assertEqual(response.status_code, 201)
+
+        response = self.linghu_client.post(LIKE_CANCEL_URL, data)
+        self.assertEqual(response.data['deleted'], 1)
+        response = self.linghu_client.post(LIKE_CANCEL_URL, data)
+        self.assertEqual(response.data['deleted'], 0)
+        self.assertEqual(Like.objects.count(), 1)
+
+    def test_likes_count_is_buffered(self):
+        data = {'content_type': 'tweet', 'object_id': self.tweet.id}
+        # the first like schedules a flush, tasks run right away in tests
+        self.linghu_client.post(LIKE_BASE_URL, data)
+        self.tweet.refresh_from_db()
+        self.assertEqual(self.tweet.likes_count, 1)
+
+        # likes until the next flush are buffered
+        self.dongxie_client.post(LIKE_BASE_URL, data)
+        self.linghu_client.post(LIKE_CANCEL_URL, data)
+        comment = self.create_comment(self.linghu, self.tweet)
+        self.dongxie_client.post(LIKE_BASE_URL, {'content_type': 'comment', 'object_id': comment.id})
+        self.tweet.refresh_from_db()
+        self.assertEqual(self.tweet.likes_count, 1)
+
+        self.assertEqual(flush_likes_count_task(), '1 likes counts flushed.')
+        self.tweet.refresh_from_db()
+        comment.refresh_from_db()
+        self.assertEqual(self.tweet.likes_count, 1)
+        self.assertEqual(comment.likes_count, 1)
+
+    def test_interrupted_flush(self):
+        data = {'content_type': 'tweet', 'object_id': self.tweet.id}
+        self.linghu_client.post(LIKE_BASE_URL, data)
+        self.dongxie_client.post(LIKE_BASE_URL, data)
+        self.tweet.refresh_from_db()
+        self.assertEqual(self.tweet.likes_count, 1)
+
+        # the flush dies after its UPDATE, before removing the deltas
+        with mock.patch.object(Redis, 'delete', side_effect=RuntimeError('worker died')):
+            with self.assertRaises(RuntimeError):
+                flush_pending_likes_count(Tweet)
+        self.tweet.refresh_from_db()
+        self.assertEqual(self.tweet.likes_count, 2)
+
+        # the next flush finishes it without counting the like twice
+        self.assertEqual(flush_pending_likes_count(Tweet), 1)
+        self.assertEqual(flush_pending_likes_count(Tweet), 0)
+        self.tweet.refresh_from_db()
+        self.assertEqual(self.tweet.likes_count, 2)
+
+    def test_has_liked(self):
+        tweets = [self.create_tweet(self.linghu) for i in range(3)]
+        for tweet in tweets[:2]:
+            self.dongxie_client.post(LIKE_BASE_URL, {'content_type': 'tweet', 'object_id': tweet.id})
+
+        with self.assertNumQueries(3):
+            # tweets, likes of the page, authors
+            response = self.dongxie_client.get(TWEET_LIST_API, {'user_id': self.linghu.id})
+        self.assertEqual(
+            [tweet['has_liked'] for tweet in response.data['tweets']],
+            [False, True, True, False],
+        )
+        response = self.anonymous_client.get(TWEET_LIST_API, {'user_id': self.linghu.id})
+        self.assertEqual(
+            [tweet['has_liked'] for tweet in response.data['tweets']],
+            [False, False, False, False],
+        )
@@ -0,0 +1,56 @@
+from rest_framework import viewsets, status
+from rest_framework.decorators import action
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from likes.api.serializers import (
+    LikeSerializer,
+    LikeSerializerForCancel,
+    LikeSerializerForCreate,
+)
+from likes.models import Like
+from likes.services import LikeService
+from utils.db_routers import ReplicaReadMixin
+from utils.decorators import required_params
+from utils.http_cache import LIKES_SCOPE, bump_versions
+
+
+class LikeViewSet(ReplicaReadMixin, viewsets.GenericViewSet):
+    queryset = Like.objects.all()
+    permission_classes = [IsAuthenticated]
+    serializer_class = LikeSerializerForCreate
+
+    @required_params(request_attr='data', params=['content_type', 'object_id'])
+    def create(self, request, *args, **kwargs):
+        serializer = LikeSerializerForCreate(
+            data=request.data,
+            context={'request': request},
+        )
+        if not serializer.is_valid():
+            return Response({
+                'message': 'Please check input.',
+                'errors': serializer.errors,
+            }, status=status.HTTP_400_BAD_REQUEST)
+        like, created = serializer.get_or_create()
+        if created:
+            LikeService.incr_likes_count(serializer.validated_data['target'], 1)
+            bump_versions(LIKES_SCOPE.format(user_id=request.user.id))
+        return Response(LikeSerializer(like).data, status=status.HTTP_201_CREATED)
+
+    @action(methods=['POST'], detail=False)
+    @required_params(request_attr='data', params=['content_type', 'object_id'])
+    def cancel(self, request, *args, **kwargs):
+        serializer = LikeSerializerForCancel(
+            data=request.data,
+            context={'request': request},
+        )
+        if not serializer.is_valid():
+            return Response({
+                'message': 'Please check input.',
+                'errors': serializer.errors,
+            }, status=status.HTTP_400_BAD_REQUEST)
+        deleted = serializer.cancel()
+        if deleted:
+            LikeService.incr_likes_count(serializer.validated_data['target'], -1)
+            bump_versions(LIKES_SCOPE.format(user_id=request.user.id))
+        return Response({'success': True, 'deleted': deleted}, status=status.HTTP_200_OK)
@@ -0,0 +1,9 @@
+from django.core.management.base import BaseCommand
+from likes.tasks import flush_likes_count_task
+
+
+class Command(BaseCommand):
+    help = 'Flush the likes counts buffered in redis to the database.'
+
+    def handle(self, *args, **options):
+        self.stdout.write(flush_likes_count_task())
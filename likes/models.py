@@ -0,0 +1,30 @@
+from django.contrib.auth.models import User
+from django.contrib.contenttypes.fields import GenericForeignKey
+from django.contrib.contenttypes.models import ContentType
+from django.db import models
+
+
+class Like(models.Model):
+    # a like on a tweet or a comment
+    object_id = models.PositiveIntegerField()
+    content_type = models.ForeignKey(
+        ContentType,
+        on_delete=models.SET_NULL,
+        null=True,
+    )
+    content_object = GenericForeignKey('content_type', 'object_id')
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = (('user', 'content_type', 'object_id'),)
+        index_together = (('content_type', 'object_id', 'created_at'),)
+        ordering = ('-created_at',)
+
+    def __str__(self):
+        return '{} - {} liked {} {}'.format(
+            self.created_at,
+            self.user,
+            self.content_type,
+            self.object_id,
+        )
@@ -0,0 +1,50 @@
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from likes.models import Like
+from likes.tasks import flush_likes_count_task, get_pending_key
+from utils.redis_client import RedisClient
+
+FLUSH_LOCK_KEY = 'likes_count:flush_lock'
+
+
+class LikeService(object):
+
+    @classmethod
+    def has_liked(cls, user, target):
+        if user.is_anonymous:
+            return False
+        return Like.objects.filter(
+            content_type=ContentType.objects.get_for_model(target.__class__),
+            object_id=target.id,
+            user=user,
+        ).exists()
+
+    @classmethod
+    def get_liked_ids(cls, user, model, object_ids):
+        """
+        the ids among object_ids liked by user, with one query.
+        """
+        if user.is_anonymous or not object_ids:
+            return set()
+        return set(Like.objects.filter(
+            content_type=ContentType.objects.get_for_model(model),
+            object_id__in=object_ids,
+            user=user,
+        ).values_list('object_id', flat=True))
+
+    @classmethod
+    def incr_likes_count(cls, target, delta):
+        """
+        likes counts are buffered in redis to absorb bursts on hot objects.
+        The first change after a flush schedules the next one in
+        LIKES_FLUSH_INTERVAL seconds, so the database sees at most one
+        UPDATE per object and interval.
+        """
+        RedisClient.get_connection().hincrby(
+            get_pending_key(target.__class__),
+            target.id,
+            delta,
+        )
+        if cache.add(FLUSH_LOCK_KEY, 1, settings.LIKES_FLUSH_INTERVAL):
+            flush_likes_count_task.delay_later(settings.LIKES_FLUSH_INTERVAL)
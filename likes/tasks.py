@@ -0,0 +1,76 @@
+from django.apps import apps
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from likes.models import Like
+from utils.http_cache import COMMENTS_SCOPE, TWEET_SCOPE, TWEETS_SCOPE, bump_versions
+from utils.redis_client import RedisClient
+from utils.tasks import task
+
+# pending likes_count deltas: hash of object id -> delta, one per model
+PENDING_LIKES_COUNT_KEY = 'likes_count:pending:{model}'
+LIKED_MODELS = ('tweets.Tweet', 'comments.Comment')
+
+
+def get_pending_key(model):
+    return PENDING_LIKES_COUNT_KEY.format(model=model._meta.label_lower)
+
+
+def get_version_scopes(model, object_ids):
+    # the endpoints rendering the likes_count of the objects
+    if not object_ids:
+        return []
+    if model._meta.label == 'tweets.Tweet':
+        user_ids = set(model.objects.filter(
+            id__in=object_ids,
+        ).values_list('user_id', flat=True))
+        return [TWEET_SCOPE.format(tweet_id=object_id) for object_id in object_ids] + [
+            TWEETS_SCOPE.format(user_id=user_id) for user_id in user_ids
+        ]
+    tweet_ids = set(model.objects.filter(
+        id__in=object_ids,
+    ).values_list('tweet_id', flat=True))
+    return [COMMENTS_SCOPE.format(tweet_id=tweet_id) for tweet_id in tweet_ids]
+
+
+def flush_pending_likes_count(model):
+    """
+    set the likes_count of the objects of model with a pending delta to
+    their number of likes, with a single UPDATE, returns the number of
+    objects updated. The counts are recomputed rather than incremented:
+    a flush that stops before removing the hash from redis is finished by
+    the next one without counting the deltas twice. Runs outside of any
+    transaction, as tasks do.
+    """
+    conn = RedisClient.get_connection()
+    key = get_pending_key(model)
+    flushing_key = key + ':flushing'
+    # a previous flush may have stopped before finishing, finish it first
+    if not conn.exists(flushing_key):
+        if not conn.exists(key):
+            return 0
+        conn.rename(key, flushing_key)
+
+    object_ids = [
+        int(object_id)
+        for object_id, delta in conn.hgetall(flushing_key).items()
+        if int(delta)
+    ]
+    likes_count = Like.objects.filter(
+        content_type=ContentType.objects.get_for_model(model),
+        object_id=OuterRef('pk'),
+    ).order_by().values('object_id').annotate(count=Count('id')).values('count')
+    model.objects.filter(id__in=object_ids).update(
+        likes_count=Coalesce(Subquery(likes_count), 0),
+    )
+    conn.delete(flushing_key)
+    bump_versions(*get_version_scopes(model, object_ids))
+    return len(object_ids)
+
+
+@task()
+def flush_likes_count_task():
+    flushed = 0
+    for label in LIKED_MODELS:
+        flushed += flush_pending_likes_count(apps.get_model(label))
+    return '{} likes counts flushed.'.format(flushed)
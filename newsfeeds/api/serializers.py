@@ -1,12 +1,14 @@
 from rest_framework import serializers
 from newsfeeds.models import NewsFeed
 from tweets.api.serializers import TweetSerializer
+from utils.serializers import FastListSerializer, TimedSerializerMixin
 
 
-class NewsFeedSerializer(serializers.ModelSerializer):
+class NewsFeedSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     tweet = TweetSerializer()
 
     class Meta:
         model = NewsFeed
+        list_serializer_class = FastListSerializer
         fields = ('id', 'created_at', 'user', 'tweet')
 
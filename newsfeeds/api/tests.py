@@ -1,5 +1,9 @@
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from testing.testcases import TestCase
 from newsfeeds.models import NewsFeed
+from newsfeeds.services import NewsFeedService
 from friendships.models import Friendship
 from rest_framework.test import APIClient
 
@@ -61,4 +65,72 @@ class NewsFeedTest(TestCase):
         self.assertEqual(len(response.data['newsfeeds']), 2)
         self.assertEqual(response.data['newsfeeds'][0]['tweet']['id'], posted_tweet_id)
 
+    @override_settings(NEWSFEED_CELEBRITY_THRESHOLD=2)
+    def test_pagination(self):
+        # sheldon has 2 followers so his tweets are pulled, not pushed
+        self.leonard_client.post(FOLLOW_URL.format(self.sheldon.id))
+        self.assertTrue(NewsFeedService.is_celebrity(self.sheldon.id))
+        tweet_ids = []
+        for i in range(5):
+            client = self.sheldon_client if i % 2 else self.leonard_client
+            response = client.post(POST_TWEETS_URL, {'content': 'tweet {}'.format(i)})
+            tweet_ids.append(response.data['id'])
+        tweet_ids.reverse()
+
+        response = self.leonard_client.get(NEWSFEEDS_URL, {'size': 3})
+        self.assertEqual(response.data['has_next_page'], True)
+        self.assertEqual(
+            [newsfeed['tweet']['id'] for newsfeed in response.data['newsfeeds']],
+            tweet_ids[:3],
+        )
+
+        response = self.leonard_client.get(NEWSFEEDS_URL, {
+            'size': 3,
+            'created_at__lt': response.data['newsfeeds'][-1]['created_at'],
+        })
+        self.assertEqual(response.data['has_next_page'], False)
+        self.assertEqual(
+            [newsfeed['tweet']['id'] for newsfeed in response.data['newsfeeds']],
+            tweet_ids[3:],
+        )
+
+    def test_list_number_of_queries(self):
+        def count_queries():
+            # cold caches, the worst case
+            self.clear_cache()
+            with CaptureQueriesContext(connection) as context:
+                response = self.leonard_client.get(NEWSFEEDS_URL)
+            return len(context.captured_queries), len(response.data['newsfeeds'])
+
+        self.leonard_client.post(FOLLOW_URL.format(self.sheldon.id))
+        self.sheldon_client.post(POST_TWEETS_URL, {'content': 'Hello Twitter'})
+        queries, newsfeeds_count = count_queries()
+        self.assertEqual(newsfeeds_count, 1)
+
+        for i in range(5):
+            user = self.create_user('author{}'.format(i))
+            self.leonard_client.post(FOLLOW_URL.format(user.id))
+            tweet = self.create_tweet(user)
+            NewsFeed.objects.create(user=self.leonard, tweet=tweet)
+        self.assertEqual(count_queries(), (queries, 6))
+
+
+class NewsFeedQueryBudgetTests(TestCase):
+
+    def setUp(self):
+        self.viewer = self.create_user('viewer')
+        self.viewer_client = APIClient()
+        self.viewer_client.force_authenticate(self.viewer)
+
+    def test_list(self):
+        def add_newsfeeds(count):
+            # a new author for every newsfeed, the worst case
+            authors = self.create_users(count, prefix='author{}_'.format(Friendship.objects.count()))
+            self.create_follow_graph([self.viewer], authors)
+            self.create_tweets(authors)
+
+        def render():
+            response = self.viewer_client.get(NEWSFEEDS_URL, {'size': 100})
+            return response.data['newsfeeds']
 
+        self.assertConstantQueries(add_newsfeeds, render)
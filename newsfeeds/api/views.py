@@ -1,24 +1,78 @@
 from django.shortcuts import render
 from rest_framework import viewsets, status
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.renderers import BrowsableAPIRenderer
 from rest_framework.response import Response
 
 from newsfeeds.models import NewsFeed
 
 from newsfeeds.api.serializers import NewsFeedSerializer
+from newsfeeds.services import NewsFeedService
+from tweets.models import Tweet
+from utils.db_routers import ReplicaReadMixin
+from utils.loaders import get_loader_for
+from utils.paginations import EndlessPagination
+from utils.renderers import FastJSONRenderer
 
 
-class NewsFeedViewSet(viewsets.GenericViewSet):
+class NewsFeedViewSet(ReplicaReadMixin, viewsets.GenericViewSet):
     permission_classes = [IsAuthenticated]
+    pagination_class = EndlessPagination
+    renderer_classes = (FastJSONRenderer, BrowsableAPIRenderer)
 
     def get_queryset(self):
         # define custom queryset for logged in user
-        # can also use <self.request.user.newsfeed_set.all()>
-        return NewsFeed.objects.filter(user=self.request.user)
+        # only the shard holding the viewer's inbox is read
+        return NewsFeed.objects_for(self.request.user.id)
 
-    def list(self, request):
-        serializer = NewsFeedSerializer(self.get_queryset(), many=True)
-        return Response({
-            'newsfeeds': serializer.data,
-        }, status=status.HTTP_200_OK)
+    def iterate_visible_newsfeeds(self, request, batch_size):
+        """
+        yields the newsfeeds of the viewer in batches, without the ones of
+        deleted tweets, which are hidden until delete_tweet_task removes
+        them. Each batch reads on from the key of the last newsfeed read.
+        """
+        cursor_filters = self.paginator.get_cursor_filters(request)
+        tweet_field = NewsFeed._meta.get_field('tweet')
+        loader = get_loader_for(request, Tweet)
+        while True:
+            newsfeeds = NewsFeedService.get_newsfeeds(
+                request.user,
+                limit=batch_size,
+                **cursor_filters
+            )
+            # the tweets are attached to the newsfeeds and are not fetched
+            # again by the serializer
+            tweets = loader.load_many([
+                newsfeed.tweet_id
+                for newsfeed in newsfeeds
+                if not tweet_field.is_cached(newsfeed)
+            ])
+            for newsfeed in newsfeeds:
+                if not tweet_field.is_cached(newsfeed):
+                    tweet_field.set_cached_value(newsfeed, tweets.get(newsfeed.tweet_id))
+            yield [
+                newsfeed
+                for newsfeed in newsfeeds
+                if newsfeed.tweet is not None and not newsfeed.tweet.is_deleted
+            ]
+            if len(newsfeeds) < batch_size:
+                return
+            last = newsfeeds[-1]
+            cursor_filters['created_at__lt'] = (last.created_at, last.tweet_id)
 
+    def list(self, request):
+        """
+        the cursor ids of the newsfeeds are their tweet ids, e.g.
+        created_at__lt=<created_at>,<tweet.id>
+        """
+        # one more newsfeed to know whether there is a next page
+        page = self.paginator.paginate_batches(
+            self.iterate_visible_newsfeeds(request, self.paginator.get_page_size(request) + 1),
+            request,
+        )
+        serializer = NewsFeedSerializer(
+            page,
+            context={'request': request},
+            many=True,
+        )
+        return self.paginator.get_paginated_response(serializer.data, 'newsfeeds')
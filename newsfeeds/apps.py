@@ -3,3 +3,12 @@ from django.apps import AppConfig
 
 class NewsfeedsConfig(AppConfig):
     name = 'newsfeeds'
+
+    def ready(self):
+        from django.db.models.signals import post_delete, post_save
+        from friendships.models import Friendship
+        from newsfeeds.listeners import backfill_newsfeeds, purge_newsfeeds
+
+        # keep the inboxes in line with the followings
+        post_save.connect(backfill_newsfeeds, sender=Friendship)
+        post_delete.connect(purge_newsfeeds, sender=Friendship)
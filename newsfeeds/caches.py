@@ -0,0 +1,132 @@
+from collections import defaultdict
+
+from django.conf import settings
+from newsfeeds.models import NewsFeed
+from newsfeeds.storages import NEWSFEED_TABLE
+from utils.paginations import get_cursor_keys
+from utils.storage import MAX_COLUMN
+from utils.redis_helper import RedisHelper
+from utils.time_helpers import datetime_to_microseconds, microseconds_to_datetime
+
+NEWSFEED_TIMELINE_KEY = 'newsfeeds:inbox:{user_id}'
+
+
+class NewsFeedCache(object):
+    """
+    keeps the most recent NEWSFEED_CACHE_LIMIT inbox entries of each active
+    user in a redis sorted set. Members are '<tweet id>:<newsfeed id>', the
+    tweet id zero padded so that entries of the same time sort by tweet id
+    as in NEWSFEED_TABLE, and scores are created_at in microseconds. Reads
+    that go past the cached window fall back to the database.
+    """
+
+    @classmethod
+    def get_key(cls, user_id):
+        return NEWSFEED_TIMELINE_KEY.format(user_id=user_id)
+
+    @classmethod
+    def to_entry(cls, newsfeed):
+        member = '{:020d}:{}'.format(newsfeed.tweet_id, newsfeed.id)
+        return member, datetime_to_microseconds(newsfeed.created_at)
+
+    @classmethod
+    def to_key(cls, member, score):
+        # the (created_at, tweet_id) key of the entry in NEWSFEED_TABLE
+        return score, int(member.split(':')[0])
+
+    @classmethod
+    def to_newsfeed(cls, user_id, member, score):
+        tweet_id, newsfeed_id = member.split(':')
+        return NewsFeed(
+            id=int(newsfeed_id),
+            user_id=user_id,
+            tweet_id=int(tweet_id),
+            created_at=microseconds_to_datetime(score),
+        )
+
+    @classmethod
+    def push_newsfeeds(cls, newsfeeds):
+        entries_by_key = defaultdict(list)
+        for newsfeed in newsfeeds:
+            entries_by_key[cls.get_key(newsfeed.user_id)].append(cls.to_entry(newsfeed))
+        RedisHelper.push_to_sorted_sets(entries_by_key, settings.NEWSFEED_CACHE_LIMIT)
+
+    @classmethod
+    def remove_newsfeeds(cls, newsfeeds):
+        # the other entries of the inboxes stay cached
+        members_by_key = defaultdict(list)
+        for newsfeed in newsfeeds:
+            member, _ = cls.to_entry(newsfeed)
+            members_by_key[cls.get_key(newsfeed.user_id)].append(member)
+        RedisHelper.remove_from_sorted_sets(members_by_key)
+
+    @classmethod
+    def invalidate(cls, user_ids):
+        # the inboxes are loaded again from the database on the next read
+        RedisHelper.delete(*[cls.get_key(user_id) for user_id in user_ids])
+
+    @classmethod
+    def get_inbox(cls, user_id, limit=None, created_at__lt=None, created_at__gt=None):
+        """
+        the user's inbox, most recent first, between the
+        utils.paginations cursors.
+        """
+        key = cls.get_key(user_id)
+        window_size = settings.NEWSFEED_CACHE_LIMIT
+        max_key, min_key = get_cursor_keys(created_at__lt, created_at__gt)
+        max_score = None if max_key is None else max_key[0]
+        min_score = None if min_key is None else min_key[0]
+
+        def in_range(entry):
+            entry_key = cls.to_key(*entry)
+            return (max_key is None or entry_key < max_key) \
+                and (min_key is None or entry_key > min_key)
+
+        size, lowest_score, entries = RedisHelper.load_sorted_set(
+            key,
+            limit=limit,
+            max_score=max_score,
+            min_score=min_score,
+            timeout=settings.NEWSFEED_CACHE_TIMEOUT,
+            # entries of the cursor times are split by tweet id
+            include_max=max_key is not None and max_key[1] > 0,
+            include_min=min_key is not None and min_key[1] < MAX_COLUMN,
+        )
+        if size is None:
+            # cold cache, backfill the window and serve the page from it
+            window = NEWSFEED_TABLE.scan(user_id, limit=window_size, reverse=True)
+            RedisHelper.save_sorted_set(
+                key,
+                [cls.to_entry(newsfeed) for newsfeed in window],
+                timeout=settings.NEWSFEED_CACHE_TIMEOUT,
+            )
+            size = len(window)
+            lowest_score = datetime_to_microseconds(window[-1].created_at) if window else None
+            entries = [cls.to_entry(newsfeed) for newsfeed in window]
+        entries = sorted(
+            {entry for entry in entries if in_range(entry)},
+            key=lambda entry: cls.to_key(*entry),
+            reverse=True,
+        )[:limit]
+
+        # the page is served from the cache when it is fully inside the window:
+        # - a window smaller than its max size holds the whole inbox
+        # - the page is full
+        # - the page only has entries newer than the oldest cached time, whose
+        #   entries may have been trimmed in part
+        if size < window_size \
+                or (limit is not None and len(entries) >= limit) \
+                or (min_key is not None and min_key >= (lowest_score, MAX_COLUMN)):
+            return [
+                cls.to_newsfeed(user_id, member, score)
+                for member, score in entries
+            ]
+
+        return NEWSFEED_TABLE.scan(
+            user_id,
+            # scan bounds are inclusive at the start, exclusive at the stop
+            start=None if max_key is None else (max_key[0], max_key[1] - 1),
+            stop=min_key,
+            limit=limit,
+            reverse=True,
+        )
@@ -0,0 +1,11 @@
+from newsfeeds.services import NewsFeedService
+
+
+def backfill_newsfeeds(sender, instance, created, **kwargs):
+    if created and instance.from_user_id is not None and instance.to_user_id is not None:
+        NewsFeedService.backfill_followee_tweets(instance.from_user_id, instance.to_user_id)
+
+
+def purge_newsfeeds(sender, instance, **kwargs):
+    if instance.from_user_id is not None and instance.to_user_id is not None:
+        NewsFeedService.purge_followee_tweets(instance.from_user_id, instance.to_user_id)
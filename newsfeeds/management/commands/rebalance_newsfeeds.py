@@ -0,0 +1,72 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from newsfeeds.caches import NewsFeedCache
+from newsfeeds.models import NewsFeed
+
+
+class Command(BaseCommand):
+    help = (
+        'Move the newsfeeds that are not on the shard of their user, in '
+        'batches. Run it after changing settings.NEWSFEED_SHARDS.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--drain',
+            nargs='*',
+            default=[],
+            help='database aliases removed from NEWSFEED_SHARDS to move the newsfeeds out of',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        sources = list(settings.NEWSFEED_SHARDS)
+        sources += [alias for alias in options['drain'] if alias not in sources]
+        moved = 0
+        for source in sources:
+            last_id = 0
+            while True:
+                newsfeeds = list(
+                    NewsFeed.objects.using(source)
+                    .filter(id__gt=last_id)
+                    .order_by('id')[:batch_size]
+                )
+                if not newsfeeds:
+                    break
+                last_id = newsfeeds[-1].id
+                misplaced = defaultdict(list)
+                for newsfeed in newsfeeds:
+                    # dangling newsfeeds of deleted users or tweets stay put
+                    if newsfeed.user_id is None or newsfeed.tweet_id is None:
+                        continue
+                    target = NewsFeed.get_shard(newsfeed.user_id)
+                    if target != source:
+                        misplaced[target].append(newsfeed)
+                for target, target_newsfeeds in misplaced.items():
+                    self.move(source, target, target_newsfeeds)
+                    moved += len(target_newsfeeds)
+        self.stdout.write('{} newsfeeds moved.'.format(moved))
+
+    def move(self, source, target, newsfeeds):
+        # the copies are committed before the originals are deleted, so an
+        # interrupted run loses nothing and can simply be started again
+        NewsFeed.objects.db_manager(target).bulk_create(
+            [
+                NewsFeed(
+                    user_id=newsfeed.user_id,
+                    tweet_id=newsfeed.tweet_id,
+                    created_at=newsfeed.created_at,
+                )
+                for newsfeed in newsfeeds
+            ],
+            ignore_conflicts=True,
+        )
+        NewsFeed.objects.using(source).filter(
+            id__in=[newsfeed.id for newsfeed in newsfeeds],
+        ).delete()
+        # the cached inboxes hold the ids of the original rows
+        NewsFeedCache.invalidate({newsfeed.user_id for newsfeed in newsfeeds})
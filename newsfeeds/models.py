@@ -1,18 +1,33 @@
+from django.conf import settings
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.models import User
 from tweets.models import Tweet
+from utils.sharding import get_shard
 
 
 class NewsFeed(models.Model):
+    # newsfeeds are sharded by user over settings.NEWSFEED_SHARDS, users and
+    # tweets may live in another database, hence no foreign key constraints.
     # user is the person who read the newsfeed
-    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
-    tweet = models.ForeignKey(Tweet, on_delete=models.SET_NULL, null=True)
-    created_at = models.DateTimeField(auto_now_add=True)
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, db_constraint=False)
+    tweet = models.ForeignKey(Tweet, on_delete=models.SET_NULL, null=True, db_constraint=False)
+    # the tweeting time when the newsfeed is backfilled on follow
+    created_at = models.DateTimeField(default=timezone.now)
 
     class Meta:
         index_together = (('user', 'created_at'),)
         unique_together = (('user', 'tweet'),)
         ordering = ('user', '-created_at',)
 
+    @classmethod
+    def get_shard(cls, user_id):
+        return get_shard(settings.NEWSFEED_SHARDS, user_id)
+
+    @classmethod
+    def objects_for(cls, user_id):
+        # the newsfeeds of user_id, read from the shard holding them
+        return cls.objects.using(cls.get_shard(user_id)).filter(user_id=user_id)
+
     def __str__(self):
         return f'{self.created_at} inbox of {self.user}: {self.tweet}'
@@ -1,15 +1,94 @@
+import heapq
+
+from django.conf import settings
 from friendships.services import FriendshipService
+from newsfeeds.caches import NewsFeedCache
 from newsfeeds.models import NewsFeed
+from newsfeeds.storages import NEWSFEED_TABLE
+from newsfeeds.tasks import (
+    backfill_newsfeeds_task,
+    fanout_newsfeeds_main_task,
+    purge_newsfeeds_task,
+)
+from tweets.models import Tweet
+from utils.paginations import get_cursor_q
 
 
 class NewsFeedService(object):
 
+    @classmethod
+    def is_celebrity(cls, user_id):
+        followers_count = FriendshipService.get_follower_count(user_id)
+        return followers_count >= settings.NEWSFEED_CELEBRITY_THRESHOLD
+
     @classmethod
     def fanout_to_followers(cls, tweet):
-        newsfeeds = [
-            NewsFeed(user=follower, tweet=tweet)
-            for follower in FriendshipService.get_followers(tweet.user)
-        ]
+        # the author should see the tweet in their own feed right away,
+        # the followers' inboxes are written by the asynchronous tasks.
+        NewsFeedCache.push_newsfeeds(NEWSFEED_TABLE.put_many([
+            NewsFeed(user_id=tweet.user_id, tweet_id=tweet.id),
+        ]))
+        # celebrities' tweets are pulled by their followers at read time
+        if cls.is_celebrity(tweet.user_id):
+            return
+        fanout_newsfeeds_main_task.delay(tweet.id, tweet.user_id)
+
+    @classmethod
+    def backfill_followee_tweets(cls, user_id, followee_id):
+        # the tweets of celebrities are pulled at read time already
+        if cls.is_celebrity(followee_id):
+            return
+        backfill_newsfeeds_task.delay(user_id, followee_id)
+
+    @classmethod
+    def purge_followee_tweets(cls, user_id, followee_id):
+        purge_newsfeeds_task.delay(user_id, followee_id)
+
+    @classmethod
+    def get_newsfeeds(cls, user, limit=None, **cursor_filters):
+        """
+        merge the pushed inbox of the user with the recent tweets of the
+        celebrities the user follows, most recent first.
+        - limit: max number of newsfeeds to return
+        - cursor_filters: created_at__lt / created_at__gt keyset cursors of
+          utils.paginations, whose ids are tweet ids
+        """
+        inbox = NewsFeedCache.get_inbox(user.id, limit, **cursor_filters)
+        celebrity_ids = FriendshipService.get_celebrity_ids(
+            FriendshipService.get_following_ids(user.id),
+            settings.NEWSFEED_CELEBRITY_THRESHOLD,
+        )
+        if not celebrity_ids:
+            return inbox
+
+        pull_size = settings.NEWSFEED_CELEBRITY_PULL_SIZE
+        if limit is not None:
+            pull_size = min(pull_size, limit)
+        streams = [inbox]
+        for celebrity_id in celebrity_ids:
+            tweets = Tweet.objects.filter(
+                get_cursor_q(**cursor_filters),
+                user_id=celebrity_id,
+                is_deleted=False,
+            ).order_by('-created_at', '-id')[:pull_size]
+            streams.append(
+                NewsFeed(user=user, tweet=tweet, created_at=tweet.created_at)
+                for tweet in tweets
+            )
 
-        newsfeeds.append(NewsFeed(user=tweet.user, tweet=tweet))
-        NewsFeed.objects.bulk_create(newsfeeds)
\ No newline at end of file
+        newsfeeds = []
+        seen_tweet_ids = set()
+        # a celebrity's older tweets may have been pushed before the author
+        # crossed the threshold, keep only one newsfeed per tweet.
+        for newsfeed in heapq.merge(
+            *streams,
+            key=lambda newsfeed: (newsfeed.created_at, newsfeed.tweet_id),
+            reverse=True,
+        ):
+            if newsfeed.tweet_id in seen_tweet_ids:
+                continue
+            seen_tweet_ids.add(newsfeed.tweet_id)
+            newsfeeds.append(newsfeed)
+            if limit is not None and len(newsfeeds) >= limit:
+                break
+        return newsfeeds
@@ -0,0 +1,12 @@
+from newsfeeds.models import NewsFeed
+from utils.storage import Table
+
+# inbox of each user, sorted by the time the tweets were fanned out
+NEWSFEED_TABLE = Table(
+    'newsfeeds',
+    NewsFeed,
+    row_key='user_id',
+    timestamp='created_at',
+    column='tweet_id',
+    get_alias=NewsFeed.get_shard,
+)
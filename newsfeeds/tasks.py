@@ -0,0 +1,150 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from friendships.models import Friendship
+from friendships.services import FriendshipService
+from newsfeeds.caches import NewsFeedCache
+from newsfeeds.models import NewsFeed
+from newsfeeds.storages import NEWSFEED_TABLE
+from tweets.models import Tweet
+from utils.tasks import task
+from utils.time_helpers import datetime_to_microseconds
+
+# progress records expire after one day
+FANOUT_PROGRESS_TIMEOUT = 24 * 3600
+FANOUT_PROGRESS_KEY = 'newsfeeds:fanout:{tweet_id}:{field}'
+FANOUT_PROGRESS_FIELDS = ('total_batches', 'done_batches', 'failed_batches')
+
+
+def _progress_key(tweet_id, field):
+    return FANOUT_PROGRESS_KEY.format(tweet_id=tweet_id, field=field)
+
+
+def get_fanout_progress(tweet_id):
+    keys = {
+        field: _progress_key(tweet_id, field)
+        for field in FANOUT_PROGRESS_FIELDS
+    }
+    values = cache.get_many(keys.values())
+    return {field: values.get(key, 0) for field, key in keys.items()}
+
+
+def _incr_progress(tweet_id, field):
+    # the bookkeeping never fails a fanout: a record evicted or expired
+    # meanwhile starts again from 0
+    key = _progress_key(tweet_id, field)
+    cache.add(key, 0, FANOUT_PROGRESS_TIMEOUT)
+    try:
+        cache.incr(key)
+    except ValueError:
+        pass
+
+
+def _mark_batch_failed(tweet_id, follower_ids):
+    _incr_progress(tweet_id, 'failed_batches')
+
+
+@task(on_failure=_mark_batch_failed)
+def fanout_newsfeeds_batch_task(tweet_id, follower_ids):
+    # a retried batch keeps the newsfeeds it already wrote, the storage
+    # ignores cells already stored under the same (user, tweet)
+    NewsFeedCache.push_newsfeeds(NEWSFEED_TABLE.put_many([
+        NewsFeed(user_id=follower_id, tweet_id=tweet_id)
+        for follower_id in follower_ids
+    ]))
+    _incr_progress(tweet_id, 'done_batches')
+
+
+@task()
+def fanout_newsfeeds_main_task(tweet_id, tweet_user_id, start=None):
+    """
+    reads one batch of followers from the key start and hands it to
+    fanout_newsfeeds_batch_task, then enqueues itself for the next batch.
+    The queue holds a batch or two of each fanout at a time, rather than
+    every batch of the followers at once.
+    """
+    if start is None:
+        cache.set_many({
+            _progress_key(tweet_id, 'total_batches'): 0,
+            _progress_key(tweet_id, 'done_batches'): 0,
+            _progress_key(tweet_id, 'failed_batches'): 0,
+        }, FANOUT_PROGRESS_TIMEOUT)
+    follower_ids, next_start = FriendshipService.get_follower_ids_batch(
+        tweet_user_id,
+        start,
+        settings.NEWSFEED_FANOUT_BATCH_SIZE,
+    )
+    if follower_ids:
+        _incr_progress(tweet_id, 'total_batches')
+        fanout_newsfeeds_batch_task.delay(tweet_id, follower_ids)
+    # queued behind the batch, the next step waits for the queue to drain
+    if next_start is not None:
+        fanout_newsfeeds_main_task.delay(tweet_id, tweet_user_id, next_start)
+    return '{} newsfeeds going to fanout.'.format(len(follower_ids))
+
+
+def is_following(user_id, followee_id):
+    # read from the database, the task may run before the caches are updated
+    return Friendship.objects.filter(
+        from_user_id=user_id,
+        to_user_id=followee_id,
+    ).exists()
+
+
+@task()
+def backfill_newsfeeds_task(user_id, followee_id):
+    """
+    copy the latest NEWSFEED_BACKFILL_SIZE tweets of followee into the
+    inbox of the user who just followed them, at their tweeting time.
+    """
+    # the user may have unfollowed again before the task ran
+    if not is_following(user_id, followee_id):
+        return '0 newsfeeds backfilled.'
+    tweets = list(
+        Tweet.objects.filter(user_id=followee_id, is_deleted=False)
+        .order_by('-created_at')
+        .values_list('id', 'created_at')[:settings.NEWSFEED_BACKFILL_SIZE]
+    )
+    batch_size = settings.NEWSFEED_FOLLOW_BATCH_SIZE
+    for index in range(0, len(tweets), batch_size):
+        # newsfeeds already in the inbox, e.g. when follow and unfollow
+        # flap, are kept by the (user, tweet) unique constraint
+        NewsFeedCache.push_newsfeeds(NEWSFEED_TABLE.put_many([
+            NewsFeed(user_id=user_id, tweet_id=tweet_id, created_at=created_at)
+            for tweet_id, created_at in tweets[index:index + batch_size]
+        ]))
+    return '{} newsfeeds backfilled.'.format(len(tweets))
+
+
+@task()
+def purge_newsfeeds_task(user_id, followee_id):
+    """
+    delete the tweets of followee from the inbox of the user who just
+    unfollowed them. The inbox is scanned one batch at a time, most recent
+    first, and the tweets of each batch are matched to their author by
+    primary key: the cost follows the size of the inbox, not the number of
+    tweets followee ever wrote.
+    """
+    # the user may have followed again before the task ran
+    if is_following(user_id, followee_id):
+        return '0 newsfeeds purged.'
+    batch_size = settings.NEWSFEED_FOLLOW_BATCH_SIZE
+    purged, start = 0, None
+    while True:
+        newsfeeds = NEWSFEED_TABLE.scan(user_id, start=start, limit=batch_size, reverse=True)
+        if not newsfeeds:
+            break
+        tweet_ids = list(Tweet.objects.filter(
+            id__in=[newsfeed.tweet_id for newsfeed in newsfeeds],
+            user_id=followee_id,
+        ).values_list('id', flat=True))
+        NEWSFEED_TABLE.delete(user_id, tweet_ids)
+        purged += len(tweet_ids)
+        if len(newsfeeds) < batch_size:
+            break
+        last = newsfeeds[-1]
+        # scan starts are inclusive
+        start = (datetime_to_microseconds(last.created_at), last.tweet_id - 1)
+    # the cached inbox is loaded again on the next read
+    NewsFeedCache.invalidate([user_id])
+    return '{} newsfeeds purged.'.format(purged)
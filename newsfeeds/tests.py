@@ -0,0 +1,337 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import override_settings
+from friendships.models import Friendship
+from newsfeeds.caches import NewsFeedCache
+from newsfeeds.models import NewsFeed
+from newsfeeds.services import NewsFeedService
+from newsfeeds.tasks import (
+    backfill_newsfeeds_task,
+    fanout_newsfeeds_batch_task,
+    fanout_newsfeeds_main_task,
+    get_fanout_progress,
+    purge_newsfeeds_task,
+)
+from testing.testcases import TestCase
+from utils.redis_client import RedisClient
+
+
+class NewsFeedServiceTests(TestCase):
+
+    def setUp(self):
+        self.linghu = self.create_user('linghu')
+        self.followers = [
+            self.create_user('follower{}'.format(i))
+            for i in range(5)
+        ]
+        for follower in self.followers:
+            Friendship.objects.create(from_user=follower, to_user=self.linghu)
+
+    @override_settings(NEWSFEED_FANOUT_BATCH_SIZE=2)
+    def test_fanout_in_batches(self):
+        tweet = self.create_tweet(self.linghu)
+        NewsFeedService.fanout_to_followers(tweet)
+        self.assertEqual(NewsFeed.objects.filter(tweet=tweet).count(), 6)
+        for user in [self.linghu] + self.followers:
+            self.assertTrue(NewsFeed.objects.filter(user=user, tweet=tweet).exists())
+        self.assertEqual(get_fanout_progress(tweet.id), {
+            'total_batches': 3,
+            'done_batches': 3,
+            'failed_batches': 0,
+        })
+
+    @override_settings(NEWSFEED_FANOUT_BATCH_SIZE=2)
+    def test_fanout_enqueues_one_batch_at_a_time(self):
+        tweet = self.create_tweet(self.linghu)
+        with mock.patch.object(fanout_newsfeeds_batch_task, 'delay') as batch_delay, \
+                mock.patch.object(fanout_newsfeeds_main_task, 'delay') as main_delay:
+            fanout_newsfeeds_main_task(tweet.id, self.linghu.id)
+        self.assertEqual(batch_delay.call_count, 1)
+        self.assertEqual(len(batch_delay.call_args[0][1]), 2)
+        # the next step reads on from the key after the batch
+        main_delay.assert_called_once()
+        self.assertIsNotNone(main_delay.call_args[0][2])
+
+    def test_fanout_progress_evicted(self):
+        tweet = self.create_tweet(self.linghu)
+        # no progress record, e.g. evicted from the cache
+        fanout_newsfeeds_batch_task(tweet.id, [self.followers[0].id])
+        self.assertTrue(NewsFeed.objects.filter(user=self.followers[0], tweet=tweet).exists())
+        self.assertEqual(get_fanout_progress(tweet.id)['done_batches'], 1)
+
+    @override_settings(NEWSFEED_FANOUT_BATCH_SIZE=2, TASK_MAX_RETRIES=1)
+    def test_fanout_batch_retry(self):
+        tweet = self.create_tweet(self.linghu)
+        bulk_create = NewsFeed.objects.bulk_create
+        calls = []
+
+        def flaky_bulk_create(*args, **kwargs):
+            calls.append(1)
+            # the first call writes the author's own newsfeed
+            if len(calls) == 2:
+                raise RuntimeError('database went away')
+            return bulk_create(*args, **kwargs)
+
+        with mock.patch.object(NewsFeed.objects, 'bulk_create', flaky_bulk_create):
+            NewsFeedService.fanout_to_followers(tweet)
+        self.assertEqual(NewsFeed.objects.filter(tweet=tweet).count(), 6)
+        self.assertEqual(get_fanout_progress(tweet.id)['done_batches'], 3)
+
+        # a batch failing on every attempt is recorded as failed
+        with mock.patch.object(
+            NewsFeed.objects,
+            'bulk_create',
+            side_effect=RuntimeError('database went away'),
+        ):
+            with self.assertRaises(RuntimeError):
+                fanout_newsfeeds_batch_task.run(tweet.id, [self.followers[0].id])
+        self.assertEqual(get_fanout_progress(tweet.id)['failed_batches'], 1)
+
+    @override_settings(NEWSFEED_CELEBRITY_THRESHOLD=5)
+    def test_celebrity_tweets_are_pulled(self):
+        dongxie = self.create_user('dongxie')
+        reader = self.followers[0]
+        Friendship.objects.create(from_user=reader, to_user=dongxie)
+
+        old_tweet = self.create_tweet(self.linghu, 'pushed before')
+        NewsFeed.objects.create(user=reader, tweet=old_tweet)
+        normal_tweet = self.create_tweet(dongxie)
+        NewsFeedService.fanout_to_followers(normal_tweet)
+        celebrity_tweet = self.create_tweet(self.linghu)
+        NewsFeedService.fanout_to_followers(celebrity_tweet)
+
+        # only the author's own inbox is written for a celebrity
+        self.assertEqual(NewsFeed.objects.filter(tweet=celebrity_tweet).count(), 1)
+        self.assertEqual(get_fanout_progress(celebrity_tweet.id)['total_batches'], 0)
+
+        newsfeeds = NewsFeedService.get_newsfeeds(reader)
+        self.assertEqual(
+            [newsfeed.tweet_id for newsfeed in newsfeeds],
+            [celebrity_tweet.id, normal_tweet.id, old_tweet.id],
+        )
+        self.assertEqual(newsfeeds[0].user, reader)
+
+
+class NewsFeedFollowTests(TestCase):
+
+    def setUp(self):
+        self.linghu = self.create_user('linghu')
+        self.dongxie = self.create_user('dongxie')
+        self.tweets = [self.create_tweet(self.linghu) for i in range(4)]
+
+    def get_inbox_tweet_ids(self, user):
+        return [newsfeed.tweet_id for newsfeed in NewsFeedService.get_newsfeeds(user)]
+
+    @override_settings(NEWSFEED_BACKFILL_SIZE=3, NEWSFEED_FOLLOW_BATCH_SIZE=2)
+    def test_follow_and_unfollow(self):
+        other_tweet = self.create_tweet(self.dongxie)
+        NewsFeed.objects.create(user=self.dongxie, tweet=other_tweet)
+
+        # the latest tweets are backfilled at their tweeting time
+        Friendship.objects.create(from_user=self.dongxie, to_user=self.linghu)
+        self.assertEqual(
+            self.get_inbox_tweet_ids(self.dongxie),
+            [other_tweet.id, self.tweets[3].id, self.tweets[2].id, self.tweets[1].id],
+        )
+        newsfeed = NewsFeed.objects.get(user=self.dongxie, tweet=self.tweets[3])
+        self.assertEqual(newsfeed.created_at, self.tweets[3].created_at)
+        backfill_newsfeeds_task(self.dongxie.id, self.linghu.id)
+        self.assertEqual(NewsFeed.objects.filter(user=self.dongxie).count(), 4)
+
+        # a stale purge does not undo a newer follow
+        purge_newsfeeds_task(self.dongxie.id, self.linghu.id)
+        self.assertEqual(NewsFeed.objects.filter(user=self.dongxie).count(), 4)
+
+        Friendship.objects.filter(from_user=self.dongxie, to_user=self.linghu).delete()
+        self.assertEqual(self.get_inbox_tweet_ids(self.dongxie), [other_tweet.id])
+        self.assertEqual(purge_newsfeeds_task(self.dongxie.id, self.linghu.id), '0 newsfeeds purged.')
+        # nor does a stale backfill undo a newer unfollow
+        backfill_newsfeeds_task(self.dongxie.id, self.linghu.id)
+        self.assertEqual(self.get_inbox_tweet_ids(self.dongxie), [other_tweet.id])
+
+    @override_settings(NEWSFEED_CELEBRITY_THRESHOLD=1)
+    def test_follow_celebrity(self):
+        Friendship.objects.create(from_user=self.dongxie, to_user=self.linghu)
+        self.assertEqual(NewsFeed.objects.filter(user=self.dongxie).count(), 0)
+        # their tweets are pulled at read time
+        self.assertEqual(len(self.get_inbox_tweet_ids(self.dongxie)), 4)
+
+
+class NewsFeedCacheTests(TestCase):
+
+    def setUp(self):
+        self.linghu = self.create_user('linghu')
+        self.dongxie = self.create_user('dongxie')
+        Friendship.objects.create(from_user=self.dongxie, to_user=self.linghu)
+
+    def post_tweet(self):
+        tweet = self.create_tweet(self.linghu)
+        NewsFeedService.fanout_to_followers(tweet)
+        return tweet
+
+    @override_settings(NEWSFEED_CACHE_LIMIT=3)
+    def test_get_inbox(self):
+        tweets = [self.post_tweet() for i in range(2)]
+
+        # cold cache is backfilled from the database
+        with self.assertNumQueries(1):
+            inbox = NewsFeedCache.get_inbox(self.dongxie.id)
+        self.assertEqual([newsfeed.tweet_id for newsfeed in inbox], [tweets[1].id, tweets[0].id])
+        with self.assertNumQueries(0):
+            cached_inbox = NewsFeedCache.get_inbox(self.dongxie.id)
+        self.assertEqual(
+            [(newsfeed.id, newsfeed.created_at) for newsfeed in cached_inbox],
+            [(newsfeed.id, newsfeed.created_at) for newsfeed in inbox],
+        )
+
+        # fanout appends to the cached inbox, which keeps at most 3 entries
+        tweets += [self.post_tweet() for i in range(2)]
+        with self.assertNumQueries(0):
+            inbox = NewsFeedCache.get_inbox(self.dongxie.id, limit=2)
+        self.assertEqual([newsfeed.tweet_id for newsfeed in inbox], [tweets[3].id, tweets[2].id])
+        with self.assertNumQueries(0):
+            inbox = NewsFeedCache.get_inbox(
+                self.dongxie.id,
+                limit=2,
+                created_at__gt=inbox[1].created_at,
+            )
+        self.assertEqual([newsfeed.tweet_id for newsfeed in inbox], [tweets[3].id])
+
+        # the window holds tweets 3, 2 and 1
+        with self.assertNumQueries(0):
+            inbox = NewsFeedCache.get_inbox(
+                self.dongxie.id,
+                limit=2,
+                created_at__lt=inbox[0].created_at,
+            )
+        self.assertEqual([newsfeed.tweet_id for newsfeed in inbox], [tweets[2].id, tweets[1].id])
+
+        # reads past the cached window fall back to the database
+        with self.assertNumQueries(1):
+            inbox = NewsFeedCache.get_inbox(
+                self.dongxie.id,
+                limit=2,
+                created_at__lt=inbox[0].created_at,
+            )
+        self.assertEqual([newsfeed.tweet_id for newsfeed in inbox], [tweets[1].id, tweets[0].id])
+
+    def test_empty_inbox_is_cached(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(NewsFeedCache.get_inbox(self.dongxie.id), [])
+        with self.assertNumQueries(0):
+            self.assertEqual(NewsFeedCache.get_inbox(self.dongxie.id), [])
+        tweet = self.post_tweet()
+        with self.assertNumQueries(0):
+            inbox = NewsFeedCache.get_inbox(self.dongxie.id)
+        self.assertEqual([newsfeed.tweet_id for newsfeed in inbox], [tweet.id])
+
+    def test_push_to_evicted_inbox(self):
+        NewsFeedCache.get_inbox(self.dongxie.id)
+        conn = RedisClient.get_connection()
+        key = NewsFeedCache.get_key(self.dongxie.id)
+        pipeline = conn.pipeline
+
+        # the inbox is evicted right after the push checked that it exists
+        def pipeline_evicting(transaction=True):
+            pipe = pipeline(transaction=transaction)
+            if not transaction:
+                execute = pipe.execute
+
+                def execute_then_evict():
+                    results = execute()
+                    conn.delete(key)
+                    return results
+                pipe.execute = execute_then_evict
+            return pipe
+
+        with mock.patch.object(conn, 'pipeline', pipeline_evicting):
+            tweet = self.post_tweet()
+        # the push is aborted instead of caching a one entry inbox
+        self.assertFalse(conn.exists(key))
+        inbox = NewsFeedCache.get_inbox(self.dongxie.id)
+        self.assertEqual([newsfeed.tweet_id for newsfeed in inbox], [tweet.id])
+
+    @override_settings(NEWSFEED_CACHE_LIMIT=3)
+    def test_get_inbox_of_same_time_newsfeeds(self):
+        tweets = [self.post_tweet() for i in range(5)]
+        created_at = NewsFeed.objects.filter(user=self.dongxie).first().created_at
+        NewsFeed.objects.filter(user=self.dongxie).update(created_at=created_at)
+        self.clear_cache()
+        tweet_ids = [tweet.id for tweet in reversed(tweets)]
+
+        # the cached window holds 3 of them, the last page is read from the database
+        inbox = NewsFeedCache.get_inbox(self.dongxie.id, limit=2)
+        page_ids = [newsfeed.tweet_id for newsfeed in inbox]
+        while inbox:
+            cursor = (inbox[-1].created_at, inbox[-1].tweet_id)
+            inbox = NewsFeedCache.get_inbox(self.dongxie.id, limit=2, created_at__lt=cursor)
+            page_ids += [newsfeed.tweet_id for newsfeed in inbox]
+        self.assertEqual(page_ids, tweet_ids)
+
+        inbox = NewsFeedCache.get_inbox(
+            self.dongxie.id,
+            created_at__gt=(created_at, tweets[2].id),
+        )
+        self.assertEqual([newsfeed.tweet_id for newsfeed in inbox], tweet_ids[:2])
+
+
+@override_settings(NEWSFEED_SHARDS=['default', 'newsfeeds_shard_1'])
+class NewsFeedShardingTests(TestCase):
+    databases = {'default', 'newsfeeds_shard_1'}
+
+    def setUp(self):
+        self.linghu = self.create_user('linghu')
+        self.followers = [
+            self.create_user('follower{}'.format(i))
+            for i in range(4)
+        ]
+        for follower in self.followers:
+            Friendship.objects.create(from_user=follower, to_user=self.linghu)
+
+    def test_fanout_to_shards(self):
+        tweet = self.create_tweet(self.linghu)
+        NewsFeedService.fanout_to_followers(tweet)
+        for user in [self.linghu] + self.followers:
+            shard = 'default' if user.id % 2 == 0 else 'newsfeeds_shard_1'
+            self.assertTrue(
+                NewsFeed.objects.using(shard).filter(user=user, tweet=tweet).exists()
+            )
+        self.assertEqual(
+            NewsFeed.objects.using('default').count()
+            + NewsFeed.objects.using('newsfeeds_shard_1').count(),
+            5,
+        )
+        newsfeeds = NewsFeedService.get_newsfeeds(self.followers[1])
+        self.assertEqual([newsfeed.tweet_id for newsfeed in newsfeeds], [tweet.id])
+
+    def test_rebalance(self):
+        tweet = self.create_tweet(self.linghu)
+        with self.settings(NEWSFEED_SHARDS=['default']):
+            NewsFeedService.fanout_to_followers(tweet)
+            # warm up the cached inboxes
+            for user in self.followers:
+                NewsFeedService.get_newsfeeds(user)
+        created_at = {
+            newsfeed.user_id: newsfeed.created_at
+            for newsfeed in NewsFeed.objects.all()
+        }
+
+        out = StringIO()
+        call_command('rebalance_newsfeeds', batch_size=2, stdout=out)
+        moved = len([user_id for user_id in created_at if user_id % 2 == 1])
+        self.assertEqual(out.getvalue().strip(), '{} newsfeeds moved.'.format(moved))
+        for user in [self.linghu] + self.followers:
+            newsfeed = NewsFeed.objects_for(user.id).get()
+            self.assertEqual(newsfeed.tweet_id, tweet.id)
+            self.assertEqual(newsfeed.created_at, created_at[user.id])
+            # the cached inboxes pointed to the moved rows
+            self.assertEqual(
+                [newsfeed.id for newsfeed in NewsFeedService.get_newsfeeds(user)],
+                [newsfeed.id],
+            )
+
+        out = StringIO()
+        call_command('rebalance_newsfeeds', stdout=out)
+        self.assertEqual(out.getvalue().strip(), '0 newsfeeds moved.')
@@ -0,0 +1,80 @@
+from rest_framework.test import APIClient
+
+from testing.testcases import TestCase
+from tweets.models import Tweet
+from tweets.services import TweetService
+
+SEARCH_URL = '/api/search/'
+
+
+class SearchApiTests(TestCase):
+
+    def setUp(self):
+        self.user1 = self.create_user('user1')
+        self.user2 = self.create_user('user2')
+        self.user1_client = APIClient()
+        self.user1_client.force_authenticate(self.user1)
+        self.tweets = [
+            self.create_tweet(self.user1, 'learning django today'),
+            self.create_tweet(self.user2, 'django rest framework'),
+            self.create_tweet(self.user1, 'nothing to see'),
+            self.create_tweet(self.user2, 'more Django'),
+        ]
+
+    def get_ids(self, response):
+        return [tweet['id'] for tweet in response.data['tweets']]
+
+    def test_search(self):
+        response = self.anonymous_client.get(SEARCH_URL)
+        self.assertEqual(response.status_code, 400)
+
+        response = self.anonymous_client.get(SEARCH_URL, {'q': 'django'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get_ids(response), [self.tweets[3].id, self.tweets[1].id, self.tweets[0].id])
+        self.assertEqual(response.data['tweets'][0]['user']['id'], self.user2.id)
+        self.assertEqual(response.data['has_next_page'], False)
+
+        response = self.anonymous_client.get(SEARCH_URL, {'q': 'DJANGO rest'})
+        self.assertEqual(self.get_ids(response), [self.tweets[1].id])
+
+        response = self.anonymous_client.get(SEARCH_URL, {'q': 'django', 'user_id': self.user1.id})
+        self.assertEqual(self.get_ids(response), [self.tweets[0].id])
+        response = self.anonymous_client.get(SEARCH_URL, {'q': 'django', 'user_id': 'me'})
+        self.assertEqual(response.status_code, 400)
+
+        response = self.anonymous_client.get(SEARCH_URL, {'q': 'python'})
+        self.assertEqual(self.get_ids(response), [])
+
+    def test_pagination(self):
+        response = self.user1_client.get(SEARCH_URL, {'q': 'django', 'size': 2})
+        self.assertEqual(self.get_ids(response), [self.tweets[3].id, self.tweets[1].id])
+        self.assertEqual(response.data['has_next_page'], True)
+        self.assertEqual(response.data['tweets'][0]['has_liked'], False)
+
+        response = self.user1_client.get(SEARCH_URL, {
+            'q': 'django',
+            'size': 2,
+            'created_at__lt': response.data['tweets'][-1]['created_at'],
+        })
+        self.assertEqual(self.get_ids(response), [self.tweets[0].id])
+        self.assertEqual(response.data['has_next_page'], False)
+
+        # a date range
+        response = self.user1_client.get(SEARCH_URL, {
+            'q': 'django',
+            'created_at__gt': self.tweets[0].created_at,
+            'created_at__lt': self.tweets[3].created_at,
+        })
+        self.assertEqual(self.get_ids(response), [self.tweets[1].id])
+
+    def test_deleted_tweet(self):
+        TweetService.delete_tweet(self.tweets[3])
+        response = self.anonymous_client.get(SEARCH_URL, {'q': 'django'})
+        self.assertEqual(self.get_ids(response), [self.tweets[1].id, self.tweets[0].id])
+
+    def test_hidden_tweets_do_not_shorten_pages(self):
+        # deleted, their postings not removed yet
+        Tweet.objects.filter(id__in=[self.tweets[3].id, self.tweets[1].id]).update(is_deleted=True)
+        response = self.anonymous_client.get(SEARCH_URL, {'q': 'django', 'size': 1})
+        self.assertEqual(self.get_ids(response), [self.tweets[0].id])
+        self.assertEqual(response.data['has_next_page'], False)
@@ -0,0 +1,77 @@
+from rest_framework import status, viewsets
+from rest_framework.permissions import AllowAny
+from rest_framework.renderers import BrowsableAPIRenderer
+from rest_framework.response import Response
+
+from search.services import SearchService
+from tweets.api.serializers import TweetSerializer
+from tweets.models import Tweet
+from utils.decorators import required_params
+from utils.loaders import get_loader_for
+from utils.paginations import EndlessPagination
+from utils.renderers import FastJSONRenderer
+
+
+class SearchViewSet(viewsets.GenericViewSet):
+    permission_classes = [AllowAny]
+    renderer_classes = (FastJSONRenderer, BrowsableAPIRenderer)
+    pagination_class = EndlessPagination
+
+    def iterate_matching_tweets(self, request, query, user_id, batch_size):
+        """
+        yields the tweets found by SearchService between the cursors of the
+        request, in batches. Deleted tweets, whose postings delete_tweet_task
+        removes in the background, and the rare tweets found through a
+        colliding token hash are left out, the next batches make up for them.
+        """
+        loader = get_loader_for(request, Tweet)
+        for tweet_ids in SearchService.iterate(
+            query,
+            user_id=user_id,
+            batch_size=batch_size,
+            **self.paginator.get_cursor_filters(request)
+        ):
+            tweets = loader.load_many(tweet_ids)
+            yield [
+                tweets[tweet_id]
+                for tweet_id in tweet_ids
+                if tweets.get(tweet_id) is not None
+                and not tweets[tweet_id].is_deleted
+                and SearchService.matches(tweets[tweet_id], query, user_id)
+            ]
+
+    @required_params(params=['q'])
+    def list(self, request):
+        """
+        tweets with every word of q, most recent first.
+        - user_id: only the tweets of that user
+        - created_at__gt: only the tweets created after that date
+        - created_at__lt: only the tweets created before that date, and the
+          cursor of the next page
+        """
+        user_id = request.query_params.get('user_id')
+        if user_id is not None:
+            try:
+                user_id = int(user_id)
+            except ValueError:
+                return Response({
+                    'success': False,
+                    'message': 'user_id must be an integer.',
+                }, status=status.HTTP_400_BAD_REQUEST)
+        query = request.query_params['q']
+        # one more tweet per batch to know whether there is a next page
+        page = self.paginator.paginate_batches(
+            self.iterate_matching_tweets(
+                request,
+                query,
+                user_id,
+                batch_size=self.paginator.get_page_size(request) + 1,
+            ),
+            request,
+        )
+        serializer = TweetSerializer(
+            page,
+            context={'request': request},
+            many=True,
+        )
+        return self.paginator.get_paginated_response(serializer.data, 'tweets')
@@ -0,0 +1,10 @@
+from search.services import SearchService
+
+
+def index_tweet(sender, instance, created, **kwargs):
+    if created:
+        SearchService.index_tweets([instance])
+
+
+def unindex_tweet(sender, instance, **kwargs):
+    SearchService.unindex_tweet(instance)
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from search.services import SearchService
+from tweets.models import Tweet
+
+
+class Command(BaseCommand):
+    help = (
+        'Index the tweets that are not deleted, e.g. the tweets created '
+        'before the search app was installed. Indexed tweets are kept.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        last_id = 0
+        indexed = 0
+        while True:
+            tweets = list(
+                Tweet.objects.filter(id__gt=last_id, is_deleted=False)
+                .order_by('id')[:batch_size]
+            )
+            if not tweets:
+                break
+            SearchService.index_tweets(tweets)
+            indexed += len(tweets)
+            last_id = tweets[-1].id
+        self.stdout.write('{} tweets indexed.'.format(indexed))
@@ -0,0 +1,19 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Posting(models.Model):
+    # a tweet in the posting list of a token. Tokens are stored as 64 bit
+    # hashes, see search.services.get_token_key. No foreign key, the
+    # index can be moved out of the database with settings.STORAGE_BACKENDS.
+    token_key = models.BigIntegerField()
+    tweet_id = models.IntegerField()
+    # the time the tweet was created, posting lists are sorted by it
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        index_together = (('token_key', 'created_at'),)
+        unique_together = (('token_key', 'tweet_id'),)
+
+    def __str__(self):
+        return f'{self.token_key}: {self.tweet_id}'
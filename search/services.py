@@ -0,0 +1,171 @@
+import hashlib
+import re
+from collections import deque
+
+from django.conf import settings
+
+from search.models import Posting
+from search.storages import POSTING_TABLE
+from utils.paginations import get_cursor_keys
+from utils.time_helpers import datetime_to_microseconds
+
+TOKEN_RE = re.compile(r'\w+')
+# pseudo token of the tweets of a user, for the author filter
+AUTHOR_TOKEN = 'from:{user_id}'
+
+
+def tokenize(content):
+    # the distinct words of a text in lower case, hashtags without their #
+    return list(dict.fromkeys(TOKEN_RE.findall(content.lower())))
+
+
+def get_token_key(token):
+    # 64 bit signed integer, the row key of the posting list of the token
+    return int.from_bytes(hashlib.md5(token.encode()).digest()[:8], 'big', signed=True)
+
+
+def get_tweet_tokens(tweet):
+    return tokenize(tweet.content) + [AUTHOR_TOKEN.format(user_id=tweet.user_id)]
+
+
+class PostingList(object):
+    """
+    reads the (created_at, tweet_id) keys of the posting list of a token,
+    most recent first, in batches of SEARCH_BATCH_SIZE. Keys are in
+    microseconds, as in the scan bounds of utils.storage.Table.
+    """
+
+    def __init__(self, token, stop=None):
+        self.token_key = get_token_key(token)
+        self.stop = stop
+        self.batch_size = settings.SEARCH_BATCH_SIZE
+        self.keys = deque()
+        self.complete = False
+
+    def seek(self, key):
+        """
+        the first key of the list at or below key, None after the end of the
+        list. key is None for the most recent one, keys must decrease
+        between two calls.
+        """
+        while True:
+            while self.keys and key is not None and self.keys[0] > key:
+                self.keys.popleft()
+            if self.keys:
+                return self.keys[0]
+            if self.complete:
+                return None
+            postings = POSTING_TABLE.scan(
+                self.token_key,
+                start=key,
+                stop=self.stop,
+                limit=self.batch_size,
+                reverse=True,
+            )
+            self.keys.extend(
+                (datetime_to_microseconds(posting.created_at), posting.tweet_id)
+                for posting in postings
+            )
+            # nothing is left past the batch
+            self.complete = len(postings) < self.batch_size
+
+
+def intersect(posting_lists, start, limit):
+    """
+    the keys found in every posting list, most recent first, at or below
+    start. The lists leapfrog each other: every list seeks the current key,
+    and the first key of a list that is below it becomes the new key. The
+    lists are read as far as the results go, not as a whole.
+    """
+    keys = []
+    key = start
+    matched = 0
+    index = 0
+    while len(keys) < limit:
+        head = posting_lists[index].seek(key)
+        if head is None:
+            break
+        if head == key:
+            matched += 1
+        else:
+            key = head
+            matched = 1
+        if matched == len(posting_lists):
+            keys.append(key)
+            key = (key[0], key[1] - 1)
+            matched = 0
+        index = (index + 1) % len(posting_lists)
+    return keys
+
+
+class SearchService(object):
+
+    @classmethod
+    def index_tweets(cls, tweets):
+        POSTING_TABLE.put_many([
+            Posting(
+                token_key=get_token_key(token),
+                tweet_id=tweet.id,
+                created_at=tweet.created_at,
+            )
+            for tweet in tweets
+            for token in get_tweet_tokens(tweet)
+        ])
+
+    @classmethod
+    def unindex_tweet(cls, tweet):
+        POSTING_TABLE.delete_from_rows(
+            [get_token_key(token) for token in get_tweet_tokens(tweet)],
+            tweet.id,
+        )
+
+    @classmethod
+    def search(cls, query, user_id=None, created_at__lt=None, created_at__gt=None, limit=None):
+        """
+        ids of the tweets with every word of query, most recent first.
+        - user_id: only the tweets of that user
+        - created_at__lt / created_at__gt: only the tweets before / after
+          these utils.paginations cursors
+        """
+        return next(cls.iterate(
+            query,
+            user_id=user_id,
+            created_at__lt=created_at__lt,
+            created_at__gt=created_at__gt,
+            batch_size=limit,
+        ), [])
+
+    @classmethod
+    def iterate(cls, query, user_id=None, created_at__lt=None, created_at__gt=None, batch_size=None):
+        """
+        the ids of search(), in batches of batch_size. Each batch continues
+        the intersection of the posting lists where the previous one
+        stopped, until the lists are exhausted.
+        """
+        tokens = tokenize(query)[:settings.SEARCH_MAX_TERMS]
+        if user_id is not None:
+            tokens.append(AUTHOR_TOKEN.format(user_id=user_id))
+        if not tokens:
+            return
+        batch_size = batch_size or settings.SEARCH_BATCH_SIZE
+        max_key, min_key = get_cursor_keys(created_at__lt, created_at__gt)
+        # seek keys are inclusive
+        start = None if max_key is None else (max_key[0], max_key[1] - 1)
+        posting_lists = [PostingList(token, stop=min_key) for token in tokens]
+        while True:
+            keys = intersect(posting_lists, start, batch_size)
+            if keys:
+                yield [tweet_id for _, tweet_id in keys]
+            if len(keys) < batch_size:
+                return
+            start = (keys[-1][0], keys[-1][1] - 1)
+
+    @classmethod
+    def matches(cls, tweet, query, user_id=None):
+        """
+        whether tweet has the words of query, to leave out the rare tweets
+        found through a colliding token hash.
+        """
+        if user_id is not None and tweet.user_id != user_id:
+            return False
+        return set(tokenize(query)[:settings.SEARCH_MAX_TERMS]) <= set(tokenize(tweet.content))
@@ -0,0 +1,11 @@
+from search.models import Posting
+from utils.storage import Table
+
+# posting list of each token, tweet ids sorted by the time they were created
+POSTING_TABLE = Table(
+    'postings',
+    Posting,
+    row_key='token_key',
+    timestamp='created_at',
+    column='tweet_id',
+)
@@ -0,0 +1,106 @@
+from datetime import timedelta
+
+from django.test import override_settings
+
+from search.models import Posting
+from search.services import SearchService, get_token_key, tokenize
+from testing.testcases import TestCase
+from tweets.services import TweetService
+
+
+class SearchServiceTests(TestCase):
+
+    def setUp(self):
+        self.user1 = self.create_user('user1')
+        self.user2 = self.create_user('user2')
+
+    def test_tokenize(self):
+        self.assertEqual(
+            tokenize('Hello, #Django! hello django_rest 2021'),
+            ['hello', 'django', 'django_rest', '2021'],
+        )
+
+    def test_index(self):
+        tweet = self.create_tweet(self.user1, 'Hello #Django')
+        self.assertEqual(
+            set(Posting.objects.filter(tweet_id=tweet.id).values_list('token_key', flat=True)),
+            {get_token_key('hello'), get_token_key('django'), get_token_key('from:{}'.format(self.user1.id))},
+        )
+        tweet.delete()
+        self.assertEqual(Posting.objects.count(), 0)
+
+    @override_settings(SEARCH_BATCH_SIZE=2)
+    def test_search(self):
+        # posting lists longer than a batch, that rarely overlap
+        tweets = []
+        for i in range(12):
+            words = ['common', 'even' if i % 2 == 0 else 'odd']
+            if i % 3 == 0:
+                words.append('third')
+            tweets.append(self.create_tweet(self.user1 if i < 6 else self.user2, ' '.join(words)))
+        # tweets created in the same microsecond are sorted by id
+        Posting.objects.filter(tweet_id=tweets[1].id).update(created_at=tweets[0].created_at)
+
+        def ids(tweet_indexes):
+            return [tweets[i].id for i in tweet_indexes]
+
+        self.assertEqual(SearchService.search('common', limit=20), ids(range(11, -1, -1)))
+        self.assertEqual(SearchService.search('even third', limit=20), ids([6, 0]))
+        self.assertEqual(SearchService.search('Odd THIRD', limit=20), ids([9, 3]))
+        self.assertEqual(SearchService.search('even odd', limit=20), [])
+        self.assertEqual(SearchService.search('missing common', limit=20), [])
+        self.assertEqual(SearchService.search('!!', limit=20), [])
+        self.assertEqual(SearchService.search('common', limit=3), ids([11, 10, 9]))
+
+        self.assertEqual(SearchService.search('third', user_id=self.user2.id, limit=20), ids([9, 6]))
+        self.assertEqual(
+            SearchService.search('common', limit=20, created_at__lt=tweets[3].created_at),
+            ids([2, 1, 0]),
+        )
+        self.assertEqual(
+            SearchService.search(
+                'common',
+                limit=20,
+                created_at__gt=tweets[3].created_at,
+                created_at__lt=tweets[6].created_at,
+            ),
+            ids([5, 4]),
+        )
+        self.assertEqual(
+            SearchService.search('common', limit=20, created_at__gt=tweets[11].created_at + timedelta(days=1)),
+            [],
+        )
+
+    @override_settings(SEARCH_BATCH_SIZE=2)
+    def test_iterate(self):
+        tweets = [self.create_tweet(self.user1, 'common') for _ in range(5)]
+        self.assertEqual(
+            list(SearchService.iterate('common', batch_size=2)),
+            [[tweets[4].id, tweets[3].id], [tweets[2].id, tweets[1].id], [tweets[0].id]],
+        )
+        self.assertEqual(
+            list(SearchService.iterate('common', batch_size=3, created_at__lt=tweets[4].created_at)),
+            [[tweets[3].id, tweets[2].id, tweets[1].id], [tweets[0].id]],
+        )
+        self.assertEqual(list(SearchService.iterate('missing')), [])
+
+    def test_deleted_tweet(self):
+        tweet = self.create_tweet(self.user1, 'about to be deleted')
+        TweetService.delete_tweet(tweet)
+        self.assertEqual(SearchService.search('deleted'), [])
+        self.assertEqual(Posting.objects.count(), 0)
+
+    @override_settings(STORAGE_BACKENDS={'postings': 'utils.storage.SQLiteBackend'})
+    def test_sqlite_backend(self):
+        tweets = [self.create_tweet(self.user1, 'hello world {}'.format(i)) for i in range(3)]
+        self.create_tweet(self.user2, 'hello there')
+        self.assertEqual(Posting.objects.count(), 0)
+        self.assertEqual(
+            SearchService.search('world hello', user_id=self.user1.id, limit=20),
+            [tweet.id for tweet in reversed(tweets)],
+        )
+        TweetService.delete_tweet(tweets[1])
+        self.assertEqual(
+            SearchService.search('hello world', limit=20),
+            [tweets[2].id, tweets[0].id],
+        )
@@ -0,0 +1,124 @@
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db.models import Count
+
+from accounts.models import UserStats
+from friendships.models import Friendship
+from friendships.services import FriendshipService
+from friendships.storages import FOLLOWER_TABLE, FOLLOWING_TABLE
+from newsfeeds.caches import NewsFeedCache
+from newsfeeds.models import NewsFeed
+from newsfeeds.services import NewsFeedService
+from newsfeeds.storages import NEWSFEED_TABLE
+from search.services import SearchService
+from tweets.models import Tweet
+from utils.redis_helper import RedisHelper
+
+# rows per INSERT / id__in query
+BATCH_SIZE = 500
+
+
+def in_batches(items, batch_size=BATCH_SIZE):
+    items = list(items)
+    for start in range(0, len(items), batch_size):
+        yield items[start:start + batch_size]
+
+
+def count_by(queryset, field):
+    return dict(queryset.values_list(field).annotate(count=Count('id')).order_by())
+
+
+def create_users(count, prefix='user', password='generic password'):
+    """
+    count users named prefix0, prefix1... with a few queries. The password
+    is hashed once for all of them.
+    """
+    password = make_password(password)
+    usernames = ['{}{}'.format(prefix, i) for i in range(count)]
+    User.objects.bulk_create(
+        [
+            User(username=username, email='{}@gmail.com'.format(username), password=password)
+            for username in usernames
+        ],
+        batch_size=BATCH_SIZE,
+    )
+    # bulk_create does not set the ids on every database
+    users = {}
+    for batch in in_batches(usernames):
+        users.update({user.username: user for user in User.objects.filter(username__in=batch)})
+    return [users[username] for username in usernames]
+
+
+def create_follow_graph(pairs):
+    """
+    pairs: (from_user_id, to_user_id) of the friendships to create. Like
+    following through the api, the storage tables and the user stats are
+    updated, but newsfeeds are not backfilled.
+    """
+    friendships = [
+        Friendship(from_user_id=from_user_id, to_user_id=to_user_id)
+        for from_user_id, to_user_id in set(pairs)
+        if from_user_id != to_user_id
+    ]
+    Friendship.objects.bulk_create(friendships, batch_size=BATCH_SIZE, ignore_conflicts=True)
+    FOLLOWER_TABLE.sync_saved(friendships)
+    FOLLOWING_TABLE.sync_saved(friendships)
+
+    user_ids = {friendship.from_user_id for friendship in friendships}
+    user_ids |= {friendship.to_user_id for friendship in friendships}
+    # stats records are counted again from all the friendships of the users
+    for batch in in_batches(user_ids):
+        UserStats.objects.filter(user_id__in=batch).delete()
+        followers_counts = count_by(Friendship.objects.filter(to_user_id__in=batch), 'to_user_id')
+        followings_counts = count_by(Friendship.objects.filter(from_user_id__in=batch), 'from_user_id')
+        UserStats.objects.bulk_create([
+            UserStats(
+                user_id=user_id,
+                followers_count=followers_counts.get(user_id, 0),
+                followings_count=followings_counts.get(user_id, 0),
+            )
+            for user_id in batch
+        ])
+    RedisHelper.delete(*[
+        FriendshipService.get_followings_key(user_id)
+        for user_id in user_ids
+    ])
+    return friendships
+
+
+def create_tweets(authors, content='default tweet content'):
+    """
+    one tweet per item of authors, indexed for the search and fanned out
+    to the newsfeeds of their author and of the followers of non celebrity
+    authors, as the api does.
+    """
+    tweets = [Tweet(user=author, content=content) for author in authors]
+    Tweet.objects.bulk_create(tweets, batch_size=BATCH_SIZE)
+    if tweets and tweets[0].id is None:
+        # the newest rows, bulk_create does not set the ids on every database
+        tweets = list(reversed(Tweet.objects.order_by('-id')[:len(tweets)]))
+    # a posting per word of the tweets
+    for batch in in_batches(tweets, BATCH_SIZE // 10):
+        SearchService.index_tweets(batch)
+
+    tweets_by_author = {}
+    for tweet in tweets:
+        tweets_by_author.setdefault(tweet.user_id, []).append(tweet)
+    newsfeeds = []
+    for author_id, author_tweets in tweets_by_author.items():
+        user_ids = [author_id]
+        if not NewsFeedService.is_celebrity(author_id):
+            user_ids += [
+                follower_id
+                for follower_ids in FriendshipService.iterate_follower_ids(author_id, BATCH_SIZE)
+                for follower_id in follower_ids
+            ]
+        newsfeeds.extend(
+            NewsFeed(user_id=user_id, tweet_id=tweet.id, created_at=tweet.created_at)
+            for tweet in author_tweets
+            for user_id in user_ids
+        )
+    for batch in in_batches(newsfeeds):
+        NEWSFEED_TABLE.put_many(batch)
+    NewsFeedCache.invalidate({newsfeed.user_id for newsfeed in newsfeeds})
+    return tweets
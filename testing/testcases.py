@@ -1,12 +1,34 @@
+from contextlib import ExitStack
+
 from django.test import TestCase as DjangoTestCase
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db import connections
+from accounts.services import local_user_cache, user_prefix_index
+from utils.redis_client import RedisClient
+from utils.storage import SQLiteBackend
 from tweets.models import Tweet
 from comments.models import Comment
 from rest_framework.test import APIClient
+from testing import factories
 
 
 class TestCase(DjangoTestCase):
 
+    def _pre_setup(self):
+        super()._pre_setup()
+        # ids are reused between tests, cached objects must not leak across
+        self.clear_cache()
+        SQLiteBackend.clear_all()
+
+    def clear_cache(self):
+        for cache in caches.all():
+            cache.clear()
+        local_user_cache.clear()
+        user_prefix_index.clear()
+        RedisClient.clear()
+
     @property
     def anonymous_client(self):
         if hasattr(self, '_anonymout_client'):
@@ -33,4 +55,58 @@ class TestCase(DjangoTestCase):
             content = 'default comment content.'
         return Comment.objects.create(user=user, tweet=tweet, content=content)
 
+    def create_users(self, count, prefix='user'):
+        return factories.create_users(count, prefix)
+
+    def create_follow_graph(self, followers, followees):
+        # every follower follows every followee
+        return factories.create_follow_graph(
+            (follower.id, followee.id)
+            for follower in followers
+            for followee in followees
+        )
+
+    def create_tweets(self, users, content=None):
+        # one tweet per item of users, e.g. create_tweets([user] * 10)
+        if content is None:
+            content = 'default tweet content'
+        return factories.create_tweets(users, content)
+
+    def count_queries(self, func, *args, **kwargs):
+        """
+        returns the number of queries run by func on all the databases of
+        the test, and the result of func.
+        """
+        aliases = connections if self.databases == '__all__' else self.databases
+        with ExitStack() as stack:
+            contexts = [
+                stack.enter_context(CaptureQueriesContext(connections[alias]))
+                for alias in aliases
+            ]
+            result = func(*args, **kwargs)
+        return sum(len(context) for context in contexts), result
 
+    def assertConstantQueries(self, add_rows, render, sizes=(1, 10, 100)):
+        """
+        add_rows(count) adds count rows to what render() renders, render()
+        returns the list of items rendered. Asserts that render() runs the
+        same number of queries with cold caches whether there are 1, 10 or
+        100 rows, and returns that number.
+        """
+        query_counts = []
+        rows_count = 0
+        for size in sizes:
+            add_rows(size - rows_count)
+            rows_count = size
+            # records created lazily by the first read are not counted
+            render()
+            self.clear_cache()
+            queries, items = self.count_queries(render)
+            self.assertEqual(len(items), size)
+            query_counts.append(queries)
+        self.assertEqual(
+            len(set(query_counts)),
+            1,
+            'queries for {} rows: {}'.format(list(sizes), query_counts),
+        )
+        return query_counts[0]
@@ -0,0 +1,11 @@
+from rest_framework import serializers
+
+from utils.serializers import TimedListSerializer, TimedSerializerMixin
+
+
+class TrendSerializer(TimedSerializerMixin, serializers.Serializer):
+    hashtag = serializers.CharField()
+    count = serializers.IntegerField()
+
+    class Meta:
+        list_serializer_class = TimedListSerializer
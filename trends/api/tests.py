@@ -0,0 +1,32 @@
+from testing.testcases import TestCase
+
+TRENDS_URL = '/api/trends/'
+
+
+class TrendApiTests(TestCase):
+
+    def setUp(self):
+        self.user1 = self.create_user('user1')
+        self.create_tweet(self.user1, 'hello #Twitter')
+        self.create_tweet(self.user1, '#twitter clone in #django')
+
+    def test_list(self):
+        response = self.anonymous_client.get(TRENDS_URL)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['window'], '1h')
+        self.assertEqual(response.data['trends'], [
+            {'hashtag': 'twitter', 'count': 2},
+            {'hashtag': 'django', 'count': 1},
+        ])
+
+        response = self.anonymous_client.get(TRENDS_URL, {'window': '24h', 'size': 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['trends'], [{'hashtag': 'twitter', 'count': 2}])
+
+        response = self.anonymous_client.get(TRENDS_URL, {'window': '1y'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_no_query(self):
+        with self.assertNumQueries(0):
+            response = self.anonymous_client.get(TRENDS_URL)
+        self.assertEqual(len(response.data['trends']), 2)
@@ -0,0 +1,35 @@
+from django.conf import settings
+from rest_framework import status, viewsets
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+
+from trends.api.serializers import TrendSerializer
+from trends.services import TrendService
+
+
+class TrendViewSet(viewsets.ViewSet):
+    permission_classes = [AllowAny]
+
+    def list(self, request):
+        """
+        - window: one of settings.TRENDS_WINDOWS, TRENDS_DEFAULT_WINDOW by default
+        - size: number of hashtags, TRENDS_TOP_K by default
+        """
+        window = request.query_params.get('window', settings.TRENDS_DEFAULT_WINDOW)
+        if window not in settings.TRENDS_WINDOWS:
+            return Response({
+                'success': False,
+                'message': 'window must be one of {}.'.format(', '.join(settings.TRENDS_WINDOWS)),
+            }, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            size = int(request.query_params.get('size', settings.TRENDS_TOP_K))
+        except ValueError:
+            size = settings.TRENDS_TOP_K
+        size = min(max(size, 1), settings.TRENDS_MAX_TOP_K)
+
+        trends = TrendService.get_trends(window, size)
+        serializer = TrendSerializer(
+            [{'hashtag': hashtag, 'count': count} for hashtag, count in trends],
+            many=True,
+        )
+        return Response({'window': window, 'trends': serializer.data})
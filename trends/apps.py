@@ -0,0 +1,12 @@
+from django.apps import AppConfig
+
+
+class TrendsConfig(AppConfig):
+    name = 'trends'
+
+    def ready(self):
+        from django.db.models.signals import post_save
+        from trends.listeners import count_hashtags
+        from tweets.models import Tweet
+
+        post_save.connect(count_hashtags, sender=Tweet)
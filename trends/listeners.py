@@ -0,0 +1,16 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from trends.services import TrendService
+from trends.tasks import recount_trends_task
+
+RECOUNT_LOCK_KEY = 'trends:recount:lock'
+
+
+def count_hashtags(sender, instance, created, **kwargs):
+    if not created or not TrendService.count_tweet(instance):
+        return
+    # the counts are made exact again at most every TRENDS_RECOUNT_INTERVAL
+    # seconds, as long as hashtags are used
+    if cache.add(RECOUNT_LOCK_KEY, 1, settings.TRENDS_RECOUNT_INTERVAL):
+        recount_trends_task.delay_later(settings.TRENDS_RECOUNT_INTERVAL)
@@ -0,0 +1,9 @@
+from django.core.management.base import BaseCommand
+from trends.tasks import recount_trends_task
+
+
+class Command(BaseCommand):
+    help = 'Count the hashtags of the trend windows again from the tweets.'
+
+    def handle(self, *args, **options):
+        self.stdout.write(recount_trends_task())
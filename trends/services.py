@@ -0,0 +1,190 @@
+import re
+from collections import Counter, defaultdict
+
+from django.conf import settings
+
+from utils.redis_client import RedisClient
+from utils.time_helpers import datetime_to_microseconds, utc_now
+
+HASHTAG_RE = re.compile(r'(?<![\w#])#(\w+)')
+# hashtags counted in each bucket of a window: hash of hashtag -> count
+BUCKET_KEY = 'trends:{window}:bucket:{start}'
+# hashtags counted in the buckets of a window: sorted set of hashtag -> count
+WINDOW_KEY = 'trends:{window}'
+# start of the oldest bucket counted in the sorted set of a window
+WINDOW_START_KEY = 'trends:{window}:start'
+
+
+def parse_hashtags(content):
+    # the distinct hashtags of a tweet, in lower case
+    return {hashtag.lower() for hashtag in HASHTAG_RE.findall(content)}
+
+
+def to_timestamp(value):
+    # seconds since the epoch
+    return datetime_to_microseconds(value) // 10 ** 6
+
+
+class TrendService(object):
+    """
+    counts the hashtags of the tweets over the sliding windows of
+    settings.TRENDS_WINDOWS. Each window counts its hashtags in buckets,
+    and keeps the total of the buckets in a sorted set which the top
+    hashtags are read from. The buckets leaving the window are subtracted
+    from the sorted set lazily, by the next reader or writer.
+    """
+
+    @classmethod
+    def get_bucket_start(cls, window, timestamp):
+        _, bucket_size = settings.TRENDS_WINDOWS[window]
+        return timestamp - timestamp % bucket_size
+
+    @classmethod
+    def get_window_start(cls, window, timestamp):
+        # start of the oldest bucket still in the window
+        window_size, bucket_size = settings.TRENDS_WINDOWS[window]
+        return cls.get_bucket_start(window, timestamp) - window_size + bucket_size
+
+    @classmethod
+    def get_bucket_expire_at(cls, window, bucket_start):
+        """
+        a bucket is kept until a window size after it has left the window,
+        whatever the writes to it: a window not slid for less than a window
+        size still finds every bucket to subtract, a longer gap drops the
+        whole sorted set anyway.
+        """
+        window_size, _ = settings.TRENDS_WINDOWS[window]
+        return bucket_start + 2 * window_size
+
+    @classmethod
+    def count_tweet(cls, tweet):
+        # returns whether the tweet has hashtags
+        hashtags = parse_hashtags(tweet.content)
+        if not hashtags:
+            return False
+        cls.incr(hashtags, to_timestamp(tweet.created_at))
+        return True
+
+    @classmethod
+    def incr(cls, hashtags, timestamp):
+        now = to_timestamp(utc_now())
+        conn = RedisClient.get_connection()
+        for window in settings.TRENDS_WINDOWS:
+            cls.slide_window(window, now)
+            if timestamp < cls.get_window_start(window, now):
+                continue
+            bucket_start = cls.get_bucket_start(window, timestamp)
+            bucket_key = BUCKET_KEY.format(window=window, start=bucket_start)
+            window_key = WINDOW_KEY.format(window=window)
+            pipe = conn.pipeline()
+            for hashtag in hashtags:
+                pipe.hincrby(bucket_key, hashtag, 1)
+                pipe.zincrby(window_key, 1, hashtag)
+            pipe.expireat(bucket_key, cls.get_bucket_expire_at(window, bucket_start))
+            pipe.execute()
+
+    @classmethod
+    def slide_window(cls, window, now):
+        """
+        subtract the buckets that left the window since the last slide from
+        its sorted set. Concurrent calls each subtract different buckets,
+        the window start is swapped atomically.
+        """
+        window_size, bucket_size = settings.TRENDS_WINDOWS[window]
+        conn = RedisClient.get_connection()
+        start_key = WINDOW_START_KEY.format(window=window)
+        window_key = WINDOW_KEY.format(window=window)
+        window_start = cls.get_window_start(window, now)
+        previous_start = conn.get(start_key)
+        if previous_start is not None and int(previous_start) >= window_start:
+            return
+        previous_start = conn.getset(start_key, window_start)
+        if previous_start is None or int(previous_start) <= window_start - window_size:
+            # every bucket counted in the sorted set has left the window
+            conn.delete(window_key)
+            return
+        previous_start = int(previous_start)
+        if previous_start >= window_start:
+            return
+
+        bucket_starts = range(previous_start, window_start, bucket_size)
+        pipe = conn.pipeline()
+        for bucket_start in bucket_starts:
+            pipe.hgetall(BUCKET_KEY.format(window=window, start=bucket_start))
+        expired = Counter()
+        for counts in pipe.execute():
+            expired.update({hashtag: int(count) for hashtag, count in counts.items()})
+        if not expired:
+            return
+        pipe = conn.pipeline()
+        for hashtag, count in expired.items():
+            pipe.zincrby(window_key, -count, hashtag)
+        pipe.zremrangebyscore(window_key, '-inf', 0)
+        pipe.execute()
+
+    @classmethod
+    def get_trends(cls, window, size):
+        """
+        the size most used hashtags of the window, [(hashtag, count)], in
+        O(log(n) + size) for n hashtags in the window.
+        """
+        cls.slide_window(window, to_timestamp(utc_now()))
+        conn = RedisClient.get_connection()
+        return [
+            (hashtag.decode(), int(count))
+            for hashtag, count in conn.zrevrange(
+                WINDOW_KEY.format(window=window),
+                0,
+                size - 1,
+                withscores=True,
+            )
+        ]
+
+    @classmethod
+    def set_counts(cls, counts_by_bucket, now):
+        """
+        replace the counts of every window with counts_by_bucket:
+        {window: {bucket start: {hashtag: count}}}.
+        """
+        conn = RedisClient.get_connection()
+        pipe = conn.pipeline()
+        for window, (window_size, bucket_size) in settings.TRENDS_WINDOWS.items():
+            window_start = cls.get_window_start(window, now)
+            window_key = WINDOW_KEY.format(window=window)
+            totals = Counter()
+            pipe.delete(window_key)
+            for bucket_start in range(window_start, window_start + window_size, bucket_size):
+                bucket_key = BUCKET_KEY.format(window=window, start=bucket_start)
+                pipe.delete(bucket_key)
+                counts = counts_by_bucket[window].get(bucket_start)
+                if not counts:
+                    continue
+                pipe.hset(bucket_key, mapping=counts)
+                pipe.expireat(bucket_key, cls.get_bucket_expire_at(window, bucket_start))
+                totals.update(counts)
+            if totals:
+                pipe.zadd(window_key, totals)
+            pipe.set(WINDOW_START_KEY.format(window=window), window_start)
+        pipe.execute()
+
+    @classmethod
+    def recount(cls, tweets, now):
+        """
+        count the hashtags of tweets, (created_at timestamp, content) most
+        recent first, in the windows ending at now, and replace the counts.
+        """
+        counts_by_bucket = defaultdict(lambda: defaultdict(Counter))
+        oldest_start = min(
+            cls.get_window_start(window, now)
+            for window in settings.TRENDS_WINDOWS
+        )
+        for timestamp, content in tweets:
+            if timestamp < oldest_start:
+                break
+            hashtags = parse_hashtags(content)
+            for window in settings.TRENDS_WINDOWS:
+                if timestamp < cls.get_window_start(window, now):
+                    continue
+                bucket_start = cls.get_bucket_start(window, timestamp)
+                counts_by_bucket[window][bucket_start].update(hashtags)
+        cls.set_counts(counts_by_bucket, now)
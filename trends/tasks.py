@@ -0,0 +1,40 @@
+from django.conf import settings
+
+from trends.services import TrendService, to_timestamp
+from tweets.models import Tweet
+from utils.tasks import task
+from utils.time_helpers import utc_now
+
+
+def iterate_recent_tweets(batch_size):
+    """
+    yields (created_at timestamp, content) of the tweets that are not
+    deleted, most recent first. The caller stops reading once past its
+    oldest window: the batches are read on the primary key, newest first,
+    without scanning the older tweets.
+    """
+    last_id = None
+    while True:
+        tweets = Tweet.objects.order_by('-id')
+        if last_id is not None:
+            tweets = tweets.filter(id__lt=last_id)
+        rows = list(tweets.values_list('id', 'created_at', 'content', 'is_deleted')[:batch_size])
+        if not rows:
+            return
+        for tweet_id, created_at, content, is_deleted in rows:
+            if not is_deleted:
+                yield to_timestamp(created_at), content
+        last_id = rows[-1][0]
+
+
+@task()
+def recount_trends_task():
+    """
+    count the hashtags of the windows again from the tweets, fixing the
+    counts of the deleted tweets or of the increments that were lost.
+    """
+    TrendService.recount(
+        iterate_recent_tweets(settings.TRENDS_RECOUNT_BATCH_SIZE),
+        to_timestamp(utc_now()),
+    )
+    return 'trends recounted.'
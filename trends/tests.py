@@ -0,0 +1,80 @@
+from datetime import timedelta
+from unittest import mock
+
+from testing.testcases import TestCase
+from trends.services import BUCKET_KEY, TrendService, parse_hashtags, to_timestamp
+from trends.tasks import recount_trends_task
+from tweets.services import TweetService
+from utils.redis_client import RedisClient
+from utils.time_helpers import utc_now
+
+# the buckets expire at absolute times of the redis clock, the mocked now
+# stays close to it
+NOW = utc_now().replace(minute=0, second=0, microsecond=0)
+
+
+class TrendServiceTests(TestCase):
+
+    def at(self, now):
+        return mock.patch('trends.services.utc_now', return_value=now)
+
+    def test_parse_hashtags(self):
+        self.assertEqual(
+            parse_hashtags('#Django and #django, #python3 a#b ##x #'),
+            {'django', 'python3'},
+        )
+        self.assertEqual(parse_hashtags('no hashtag'), set())
+
+    def test_sliding_windows(self):
+        with self.at(NOW):
+            TrendService.incr({'a'}, to_timestamp(NOW))
+            TrendService.incr({'a', 'b'}, to_timestamp(NOW))
+            self.assertEqual(TrendService.get_trends('5m', 10), [('a', 2), ('b', 1)])
+            self.assertEqual(TrendService.get_trends('5m', 1), [('a', 2)])
+
+        later = NOW + timedelta(minutes=5)
+        with self.at(later):
+            TrendService.incr({'b'}, to_timestamp(later))
+            self.assertEqual(TrendService.get_trends('5m', 10), [('b', 1)])
+            self.assertEqual(TrendService.get_trends('1h', 10), [('b', 2), ('a', 2)])
+
+        # every bucket left the windows
+        with self.at(NOW + timedelta(days=2)):
+            for window in ('5m', '1h', '24h'):
+                self.assertEqual(TrendService.get_trends(window, 10), [])
+
+    def test_bucket_expire_at(self):
+        # later writes do not push back the expiry of a bucket
+        bucket_key = BUCKET_KEY.format(window='1h', start=to_timestamp(NOW))
+        conn = RedisClient.get_connection()
+        with self.at(NOW):
+            TrendService.incr({'a'}, to_timestamp(NOW))
+        with self.at(NOW + timedelta(minutes=4)):
+            TrendService.incr({'a'}, to_timestamp(NOW))
+        expire_at = to_timestamp(NOW) + 2 * 3600
+        self.assertAlmostEqual(
+            conn.ttl(bucket_key),
+            expire_at - to_timestamp(utc_now()),
+            delta=2,
+        )
+
+    def test_recount(self):
+        user = self.create_user('user1')
+        self.create_tweet(user, 'learning #django')
+        self.create_tweet(user, '#django and #python')
+        tweet = self.create_tweet(user, '#python only')
+        TweetService.delete_tweet(tweet)
+        self.assertEqual(
+            TrendService.get_trends('1h', 10),
+            [('python', 2), ('django', 2)],
+        )
+
+        RedisClient.clear()
+        self.assertEqual(TrendService.get_trends('1h', 10), [])
+        recount_trends_task()
+        # the deleted tweet is not counted anymore
+        self.assertEqual(
+            TrendService.get_trends('1h', 10),
+            [('django', 2), ('python', 1)],
+        )
+        self.assertEqual(TrendService.get_trends('5m', 10), [('django', 2), ('python', 1)])
@@ -1,15 +1,47 @@
+from django.contrib.auth.models import AnonymousUser
 from rest_framework import serializers
 from accounts.api.serializers import UserSerializer
 from comments.api.serializers import CommentSerializer
+from likes.services import LikeService
 from tweets.models import Tweet
+from utils.serializers import FastListSerializer, TimedSerializerMixin
 
 
-class TweetSerializer(serializers.ModelSerializer):
+class TweetSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     user = UserSerializer()
+    has_liked = serializers.SerializerMethodField()
 
     class Meta:
         model = Tweet
-        fields = ('id', 'user', 'created_at', 'content')
+        list_serializer_class = FastListSerializer
+        fields = (
+            'id',
+            'user',
+            'created_at',
+            'content',
+            'comments_count',
+            'likes_count',
+            'has_liked',
+        )
+
+    def prepare_batch(self, tweets):
+        # whether the current user liked each tweet of the page, one query
+        self._liked_ids = LikeService.get_liked_ids(
+            self._get_current_user(),
+            Tweet,
+            [tweet.id for tweet in tweets],
+        )
+
+    def _get_current_user(self):
+        request = self.context.get('request')
+        if request is None:
+            return AnonymousUser()
+        return request.user
+
+    def get_has_liked(self, obj):
+        if not hasattr(self, '_liked_ids'):
+            return LikeService.has_liked(self._get_current_user(), obj)
+        return obj.id in self._liked_ids
 
 
 class TweetCreateSerializer(serializers.ModelSerializer):
@@ -27,19 +59,29 @@ class TweetCreateSerializer(serializers.ModelSerializer):
 
 
 class TweetSerializerWithComments(TweetSerializer):
-    comments = CommentSerializer(source='comment_set', many=True)
+    """
+    the comments to render are picked by the view and passed in
+    context['comments'], so that a tweet with many comments is never
+    loaded as a whole.
+    """
+    comments = serializers.SerializerMethodField()
 
     class Meta:
         model = Tweet
-        fields = ('id', 'user', 'comments', 'created_at', 'content')
+        fields = (
+            'id',
+            'user',
+            'comments',
+            'created_at',
+            'content',
+            'comments_count',
+            'likes_count',
+            'has_liked',
+        )
 
-    # Another way to do it - #TODO list
-    """
-    comments= serializers.SerializerMethodField()
-    class Meta:
-        model = Tweet
-        fields = ('id', 'user', 'created_at','content', 'comments')
-        
     def get_comments(self, obj):
-        return CommentSerializer(obj.comment_set.all(), many=True).data
-    """
+        return CommentSerializer(
+            self.context['comments'],
+            context=self.context,
+            many=True,
+        ).data
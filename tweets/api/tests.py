@@ -1,10 +1,27 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
+from django.test import override_settings
 from rest_framework.test import APIClient
 from testing.testcases import TestCase
+from tweets.api.views import TweetViewSet
 from tweets.models import Tweet
+from comments.models import Comment
+from friendships.models import Friendship
+from friendships.services import FriendshipService
+from likes.models import Like
+from newsfeeds.caches import NewsFeedCache
+from newsfeeds.models import NewsFeed
+from newsfeeds.services import NewsFeedService
+from utils.db_routers import ReplicaRouter
 
 TWEET_LIST_API = '/api/tweets/'
 TWEET_CREATE_API = '/api/tweets/'
 TWEET_RETRIEVE_API = '/api/tweets/{}/'
+TWEET_DELETE_API = '/api/tweets/{}/'
+NEWSFEEDS_URL = '/api/newsfeeds/'
+COMMENT_CREATE_API = '/api/comments/'
 
 
 class TweetApiTests(TestCase):
@@ -76,3 +93,352 @@ class TweetApiTests(TestCase):
         self.create_comment(self.user1, tweet, 'another comment from user#1')
         response = self.anonymous_client.get(url)
         self.assertEqual(len(response.data['comments']), 2)
+
+    def test_list_pagination(self):
+        tweets = [self.create_tweet(self.user2) for i in range(3)]
+        tweets = self.tweets2 + tweets
+
+        # most recent first
+        response = self.anonymous_client.get(TWEET_LIST_API, {
+            'user_id': self.user2.id,
+            'size': 2,
+        })
+        self.assertEqual(response.data['has_next_page'], True)
+        self.assertEqual(
+            [tweet['id'] for tweet in response.data['tweets']],
+            [tweets[4].id, tweets[3].id],
+        )
+
+        # load older tweets with the created_at of the last tweet
+        response = self.anonymous_client.get(TWEET_LIST_API, {
+            'user_id': self.user2.id,
+            'size': 2,
+            'created_at__lt': response.data['tweets'][-1]['created_at'],
+        })
+        self.assertEqual(response.data['has_next_page'], True)
+        self.assertEqual(
+            [tweet['id'] for tweet in response.data['tweets']],
+            [tweets[2].id, tweets[1].id],
+        )
+        response = self.anonymous_client.get(TWEET_LIST_API, {
+            'user_id': self.user2.id,
+            'size': 2,
+            'created_at__lt': response.data['tweets'][-1]['created_at'],
+        })
+        self.assertEqual(response.data['has_next_page'], False)
+        self.assertEqual(response.data['tweets'][0]['id'], tweets[0].id)
+
+        # refresh with the created_at of the newest tweet
+        newest = self.create_tweet(self.user2)
+        response = self.anonymous_client.get(TWEET_LIST_API, {
+            'user_id': self.user2.id,
+            'created_at__gt': tweets[4].created_at.isoformat(),
+        })
+        self.assertEqual(response.data['has_next_page'], False)
+        self.assertEqual(len(response.data['tweets']), 1)
+        self.assertEqual(response.data['tweets'][0]['id'], newest.id)
+
+        # 400 for an invalid cursor
+        for cursor in ('yesterday', '2020-13-45T00:00:00', '2020-12-01T00:00:00Z,abc'):
+            response = self.anonymous_client.get(TWEET_LIST_API, {
+                'user_id': self.user2.id,
+                'created_at__lt': cursor,
+            })
+            self.assertEqual(response.status_code, 400)
+
+    def test_pagination_of_same_time_tweets(self):
+        user = self.create_user('user3')
+        tweets = [self.create_tweet(user) for i in range(5)]
+        Tweet.objects.filter(user=user).update(created_at=tweets[0].created_at)
+        tweet_ids = []
+        params = {'user_id': user.id, 'size': 2}
+        while True:
+            response = self.anonymous_client.get(TWEET_LIST_API, params)
+            tweet_ids += [tweet['id'] for tweet in response.data['tweets']]
+            if not response.data['has_next_page']:
+                break
+            last = response.data['tweets'][-1]
+            params['created_at__lt'] = '{},{}'.format(last['created_at'], last['id'])
+        # split by id, none is skipped or repeated
+        self.assertEqual(tweet_ids, [tweet.id for tweet in reversed(tweets)])
+
+    @override_settings(TWEET_PREVIEW_COMMENTS_SIZE=2)
+    def test_retrieve_comments_modes(self):
+        tweet = self.create_tweet(self.user1)
+        comments = [
+            self.create_comment(self.create_user('commenter{}'.format(i)), tweet, str(i))
+            for i in range(5)
+        ]
+        url = TWEET_RETRIEVE_API.format(tweet.id)
+
+        # preview: the first comments only, authors loaded in one query
+        with self.assertNumQueries(4):
+            response = self.anonymous_client.get(url, {'with_preview_comments': 1})
+        self.assertEqual([c['content'] for c in response.data['comments']], ['0', '1'])
+        self.assertEqual(response.data['comments_count'], 5)
+        response = self.anonymous_client.get(url)
+        self.assertEqual(len(response.data['comments']), 2)
+
+        # all comments, oldest first, paginated with created_at__gt
+        response = self.anonymous_client.get(url, {'with_all_comments': 1, 'size': 3})
+        self.assertEqual([c['content'] for c in response.data['comments']], ['0', '1', '2'])
+        self.assertEqual(response.data['has_next_page'], True)
+        response = self.anonymous_client.get(url, {
+            'with_all_comments': 1,
+            'size': 3,
+            'created_at__gt': response.data['comments'][-1]['created_at'],
+        })
+        self.assertEqual([c['id'] for c in response.data['comments']], [comments[3].id, comments[4].id])
+        self.assertEqual(response.data['has_next_page'], False)
+
+
+class TweetDeleteApiTests(TestCase):
+
+    def setUp(self):
+        self.user1 = self.create_user('user1')
+        self.user1_client = APIClient()
+        self.user1_client.force_authenticate(self.user1)
+        self.user2 = self.create_user('user2')
+        self.user2_client = APIClient()
+        self.user2_client.force_authenticate(self.user2)
+        Friendship.objects.create(from_user=self.user2, to_user=self.user1)
+
+        self.tweet = self.create_tweet(self.user1)
+        NewsFeedService.fanout_to_followers(self.tweet)
+        comment = self.create_comment(self.user2, self.tweet)
+        for user, target in [(self.user1, comment), (self.user2, self.tweet)]:
+            Like.objects.create(
+                user=user,
+                content_type=ContentType.objects.get_for_model(target.__class__),
+                object_id=target.id,
+            )
+
+    def test_delete(self):
+        url = TWEET_DELETE_API.format(self.tweet.id)
+        response = self.anonymous_client.delete(url)
+        self.assertEqual(response.status_code, 403)
+        response = self.user2_client.delete(url)
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response.data['success'], False)
+
+        response = self.user1_client.delete(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Tweet.objects.get(id=self.tweet.id).is_deleted, True)
+        # the cleanup removed what refers to the tweet
+        self.assertEqual(NewsFeed.objects.filter(tweet_id=self.tweet.id).count(), 0)
+        self.assertEqual(Comment.objects.filter(tweet_id=self.tweet.id).count(), 0)
+        self.assertEqual(Like.objects.count(), 0)
+
+        response = self.anonymous_client.get(TWEET_LIST_API, {'user_id': self.user1.id})
+        self.assertEqual(response.data['tweets'], [])
+        response = self.anonymous_client.get(TWEET_RETRIEVE_API.format(self.tweet.id))
+        self.assertEqual(response.status_code, 404)
+        response = self.user1_client.delete(url)
+        self.assertEqual(response.status_code, 404)
+        response = self.user2_client.post(COMMENT_CREATE_API, {
+            'tweet_id': self.tweet.id,
+            'content': 'too late',
+        })
+        self.assertEqual(response.status_code, 400)
+
+    def test_deleted_tweet_hidden_from_newsfeeds(self):
+        other_tweet = self.create_tweet(self.user1)
+        NewsFeedService.fanout_to_followers(other_tweet)
+        # soft deleted, before the cleanup task ran
+        Tweet.objects.filter(id=self.tweet.id).update(is_deleted=True)
+        response = self.user2_client.get(NEWSFEEDS_URL)
+        self.assertEqual(
+            [newsfeed['tweet']['id'] for newsfeed in response.data['newsfeeds']],
+            [other_tweet.id],
+        )
+
+    def test_deleted_tweets_do_not_shorten_newsfeed_pages(self):
+        tweets = [self.tweet]
+        for i in range(4):
+            tweets.append(self.create_tweet(self.user1))
+            NewsFeedService.fanout_to_followers(tweets[-1])
+        # newest first: 4 3 2 1 0, with 3 and 1 soft deleted
+        Tweet.objects.filter(id__in=[tweets[3].id, tweets[1].id]).update(is_deleted=True)
+        response = self.user2_client.get(NEWSFEEDS_URL, {'size': 2})
+        self.assertEqual(
+            [newsfeed['tweet']['id'] for newsfeed in response.data['newsfeeds']],
+            [tweets[4].id, tweets[2].id],
+        )
+        self.assertEqual(response.data['has_next_page'], True)
+        last = response.data['newsfeeds'][-1]
+        response = self.user2_client.get(NEWSFEEDS_URL, {
+            'size': 2,
+            'created_at__lt': '{},{}'.format(last['created_at'], last['tweet']['id']),
+        })
+        self.assertEqual(
+            [newsfeed['tweet']['id'] for newsfeed in response.data['newsfeeds']],
+            [tweets[0].id],
+        )
+        self.assertEqual(response.data['has_next_page'], False)
+
+    def test_delete_removes_tweet_from_cached_inboxes(self):
+        other_tweet = self.create_tweet(self.user1)
+        NewsFeedService.fanout_to_followers(other_tweet)
+        # the inbox of user2 is cached by the first read
+        self.user2_client.get(NEWSFEEDS_URL)
+        self.user1_client.delete(TWEET_DELETE_API.format(self.tweet.id))
+        # the other entries stay cached
+        with self.assertNumQueries(0):
+            newsfeeds = NewsFeedCache.get_inbox(self.user2.id)
+        self.assertEqual([newsfeed.tweet_id for newsfeed in newsfeeds], [other_tweet.id])
+
+    @override_settings(NEWSFEED_CELEBRITY_THRESHOLD=1)
+    def test_delete_celebrity_tweet_skips_followers(self):
+        tweet = self.create_tweet(self.user1)
+        NewsFeedService.fanout_to_followers(tweet)
+        with mock.patch.object(FriendshipService, 'iterate_follower_ids') as iterate_follower_ids:
+            self.user1_client.delete(TWEET_DELETE_API.format(tweet.id))
+        iterate_follower_ids.assert_not_called()
+        self.assertEqual(NewsFeed.objects.filter(tweet_id=tweet.id).count(), 0)
+
+
+class TweetConditionalGetTests(TestCase):
+
+    def setUp(self):
+        self.user1 = self.create_user('user1')
+        self.user1_client = APIClient()
+        self.user1_client.force_authenticate(self.user1)
+        self.tweet = self.create_tweet(self.user1)
+
+    def assertNotModified(self, client, url, etag, params=None):
+        response = client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(response.content, b'')
+
+    def test_list(self):
+        params = {'user_id': self.user1.id}
+        response = self.anonymous_client.get(TWEET_LIST_API, params)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.assertNotIn('Last-Modified', response)
+        # the body is not rendered again, no query at all
+        with self.assertNumQueries(0):
+            self.assertNotModified(self.anonymous_client, TWEET_LIST_API, etag, params)
+        # another page is another response
+        response = self.anonymous_client.get(
+            TWEET_LIST_API,
+            {'user_id': self.user1.id, 'size': 1},
+            HTTP_IF_NONE_MATCH=etag,
+        )
+        self.assertEqual(response.status_code, 200)
+
+        self.create_tweet(self.user1)
+        response = self.anonymous_client.get(TWEET_LIST_API, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['tweets']), 2)
+        self.assertNotModified(self.anonymous_client, TWEET_LIST_API, response['ETag'], params)
+
+    def test_retrieve(self):
+        url = TWEET_RETRIEVE_API.format(self.tweet.id)
+        etag = self.user1_client.get(url)['ETag']
+        self.assertNotModified(self.user1_client, url, etag)
+
+        # has_liked of the viewer changed
+        self.user1_client.post('/api/likes/', {'content_type': 'tweet', 'object_id': self.tweet.id})
+        response = self.user1_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['has_liked'], True)
+        etag = response['ETag']
+
+        self.create_comment(self.user1, self.tweet)
+        response = self.user1_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['comments']), 1)
+
+
+class TweetReplicaReadTests(TestCase):
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        self.user1 = self.create_user('user1', 'user1@gmail.com')
+        self.user1_client = APIClient()
+        self.user1_client.force_authenticate(self.user1)
+        self.create_tweet(self.user1, 'on the primary')
+        # a replica that has not caught up with the primary
+        User.objects.using('replica').create(
+            id=self.user1.id,
+            username=self.user1.username,
+        )
+        Tweet.objects.using('replica').create(user_id=self.user1.id, content='lagging')
+
+    @override_settings(DATABASE_REPLICAS=['replica'])
+    def test_list_reads_from_replica(self):
+        response = self.anonymous_client.get(TWEET_LIST_API, {'user_id': self.user1.id})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['tweets'][0]['content'], 'lagging')
+
+        # writes always go to the primary and pin the user there
+        response = self.user1_client.post(TWEET_CREATE_API, {'content': 'hello world'})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Tweet.objects.using('replica').count(), 1)
+        response = self.user1_client.get(TWEET_LIST_API, {'user_id': self.user1.id})
+        self.assertEqual(len(response.data['tweets']), 2)
+        self.assertEqual(response.data['tweets'][0]['content'], 'hello world')
+
+    @override_settings(DATABASE_REPLICAS=['replica'])
+    def test_no_etag_before_replication(self):
+        # the tweet list version is more recent than the replication lag,
+        # the replica body may not include the last tweet yet
+        response = self.anonymous_client.get(TWEET_LIST_API, {'user_id': self.user1.id})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('ETag', response)
+        with self.settings(REPLICA_PIN_SECONDS=0):
+            response = self.anonymous_client.get(TWEET_LIST_API, {'user_id': self.user1.id})
+        self.assertIn('ETag', response)
+
+    def test_no_replica_configured(self):
+        response = self.anonymous_client.get(TWEET_LIST_API, {'user_id': self.user1.id})
+        self.assertEqual(response.data['tweets'][0]['content'], 'on the primary')
+
+    @override_settings(DATABASE_REPLICAS=['replica'])
+    def test_replica_left_when_view_raises(self):
+        with mock.patch.object(TweetViewSet, 'list', side_effect=RuntimeError('boom')):
+            with self.assertRaises(RuntimeError):
+                self.anonymous_client.get(TWEET_LIST_API, {'user_id': self.user1.id})
+        # the thread reads from the primary again
+        self.assertEqual(ReplicaRouter().db_for_read(Tweet), 'default')
+
+
+class TweetQueryBudgetTests(TestCase):
+
+    def setUp(self):
+        self.author = self.create_user('author')
+        self.viewer = self.create_user('viewer')
+        self.viewer_client = APIClient()
+        self.viewer_client.force_authenticate(self.viewer)
+
+    def test_list(self):
+        def render():
+            response = self.viewer_client.get(TWEET_LIST_API, {'user_id': self.author.id, 'size': 100})
+            return response.data['tweets']
+
+        self.assertConstantQueries(
+            lambda count: self.create_tweets([self.author] * count),
+            render,
+        )
+
+    def test_retrieve(self):
+        tweet = self.create_tweet(self.author)
+
+        def add_comments(count):
+            # a new author for every comment, the worst case
+            users = self.create_users(count, prefix='user{}_'.format(Comment.objects.count()))
+            Comment.objects.bulk_create([
+                Comment(user=user, tweet=tweet, content='comment')
+                for user in users
+            ])
+
+        def render():
+            response = self.viewer_client.get(
+                TWEET_RETRIEVE_API.format(tweet.id),
+                {'with_all_comments': 1, 'size': 100},
+            )
+            return response.data['comments']
+
+        self.assertConstantQueries(add_comments, render)
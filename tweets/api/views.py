@@ -1,3 +1,5 @@
+from django.conf import settings
+from rest_framework.renderers import BrowsableAPIRenderer
 from rest_framework.response import Response
 from rest_framework import viewsets
 from rest_framework.permissions import AllowAny, IsAuthenticated
@@ -6,19 +8,41 @@ from tweets.api.serializers import (
     TweetSerializer,
     TweetSerializerWithComments,
 )
+from comments.models import Comment
 from tweets.models import Tweet
+from tweets.services import TweetService
 from newsfeeds.services import NewsFeedService
+from utils.db_routers import ReplicaReadMixin
 from utils.decorators import required_params
+from utils.http_cache import (
+    COMMENTS_SCOPE,
+    LIKES_SCOPE,
+    TWEET_SCOPE,
+    TWEETS_SCOPE,
+    conditional_get,
+)
+from utils.renderers import FastJSONRenderer
+from utils.paginations import AscendingEndlessPagination, EndlessPagination
+
 
+def viewer_scopes(request):
+    # has_liked depends on what the viewer liked
+    if request.user.is_anonymous:
+        return []
+    return [LIKES_SCOPE.format(user_id=request.user.id)]
 
-class TweetViewSet(viewsets.GenericViewSet,
+
+class TweetViewSet(ReplicaReadMixin,
+                   viewsets.GenericViewSet,
                    viewsets.mixins.CreateModelMixin,
                    viewsets.mixins.ListModelMixin):
     """
-    API endpoint that allows users to create, list tweets
+    API endpoint that allows users to create, list and delete tweets
     """
-    queryset = Tweet.objects.all()
+    queryset = Tweet.objects.filter(is_deleted=False)
+    renderer_classes = (FastJSONRenderer, BrowsableAPIRenderer)
     serializer_class = TweetCreateSerializer
+    pagination_class = EndlessPagination
 
     def get_permissions(self):
         if self.action in ['list', 'retrieve']:
@@ -26,6 +50,9 @@ class TweetViewSet(viewsets.GenericViewSet,
         return [IsAuthenticated()]
 
     @required_params(params=['user_id'])
+    @conditional_get(lambda request, *args, **kwargs: viewer_scopes(request) + [
+        TWEETS_SCOPE.format(user_id=request.query_params['user_id']),
+    ])
     def list(self, request, *args, **kwargs):
 
         """
@@ -34,17 +61,44 @@ class TweetViewSet(viewsets.GenericViewSet,
         if 'user_id' not in request.query_params:
             return Response('missing user_id', status=400)
         """
-        tweets = Tweet.objects.filter(
-            user_id=request.query_params['user_id']
-        ).order_by('-created_at')
-        serializer = TweetSerializer(tweets, many=True)
-        return Response({'tweets': serializer.data})
+        tweets = self.paginate_queryset(Tweet.objects.filter(
+            user_id=request.query_params['user_id'],
+            is_deleted=False,
+        ))
+        serializer = TweetSerializer(
+            tweets,
+            context={'request': request},
+            many=True,
+        )
+        return self.paginator.get_paginated_response(serializer.data, 'tweets')
 
+    @conditional_get(lambda request, *args, **kwargs: viewer_scopes(request) + [
+        TWEET_SCOPE.format(tweet_id=kwargs['pk']),
+        COMMENTS_SCOPE.format(tweet_id=kwargs['pk']),
+    ])
     def retrieve(self, request, *args, **kwargs):
-        # use query & param: with_all_comments to determine whether to get all comments #TODO
-        # query & param: with_preview_comments to determine whether to get first 3 comments #TODO
+        """
+        - with_all_comments: comments are paginated with created_at__gt cursors
+        - with_preview_comments (default): the first comments only
+        """
         tweet = self.get_object()
-        return Response(TweetSerializerWithComments(tweet).data)
+        # served by the (tweet, created_at) index
+        comments = Comment.objects.filter(tweet_id=tweet.id)
+        if 'with_all_comments' in request.query_params:
+            paginator = AscendingEndlessPagination()
+            page = paginator.paginate_queryset(comments, request)
+            data = TweetSerializerWithComments(
+                tweet,
+                context={'request': request, 'comments': page},
+            ).data
+            data['has_next_page'] = paginator.has_next_page
+            return Response(data)
+
+        comments = comments.order_by('created_at')[:settings.TWEET_PREVIEW_COMMENTS_SIZE]
+        return Response(TweetSerializerWithComments(
+            tweet,
+            context={'request': request, 'comments': comments},
+        ).data)
 
     def create(self, request, *args, **kwargs):
         # override create method
@@ -60,9 +114,17 @@ class TweetViewSet(viewsets.GenericViewSet,
             }, status=400)
         tweet = serializer.save()
         NewsFeedService.fanout_to_followers(tweet)
-        return Response(TweetSerializer(tweet).data, status=201)
-
-
-
-
+        return Response(
+            TweetSerializer(tweet, context={'request': request}).data,
+            status=201,
+        )
 
+    def destroy(self, request, *args, **kwargs):
+        tweet = self.get_object()
+        if tweet.user_id != request.user.id:
+            return Response({
+                'success': False,
+                'message': 'You can only delete your own tweets.',
+            }, status=403)
+        TweetService.delete_tweet(tweet)
+        return Response({'success': True})
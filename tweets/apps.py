@@ -3,3 +3,10 @@ from django.apps import AppConfig
 
 class TweetsConfig(AppConfig):
     name = 'tweets'
+
+    def ready(self):
+        from django.db.models.signals import post_save
+        from tweets.listeners import bump_tweet_versions
+        from tweets.models import Tweet
+
+        post_save.connect(bump_tweet_versions, sender=Tweet)
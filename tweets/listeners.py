@@ -0,0 +1,8 @@
+from utils.http_cache import TWEET_SCOPE, TWEETS_SCOPE, bump_versions
+
+
+def bump_tweet_versions(sender, instance, **kwargs):
+    bump_versions(
+        TWEETS_SCOPE.format(user_id=instance.user_id),
+        TWEET_SCOPE.format(tweet_id=instance.id),
+    )
@@ -0,0 +1,118 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from django.contrib.contenttypes.models import ContentType
+
+from accounts.models import UserStats
+from comments.models import Comment
+from friendships.models import Friendship
+from likes.models import Like
+from likes.tasks import flush_likes_count_task
+from tweets.models import Tweet
+
+
+def iterate_id_batches(queryset, batch_size):
+    # keyset iteration on the primary key, no OFFSET scans
+    last_id = 0
+    while True:
+        ids = list(
+            queryset.filter(id__gt=last_id)
+            .order_by('id')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return
+        yield ids
+        last_id = ids[-1]
+
+
+def count_likes(model, ids):
+    return count_by(
+        Like.objects.filter(content_type=ContentType.objects.get_for_model(model)),
+        'object_id',
+        ids,
+    )
+
+
+def count_by(queryset, field, ids):
+    return dict(
+        queryset.filter(**{'{}__in'.format(field): ids})
+        .values(field)
+        .annotate(count=Count('id'))
+        .values_list(field, 'count')
+    )
+
+
+class Command(BaseCommand):
+    help = 'Repair the denormalized counters of tweets, comments and users, in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        # buffered likes would be counted twice otherwise
+        flush_likes_count_task()
+        tweets_repaired = 0
+        for ids in iterate_id_batches(Tweet.objects.all(), batch_size):
+            tweets_repaired += self.reconcile_objects(Tweet, ids, {
+                'comments_count': count_by(Comment.objects.all(), 'tweet_id', ids),
+                'likes_count': count_likes(Tweet, ids),
+            })
+        comments_repaired = 0
+        for ids in iterate_id_batches(Comment.objects.all(), batch_size):
+            comments_repaired += self.reconcile_objects(Comment, ids, {
+                'likes_count': count_likes(Comment, ids),
+            })
+        users_repaired = 0
+        for ids in iterate_id_batches(User.objects.all(), batch_size):
+            users_repaired += self.reconcile_users(ids)
+        self.stdout.write('{} tweets, {} comments and {} users repaired.'.format(
+            tweets_repaired,
+            comments_repaired,
+            users_repaired,
+        ))
+
+    def reconcile_objects(self, model, ids, actual_counts):
+        """
+        actual_counts: {counter field: {object id: actual count}}
+        """
+        fields = list(actual_counts.keys())
+        repaired = 0
+        for row in model.objects.filter(id__in=ids).values('id', *fields):
+            counts = {
+                field: actual_counts[field].get(row['id'], 0)
+                for field in fields
+            }
+            if all(row[field] == counts[field] for field in fields):
+                continue
+            model.objects.filter(id=row['id']).update(**counts)
+            repaired += 1
+        return repaired
+
+    def reconcile_users(self, ids):
+        followers_counts = count_by(Friendship.objects.all(), 'to_user_id', ids)
+        followings_counts = count_by(Friendship.objects.all(), 'from_user_id', ids)
+        stats = {
+            user_stats.user_id: user_stats
+            for user_stats in UserStats.objects.filter(user_id__in=ids)
+        }
+        missing_stats = []
+        repaired = 0
+        for user_id in ids:
+            counts = {
+                'followers_count': followers_counts.get(user_id, 0),
+                'followings_count': followings_counts.get(user_id, 0),
+            }
+            if user_id not in stats:
+                missing_stats.append(UserStats(user_id=user_id, **counts))
+                continue
+            user_stats = stats[user_id]
+            if user_stats.followers_count == counts['followers_count'] \
+                    and user_stats.followings_count == counts['followings_count']:
+                continue
+            UserStats.objects.filter(user_id=user_id).update(**counts)
+            repaired += 1
+        UserStats.objects.bulk_create(missing_stats, ignore_conflicts=True)
+        return repaired + len(missing_stats)
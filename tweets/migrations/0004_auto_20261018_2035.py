@@ -0,0 +1,23 @@
+# Generated by Django 3.1.3 on 2026-10-18 20:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tweets', '0003_auto_20261018_2018'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tweet',
+            name='deleted_at',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.AddField(
+            model_name='tweet',
+            name='is_deleted',
+            field=models.BooleanField(default=False),
+        ),
+    ]
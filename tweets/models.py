@@ -8,6 +8,15 @@ class Tweet(models.Model):
     content = models.CharField(max_length=255)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # denormalized counters, maintained with F() expressions
+    comments_count = models.IntegerField(default=0)
+    likes_count = models.IntegerField(default=0)
+
+    # deleted tweets are hidden right away, what refers to them is removed
+    # later by delete_tweet_task
+    is_deleted = models.BooleanField(default=False)
+    deleted_at = models.DateTimeField(null=True)
+
     class Meta:
         index_together = (('user', 'created_at'),)
         ordering = ('user', '-created_at')
@@ -0,0 +1,23 @@
+from django.utils import timezone
+
+from tweets.listeners import bump_tweet_versions
+from tweets.models import Tweet
+from tweets.tasks import delete_tweet_task
+
+
+class TweetService(object):
+
+    @classmethod
+    def delete_tweet(cls, tweet):
+        """
+        hide the tweet with a single row update, its newsfeeds, comments and
+        likes are removed in the background.
+        """
+        tweet.is_deleted = True
+        tweet.deleted_at = timezone.now()
+        Tweet.objects.filter(id=tweet.id).update(
+            is_deleted=True,
+            deleted_at=tweet.deleted_at,
+        )
+        bump_tweet_versions(Tweet, tweet)
+        delete_tweet_task.delay(tweet.id)
@@ -0,0 +1,75 @@
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+
+from comments.models import Comment
+from friendships.services import FriendshipService
+from likes.models import Like
+from newsfeeds.caches import NewsFeedCache
+from newsfeeds.services import NewsFeedService
+from newsfeeds.storages import NEWSFEED_TABLE
+from search.services import SearchService
+from tweets.models import Tweet
+from utils.tasks import task
+
+
+def delete_in_batches(queryset, batch_size, before_delete=None):
+    """
+    delete the rows of queryset by primary key, batch_size rows per
+    statement, so that no statement holds many row locks.
+    """
+    deleted = 0
+    while True:
+        ids = list(queryset.values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        if before_delete is not None:
+            before_delete(ids)
+        queryset.model.objects.filter(id__in=ids).delete()
+        deleted += len(ids)
+
+
+@task()
+def delete_tweet_task(tweet_id):
+    """
+    remove the newsfeeds, search postings, comments and likes of a soft
+    deleted tweet in batches of TWEET_CLEANUP_BATCH_SIZE.
+    """
+    tweet = Tweet.objects.filter(id=tweet_id, is_deleted=True).first()
+    if tweet is None:
+        return 'tweet {} is not deleted.'.format(tweet_id)
+    batch_size = settings.TWEET_CLEANUP_BATCH_SIZE
+
+    # the tweet was fanned out to the followers of its author, and
+    # backfilled into the inboxes of the later followers. It is removed from
+    # the cached inboxes that held it, the reads refresh their expiry and
+    # would keep it there.
+    NewsFeedCache.remove_newsfeeds(NEWSFEED_TABLE.delete_from_rows([tweet.user_id], tweet.id))
+    # celebrities' tweets are pulled at read time, neither fanned out nor
+    # backfilled. The ones pushed before their author crossed the threshold
+    # stay in the inboxes, hidden by the readers.
+    if not NewsFeedService.is_celebrity(tweet.user_id):
+        for follower_ids in FriendshipService.iterate_follower_ids(tweet.user_id, batch_size):
+            NewsFeedCache.remove_newsfeeds(NEWSFEED_TABLE.delete_from_rows(follower_ids, tweet.id))
+    SearchService.unindex_tweet(tweet)
+
+    comment_type = ContentType.objects.get_for_model(Comment)
+    comments_count = delete_in_batches(
+        Comment.objects.filter(tweet_id=tweet.id),
+        batch_size,
+        before_delete=lambda comment_ids: Like.objects.filter(
+            content_type=comment_type,
+            object_id__in=comment_ids,
+        ).delete(),
+    )
+    likes_count = delete_in_batches(
+        Like.objects.filter(
+            content_type=ContentType.objects.get_for_model(Tweet),
+            object_id=tweet.id,
+        ),
+        batch_size,
+    )
+    return '{} comments and {} likes of tweet {} deleted.'.format(
+        comments_count,
+        likes_count,
+        tweet.id,
+    )
@@ -1,7 +1,12 @@
 from django.test import TestCase
 from django.contrib.auth.models import User
+from django.core.management import call_command
+from accounts.models import UserStats
+from friendships.models import Friendship
+from testing.testcases import TestCase as BaseTestCase
 from tweets.models import Tweet
 from datetime import timedelta
+from io import StringIO
 from utils.time_helpers import utc_now
 
 
@@ -15,4 +20,28 @@ class TweetTests(TestCase):
         self.assertEqual(tweet.hours_to_now, 10)
 
 
+class ReconcileCountersTests(BaseTestCase):
 
+    def test_reconcile_counters(self):
+        linghu = self.create_user('linghu')
+        dongxie = self.create_user('dongxie')
+        Friendship.objects.create(from_user=dongxie, to_user=linghu)
+        tweets = [self.create_tweet(linghu) for i in range(3)]
+        for tweet in tweets[:2]:
+            self.create_comment(dongxie, tweet)
+
+        # simulate drift and a user created before stats existed
+        Tweet.objects.filter(id=tweets[0].id).update(comments_count=5)
+        Tweet.objects.filter(id=tweets[2].id).update(comments_count=-1)
+        UserStats.objects.filter(user=linghu).update(followers_count=0)
+        UserStats.objects.filter(user=dongxie).delete()
+
+        out = StringIO()
+        call_command('reconcile_counters', batch_size=2, stdout=out)
+        self.assertEqual(out.getvalue().strip(), '2 tweets, 0 comments and 2 users repaired.')
+        self.assertEqual(
+            list(Tweet.objects.filter(user=linghu).order_by('id').values_list('comments_count', flat=True)),
+            [1, 1, 0],
+        )
+        self.assertEqual(UserStats.objects.get(user=linghu).followers_count, 1)
+        self.assertEqual(UserStats.objects.get(user=dongxie).followings_count, 1)
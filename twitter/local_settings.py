@@ -0,0 +1,10 @@
+import sys
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': 'db.sqlite3',
+    }
+}
+if len(sys.argv) > 1 and sys.argv[1] == 'test':
+    DATABASES['replica'] = {'ENGINE': 'django.db.backends.sqlite3', 'NAME': 'replica.sqlite3'}
+    DATABASES['newsfeeds_shard_1'] = {'ENGINE': 'django.db.backends.sqlite3', 'NAME': 'newsfeeds_shard_1.sqlite3'}
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/3.1/ref/settings/
 """
 
+import sys
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -25,6 +26,9 @@ SECRET_KEY = 'e$x5v!@^r0de2au8u^#y7*lpki_kz625e)jurmp$j&67crxhgf'
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = True
 
+# unit tests run tasks synchronously and use local in-memory services.
+TESTING = len(sys.argv) > 1 and sys.argv[1] == 'test'
+
 ALLOWED_HOSTS = ['127.0.0.1', '192.168.33.10', 'localhost']
 INTERNAL_IPS = ['10.0.2.2', '127.0.0.1']
 
@@ -45,11 +49,15 @@ INSTALLED_APPS = [
     'django_filters',
     
     # Project apps
-    'accounts',
-    'tweets',
-    'friendships',
-    'newsfeeds',
-    'comments',
+    'accounts.apps.AccountsConfig',
+    'tweets.apps.TweetsConfig',
+    'friendships.apps.FriendshipsConfig',
+    'newsfeeds.apps.NewsfeedsConfig',
+    'comments.apps.CommentsConfig',
+    'likes',
+    'trends.apps.TrendsConfig',
+    'search.apps.SearchConfig',
+    'benchmarks',
 ]
 
 REST_FRAMEWORK = {
@@ -63,6 +71,8 @@ REST_FRAMEWORK = {
 
 
 MIDDLEWARE = [
+    'utils.metrics.MetricsMiddleware',
+    'utils.db_pool.ConnectionPoolMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -105,8 +115,36 @@ DATABASES = {
         'PORT': '3306',
         'USER': 'root',
         'PASSWORD': 'yourpassword',    # 这里是自己下载mysql时候输入两次的那个密码
-    }
+        # seconds a connection is kept open and reused by the next requests
+        'CONN_MAX_AGE': 60,
+        # ping reused connections at the start of each request
+        'CONN_HEALTH_CHECKS': True,
+    },
+    # read replicas are configured like the primary, e.g.
+    # 'replica': {'ENGINE': 'django.db.backends.mysql', 'NAME': 'twitter', 'HOST': ...},
 }
+if TESTING:
+    # a second database standing in for a read replica in unit tests
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'replica.sqlite3',
+    }
+    # a second newsfeeds shard
+    DATABASES['newsfeeds_shard_1'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'newsfeeds_shard_1.sqlite3',
+    }
+
+DATABASE_ROUTERS = ['utils.db_routers.ReplicaRouter']
+# aliases in DATABASES receiving the safe reads of list / retrieve actions
+DATABASE_REPLICAS = []
+# seconds a user keeps reading from the primary after a write
+REPLICA_PIN_SECONDS = 5
+# max number of threads of a worker process querying the databases at the
+# same time, and of connections they keep open between requests and tasks
+DATABASE_POOL_SIZE = 20
+# seconds a request waits for a free connection before failing with 503
+DATABASE_POOL_TIMEOUT = 10
 
 
 
@@ -148,6 +186,141 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 
+# Caches
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+        'LOCATION': '127.0.0.1:11211',
+        'TIMEOUT': 86400,
+    },
+}
+if TESTING:
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'TIMEOUT': 86400,
+    }
+
+# Redis
+REDIS_HOST = '127.0.0.1'
+REDIS_PORT = 6379
+REDIS_DB = 0 if TESTING else 1
+
+# Users
+# users are cached in a per-process LRU in front of the shared cache
+USER_LOCAL_CACHE_SIZE = 10000
+# seconds, bounds how long another process' invalidation can go unnoticed
+USER_LOCAL_CACHE_TIMEOUT = 60
+USER_CACHE_TIMEOUT = 86400
+# number of users served by /api/users/typeahead/ by default, and at most
+USER_TYPEAHEAD_SIZE = 10
+USER_TYPEAHEAD_MAX_SIZE = 50
+# prefixes matching more users than this are ranked once and their top
+# users cached in the process for USER_TYPEAHEAD_CACHE_TIMEOUT seconds
+USER_TYPEAHEAD_MAX_CANDIDATES = 2000
+USER_TYPEAHEAD_CACHE_SIZE = 10000
+USER_TYPEAHEAD_CACHE_TIMEOUT = 60
+# seconds between two rebuilds of the typeahead index of a process, which
+# picks up the users changed by the other processes
+USER_TYPEAHEAD_REBUILD_INTERVAL = 3600
+# users read per query by the rebuilds
+USER_TYPEAHEAD_REBUILD_BATCH_SIZE = 10000
+
+# Storage
+# backends of the wide column tables (newsfeeds, followers, followings, postings),
+# by table name: utils.storage.OrmBackend (default) or utils.storage.SQLiteBackend
+STORAGE_BACKENDS = {}
+# database file of the SQLiteBackend
+SQLITE_STORAGE_PATH = BASE_DIR / 'storage.sqlite3'
+if TESTING:
+    SQLITE_STORAGE_PATH = ':memory:'
+
+# HTTP caching
+# seconds the versions behind the ETags of the read endpoints are kept
+HTTP_VERSION_TIMEOUT = 7 * 24 * 3600
+
+# Asynchronous tasks
+# ThreadPoolTaskBackend runs tasks in the web process after the request transaction commits.
+TASK_BACKEND = 'utils.tasks.ThreadPoolTaskBackend'
+TASK_THREAD_POOL_SIZE = 4
+TASK_MAX_RETRIES = 3
+# seconds to wait before the first retry, doubled after every failed attempt
+TASK_RETRY_DELAY = 1
+if TESTING:
+    TASK_BACKEND = 'utils.tasks.EagerTaskBackend'
+    TASK_RETRY_DELAY = 0
+
+# Friendships
+# seconds, following sets cached in redis expire when they are not read
+FOLLOWINGS_CACHE_TIMEOUT = 7 * 24 * 3600
+
+# Likes
+# seconds between two flushes of the buffered likes counts to the database
+LIKES_FLUSH_INTERVAL = 10
+
+# Tweets
+# number of comments rendered with a tweet unless with_all_comments is given
+TWEET_PREVIEW_COMMENTS_SIZE = 3
+# rows deleted per statement when cleaning up after a deleted tweet
+TWEET_CLEANUP_BATCH_SIZE = 1000
+
+# Newsfeeds
+# number of follower inboxes written by one fanout batch task
+NEWSFEED_FANOUT_BATCH_SIZE = 1000
+# authors with at least this many followers are not fanned out, their tweets
+# are pulled into their followers' newsfeeds at read time instead.
+NEWSFEED_CELEBRITY_THRESHOLD = 10000
+# number of recent tweets pulled from each followed celebrity
+NEWSFEED_CELEBRITY_PULL_SIZE = 200
+# most recent inbox entries of every active user kept in redis
+NEWSFEED_CACHE_LIMIT = 200
+# seconds, inboxes of users who stop reading their feed expire
+NEWSFEED_CACHE_TIMEOUT = 7 * 24 * 3600
+# latest tweets of a user copied into the inbox of a new follower
+NEWSFEED_BACKFILL_SIZE = 50
+# newsfeeds written or deleted per query when following / unfollowing
+NEWSFEED_FOLLOW_BATCH_SIZE = 500
+# aliases in DATABASES the newsfeeds are sharded over by user id. Run the
+# rebalance_newsfeeds command after changing the list.
+NEWSFEED_SHARDS = ['default']
+
+# Trends
+# sliding windows the hashtags are counted over, name: (seconds of the
+# window, seconds of the buckets it is counted in)
+TRENDS_WINDOWS = {
+    '5m': (5 * 60, 60),
+    '1h': (3600, 5 * 60),
+    '24h': (24 * 3600, 3600),
+}
+TRENDS_DEFAULT_WINDOW = '1h'
+# number of hashtags served by /api/trends/ by default, and at most
+TRENDS_TOP_K = 10
+TRENDS_MAX_TOP_K = 100
+# seconds between two exact recounts of the windows from the tweets
+TRENDS_RECOUNT_INTERVAL = 10 * 60
+# tweets read per query by the recounts
+TRENDS_RECOUNT_BATCH_SIZE = 1000
+
+# Search
+# postings read per query when intersecting the posting lists
+SEARCH_BATCH_SIZE = 100
+# words of a search query used, the others are ignored
+SEARCH_MAX_TERMS = 10
+
+# Metrics
+# sinks receiving the metrics of every request: utils.metrics.LogSink,
+# utils.metrics.StatsdSink and utils.metrics.MemorySink (served at /admin/metrics/)
+METRICS_SINKS = ['utils.metrics.LogSink', 'utils.metrics.MemorySink']
+METRICS_STATSD_HOST = '127.0.0.1'
+METRICS_STATSD_PORT = 8125
+METRICS_STATSD_PREFIX = 'twitter'
+# requests running more queries than the budget of their view are sampled
+# with their SQL, e.g. {'NewsFeedViewSet.list': 10}
+METRICS_QUERY_BUDGET = 20
+METRICS_QUERY_BUDGETS = {}
+METRICS_OVER_BUDGET_SAMPLE_RATE = 0.1
+# statements kept per request for the samples
+METRICS_MAX_SAMPLED_QUERIES = 100
+
 try:
     from .local_settings import *
 except:
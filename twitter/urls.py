@@ -20,7 +20,11 @@ from accounts.api.views import UserViewSet, AccountViewSet
 from friendships.api.views import FriendshipViewSet
 from newsfeeds.api.views import NewsFeedViewSet
 from comments.api.views import CommentViewSet
+from likes.api.views import LikeViewSet
+from search.api.views import SearchViewSet
+from trends.api.views import TrendViewSet
 from tweets.api.views import TweetViewSet
+from utils.metrics import MetricsView
 
 import debug_toolbar
 
@@ -31,8 +35,12 @@ router.register(r'api/tweets', TweetViewSet, basename='tweets')
 router.register(r'api/friendships', FriendshipViewSet, basename='friendships')
 router.register(r'api/newsfeeds', NewsFeedViewSet, basename='newsfeeds')
 router.register(r'api/comments', CommentViewSet, basename='comments')
+router.register(r'api/likes', LikeViewSet, basename='likes')
+router.register(r'api/trends', TrendViewSet, basename='trends')
+router.register(r'api/search', SearchViewSet, basename='search')
 
 urlpatterns = [
+    path('admin/metrics/', MetricsView.as_view()),
     path('admin/', admin.site.urls),
     path('', include(router.urls)),
     path('api-auth/', include('rest_framework.urls', namespace='rest_framework')),
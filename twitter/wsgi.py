@@ -14,3 +14,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'twitter.settings')
 
 application = get_wsgi_application()
+
+# the typeahead index of the process is built in the background, not by the
+# first search
+from accounts.tasks import queue_user_index_rebuild  # noqa: E402
+
+queue_user_index_rebuild()
@@ -0,0 +1,219 @@
+import logging
+import threading
+import time
+import weakref
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import JsonResponse
+
+logger = logging.getLogger(__name__)
+
+_pools = {}
+_pools_lock = threading.Lock()
+_state = threading.local()
+
+
+class PoolExhausted(Exception):
+    pass
+
+
+class ConnectionPool(object):
+    """
+    bounds the database connections of a worker process. Django keeps one
+    connection per thread and alias, reused for CONN_MAX_AGE seconds, so
+    the pool hands out slots rather than connection objects: a thread takes
+    a slot at the first query of a request or task, and gives it back at
+    the end. Its connections are then kept open for the next requests only
+    while the threads keep at most max_size connections open between
+    requests, they are closed otherwise.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.semaphore = threading.BoundedSemaphore(max_size)
+        self.lock = threading.Lock()
+        # thread -> number of connections it kept open after its last slot
+        self.open_connections = weakref.WeakKeyDictionary()
+        self.stats = {
+            'requests': 0,
+            'acquisitions': 0,
+            'new_connections': 0,
+            'reused_connections': 0,
+            'closed_connections': 0,
+            'wait_time': 0.0,
+            'timeouts': 0,
+        }
+
+    def acquire(self, timeout):
+        return self.semaphore.acquire(timeout=timeout)
+
+    def release(self):
+        self.semaphore.release()
+
+    def keep_or_close_connections(self):
+        """
+        called by a thread at the end of its request or task, closes its
+        connections when keeping them would exceed max_size.
+        """
+        thread = threading.current_thread()
+        count = sum(1 for conn in connections.all() if conn.connection is not None)
+        with self.lock:
+            others = sum(
+                open_count
+                for open_thread, open_count in self.open_connections.items()
+                if open_thread is not thread
+            )
+            keep = others + count <= self.max_size
+            self.open_connections[thread] = count if keep else 0
+        if not keep:
+            connections.close_all()
+            self.record(closed_connections=count)
+
+    def record(self, **deltas):
+        with self.lock:
+            for key, delta in deltas.items():
+                self.stats[key] += delta
+
+    def get_reuse_rate(self):
+        with self.lock:
+            if not self.stats['acquisitions']:
+                return None
+            return self.stats['reused_connections'] / self.stats['acquisitions']
+
+
+def get_pool():
+    max_size = settings.DATABASE_POOL_SIZE
+    with _pools_lock:
+        if max_size not in _pools:
+            _pools[max_size] = ConnectionPool(max_size)
+        return _pools[max_size]
+
+
+def check_connection(conn, cursor):
+    """
+    ping a connection kept open from a previous request at its first query,
+    and reconnect when it is broken. cursor is the CursorWrapper of the
+    query, pointed to the new connection.
+    """
+    if not conn.settings_dict.get('CONN_HEALTH_CHECKS', False) or conn.in_atomic_block:
+        return
+    if not conn.is_usable():
+        logger.info('closing unusable database connection %s', conn.alias)
+        conn.close()
+        cursor.cursor = conn.cursor().cursor
+
+
+def _count_new_connection(sender, connection, **kwargs):
+    created_aliases = getattr(_state, 'created_aliases', None)
+    if created_aliases is not None:
+        created_aliases.add(connection.alias)
+
+
+connection_created.connect(_count_new_connection)
+
+
+class PoolUsage(object):
+    """
+    the databases used by a request or a task. The pool slot is taken at
+    the first query, requests that query no database never wait for one.
+    """
+
+    def __init__(self, pool, timeout):
+        self.pool = pool
+        self.timeout = timeout
+        self.acquired = False
+        self.wait_time = 0.0
+        self.used_aliases = set()
+        self.created_aliases = set()
+
+    def acquire(self):
+        start = time.monotonic()
+        acquired = self.pool.acquire(timeout=self.timeout)
+        self.wait_time = time.monotonic() - start
+        if not acquired:
+            self.pool.record(timeouts=1, wait_time=self.wait_time)
+            logger.warning('no database connection available after %.3fs', self.wait_time)
+            raise PoolExhausted()
+        self.acquired = True
+
+    def track(self, alias):
+        def wrapper(execute, sql, params, many, context):
+            if alias not in self.used_aliases:
+                if not self.acquired:
+                    self.acquire()
+                self.used_aliases.add(alias)
+                if alias not in self.created_aliases:
+                    check_connection(context['connection'], context['cursor'])
+            return execute(sql, params, many, context)
+        return wrapper
+
+    def get_stats(self):
+        new_connections = len(self.used_aliases & self.created_aliases)
+        return {
+            'acquisitions': len(self.used_aliases),
+            'new_connections': new_connections,
+            'reused_connections': len(self.used_aliases) - new_connections,
+            'wait_time': self.wait_time,
+        }
+
+
+@contextmanager
+def pool_usage(timeout):
+    """
+    runs the block on a slot of the pool taken at its first query, e.g. a
+    request or a task, yields its PoolUsage. Queries raise PoolExhausted
+    after waiting timeout seconds for a slot.
+    """
+    pool = get_pool()
+    usage = PoolUsage(pool, timeout)
+    _state.created_aliases = usage.created_aliases
+    try:
+        with ExitStack() as stack:
+            for conn in connections.all():
+                stack.enter_context(conn.execute_wrapper(usage.track(conn.alias)))
+            yield usage
+    finally:
+        _state.created_aliases = None
+        if usage.acquired:
+            pool.release()
+        if usage.acquired or usage.created_aliases:
+            pool.keep_or_close_connections()
+    if usage.acquired:
+        pool.record(**usage.get_stats())
+
+
+class ConnectionPoolMiddleware(object):
+    """
+    runs the request on a slot of the pool, answers 503 when none is free
+    after DATABASE_POOL_TIMEOUT seconds, and reports for every request:
+    - acquisitions: number of databases queried
+    - new_connections / reused_connections: how they were obtained
+    - wait_time: seconds spent waiting for a pool slot
+    The numbers are logged and kept in request.db_connection_stats.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with pool_usage(settings.DATABASE_POOL_TIMEOUT) as usage:
+            response = self.get_response(request)
+        get_pool().record(requests=1)
+        stats = usage.get_stats()
+        request.db_connection_stats = stats
+        logger.debug(
+            'db connections for %s %s: %s',
+            request.method, request.path, stats,
+        )
+        return response
+
+    def process_exception(self, request, exception):
+        if isinstance(exception, PoolExhausted):
+            return JsonResponse({
+                'success': False,
+                'message': 'The service is busy, please try again later.',
+            }, status=503)
+        return None
@@ -0,0 +1,99 @@
+import random
+import threading
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.permissions import SAFE_METHODS
+
+PINNED_TO_PRIMARY_KEY = 'db:pinned_to_primary:{user_id}'
+
+_state = threading.local()
+
+
+@contextmanager
+def _use_replica(use_replica):
+    previous = getattr(_state, 'use_replica', False)
+    _state.use_replica = use_replica
+    try:
+        yield
+    finally:
+        _state.use_replica = previous
+
+
+def read_from_replica():
+    return _use_replica(True)
+
+
+def read_from_primary():
+    """
+    reads from the primary, even inside read_from_replica(), e.g. to fill a
+    cache that outlives the replication lag with rows that are up to date.
+    """
+    return _use_replica(False)
+
+
+def is_reading_from_replica():
+    return getattr(_state, 'use_replica', False) and bool(settings.DATABASE_REPLICAS)
+
+
+def pin_to_primary(user):
+    """
+    after a write, the user reads from the primary for REPLICA_PIN_SECONDS
+    so that they see their own writes despite the replication lag.
+    """
+    if user.is_authenticated:
+        cache.set(
+            PINNED_TO_PRIMARY_KEY.format(user_id=user.id),
+            1,
+            settings.REPLICA_PIN_SECONDS,
+        )
+
+
+def is_pinned_to_primary(user):
+    if not user.is_authenticated:
+        return False
+    return cache.get(PINNED_TO_PRIMARY_KEY.format(user_id=user.id)) is not None
+
+
+class ReplicaRouter(object):
+    """
+    reads go to one of settings.DATABASE_REPLICAS inside read_from_replica(),
+    everything else goes to the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        if is_reading_from_replica():
+            return random.choice(settings.DATABASE_REPLICAS)
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # replicas hold the same data as the primary
+        return True
+
+
+class ReplicaReadMixin(object):
+    """
+    viewset mixin sending the safe reads of replica_actions to the replicas,
+    unless the user wrote something in the last REPLICA_PIN_SECONDS.
+    """
+    replica_actions = ('list', 'retrieve')
+
+    def dispatch(self, request, *args, **kwargs):
+        # the replica context entered by initial() is always left with the
+        # request, even when the view raises, so that it never sticks to the
+        # worker thread
+        with ExitStack() as self._replica_stack:
+            return super().dispatch(request, *args, **kwargs)
+
+    def initial(self, request, *args, **kwargs):
+        # authentication and permission checks read from the primary
+        super().initial(request, *args, **kwargs)
+        if request.method not in SAFE_METHODS:
+            pin_to_primary(request.user)
+            return
+        if self.action in self.replica_actions and not is_pinned_to_primary(request.user):
+            self._replica_stack.enter_context(read_from_replica())
@@ -0,0 +1,103 @@
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response
+
+from utils.db_routers import is_reading_from_replica
+from utils.tasks import on_commit
+
+# version scopes, bumped by the writes changing what the read endpoints return
+TWEETS_SCOPE = 'tweets:{user_id}'
+TWEET_SCOPE = 'tweet:{tweet_id}'
+COMMENTS_SCOPE = 'comments:{tweet_id}'
+FOLLOWERS_SCOPE = 'followers:{user_id}'
+FOLLOWINGS_SCOPE = 'followings:{user_id}'
+# what a viewer liked, rendered as has_liked
+LIKES_SCOPE = 'likes:{user_id}'
+
+VERSION_KEY = 'http:version:{scope}'
+
+
+def new_version():
+    # microseconds, so that versions also tell how recent the write was
+    return time.time_ns() // 1000
+
+
+def get_versions(scopes):
+    """
+    {scope: version}. Scopes without a version, e.g. evicted from the
+    cache, get a new one: the next request cannot match an old ETag.
+    """
+    keys = {VERSION_KEY.format(scope=scope): scope for scope in scopes}
+    versions = {
+        keys[key]: version
+        for key, version in cache.get_many(keys.keys()).items()
+    }
+    missing = {
+        key: new_version()
+        for key, scope in keys.items()
+        if scope not in versions
+    }
+    if missing:
+        cache.set_many(missing, settings.HTTP_VERSION_TIMEOUT)
+        versions.update({keys[key]: version for key, version in missing.items()})
+    return versions
+
+
+def bump_versions(*scopes):
+    """
+    the new version is set once the write transaction commits: set before,
+    a request could tag the body it still reads without the write with it.
+    """
+    if not scopes:
+        return
+
+    def set_versions():
+        version = new_version()
+        cache.set_many(
+            {VERSION_KEY.format(scope=scope): version for scope in scopes},
+            settings.HTTP_VERSION_TIMEOUT,
+        )
+    on_commit(set_versions)
+
+
+def is_replicated(versions):
+    # the replicas are assumed to lag REPLICA_PIN_SECONDS at most
+    lag = settings.REPLICA_PIN_SECONDS * 10 ** 6
+    return all(new_version() - version > lag for version in versions.values())
+
+
+def conditional_get(get_scopes):
+    """
+    answer GET requests with 304 Not Modified, without running the view,
+    when the client already has the current response. get_scopes(request,
+    *args, **kwargs) returns the version scopes the response depends on.
+    The ETag also covers the url and the viewer, for the per viewer fields
+    like has_liked. There is no Last-Modified: a date in whole seconds
+    cannot tell apart the writes of the same second.
+    A body read from a replica gets no ETag while one of the versions is
+    more recent than the replication lag, it may not include the write yet.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def _wrapped_view(instance, request, *args, **kwargs):
+            versions = get_versions(get_scopes(request, *args, **kwargs))
+            etag = '"{}"'.format(hashlib.md5(repr((
+                request.get_full_path(),
+                request.user.id,
+                sorted(versions.items()),
+            )).encode()).hexdigest())
+            if is_reading_from_replica() and not is_replicated(versions):
+                return view_func(instance, request, *args, **kwargs)
+            response = get_conditional_response(request, etag=etag)
+            if response is None:
+                response = view_func(instance, request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+            response['ETag'] = etag
+            return response
+        return _wrapped_view
+    return decorator
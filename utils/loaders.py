@@ -0,0 +1,123 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models
+from rest_framework import serializers
+
+# model -> function(ids) returning {id: object}, e.g. to read through a cache
+_fetchers = {}
+
+
+def register_fetcher(model, fetcher):
+    _fetchers[model] = fetcher
+
+
+class ModelLoader(object):
+    """
+    DataLoader-style loader: objects requested through load_many are fetched
+    with a single id__in query and remembered for the rest of the request.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.objects = {}
+
+    def fetch(self, ids):
+        if self.model in _fetchers:
+            return _fetchers[self.model](ids)
+        return {obj.id: obj for obj in self.model.objects.filter(id__in=ids)}
+
+    def load_many(self, ids):
+        missing_ids = {
+            object_id
+            for object_id in ids
+            if object_id is not None and object_id not in self.objects
+        }
+        if missing_ids:
+            self.objects.update(self.fetch(missing_ids))
+            # remember the ids that do not exist to avoid querying them again
+            for object_id in missing_ids:
+                self.objects.setdefault(object_id, None)
+        return {
+            object_id: self.objects[object_id]
+            for object_id in ids
+            if object_id is not None
+        }
+
+
+def get_loader(serializer, model):
+    # loaders live on the request when there is one so that every
+    # serializer rendered by the request shares them, views can also use
+    # them with get_loader_for(request, model)
+    holder = serializer.context.get('request')
+    if holder is None:
+        holder = serializer.root
+    return get_loader_for(holder, model)
+
+
+def get_loader_for(holder, model):
+    if not hasattr(holder, '_model_loaders'):
+        holder._model_loaders = {}
+    if model not in holder._model_loaders:
+        holder._model_loaders[model] = ModelLoader(model)
+    return holder._model_loaders[model]
+
+
+def load_related(serializer, instances):
+    """
+    attach the foreign key objects rendered by the nested serializers of
+    serializer to instances, using one query per related model. Nested
+    serializers are handled recursively, e.g. newsfeed -> tweet -> user.
+    Serializers can also define prepare_batch(instances) to look up other
+    per item data for the whole list at once.
+    """
+    instances = [instance for instance in instances if instance is not None]
+    if not instances:
+        return
+    if hasattr(serializer, 'prepare_batch'):
+        serializer.prepare_batch(instances)
+    opts = instances[0]._meta
+    for field in serializer.fields.values():
+        if not isinstance(field, serializers.BaseSerializer):
+            continue
+        if isinstance(field, serializers.ListSerializer):
+            continue
+        try:
+            model_field = opts.get_field(field.source)
+        except FieldDoesNotExist:
+            continue
+        if not model_field.many_to_one:
+            continue
+
+        loader = get_loader(serializer, model_field.related_model)
+        related_objects = loader.load_many([
+            getattr(instance, model_field.attname)
+            for instance in instances
+            if not model_field.is_cached(instance)
+        ])
+        for instance in instances:
+            if model_field.is_cached(instance):
+                continue
+            model_field.set_cached_value(
+                instance,
+                related_objects.get(getattr(instance, model_field.attname)),
+            )
+        load_related(field, [
+            getattr(instance, model_field.name)
+            for instance in instances
+        ])
+
+
+class BatchLoadListSerializer(serializers.ListSerializer):
+    """
+    use as Meta.list_serializer_class to render a list with a constant
+    number of queries, no matter how many items are in the list.
+    """
+
+    def load(self, data):
+        if isinstance(data, models.Manager):
+            data = data.all()
+        instances = list(data)
+        load_related(self.child, instances)
+        return instances
+
+    def to_representation(self, data):
+        return super().to_representation(self.load(data))
@@ -0,0 +1,299 @@
+import bisect
+import logging
+import random
+import socket
+import threading
+import time
+from collections import deque
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+from django.utils.module_loading import import_string
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+logger = logging.getLogger(__name__)
+
+# timings in seconds, the query count as a number
+METRICS = ('queries', 'db_time', 'serializer_time', 'render_time', 'total_time')
+
+_sinks = {}
+_sinks_lock = threading.Lock()
+_state = threading.local()
+
+
+class LogSink(object):
+
+    def record(self, view, values):
+        logger.info('%s %s', view, ' '.join(
+            '{}={:.4g}'.format(metric, values[metric]) for metric in METRICS
+        ))
+
+    def sample(self, view, values, sql):
+        logger.warning(
+            '%s ran %s queries, over its budget:\n%s',
+            view, values['queries'], '\n'.join(sql),
+        )
+
+
+class StatsdSink(object):
+    """
+    sends the metrics as StatsD timers over UDP, e.g.
+    twitter.NewsFeedViewSet.list.db_time:3.2|ms. Packets that are lost or
+    not delivered are ignored, the requests never wait for the daemon.
+    """
+
+    def __init__(self):
+        self.address = (settings.METRICS_STATSD_HOST, settings.METRICS_STATSD_PORT)
+        self.prefix = settings.METRICS_STATSD_PREFIX
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.setblocking(False)
+
+    def record(self, view, values):
+        lines = []
+        for metric in METRICS:
+            value = values[metric]
+            if metric != 'queries':
+                value *= 1000
+            lines.append('{}.{}.{}:{:.3f}|ms'.format(self.prefix, view, metric, value))
+        try:
+            self.socket.sendto('\n'.join(lines).encode(), self.address)
+        except OSError:
+            pass
+
+    def sample(self, view, values, sql):
+        try:
+            self.socket.sendto(
+                '{}.{}.over_budget:1|c'.format(self.prefix, view).encode(),
+                self.address,
+            )
+        except OSError:
+            pass
+
+
+class Histogram(object):
+    """
+    counts of the values falling in each bucket, buckets[i] being the
+    upper bound of bucket i. The last bucket has no upper bound.
+    """
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0
+        self.max = 0
+
+    def add(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'max': self.max,
+            'buckets': dict(zip(
+                [str(bound) for bound in self.buckets] + ['+Inf'],
+                self.counts,
+            )),
+        }
+
+
+class MemorySink(object):
+    """
+    keeps a histogram of every metric of every view in the process, and the
+    latest samples of requests over their query budget. They are served to
+    the staff by MetricsView.
+    """
+    TIME_BUCKETS = [0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1, 2, 5]
+    QUERY_BUCKETS = [0, 1, 2, 5, 10, 20, 50, 100, 200]
+    MAX_SAMPLES = 50
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.samples = deque(maxlen=self.MAX_SAMPLES)
+
+    def record(self, view, values):
+        with self.lock:
+            if view not in self.histograms:
+                self.histograms[view] = {
+                    metric: Histogram(
+                        self.QUERY_BUCKETS if metric == 'queries' else self.TIME_BUCKETS
+                    )
+                    for metric in METRICS
+                }
+            for metric, histogram in self.histograms[view].items():
+                histogram.add(values[metric])
+
+    def sample(self, view, values, sql):
+        with self.lock:
+            self.samples.append({'view': view, 'values': values, 'sql': sql})
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'views': {
+                    view: {
+                        metric: histogram.to_dict()
+                        for metric, histogram in histograms.items()
+                    }
+                    for view, histograms in self.histograms.items()
+                },
+                'samples': list(self.samples),
+            }
+
+
+def get_sinks():
+    # one instance of each sink per process, the memory sink is shared
+    # between the middleware and MetricsView
+    with _sinks_lock:
+        for path in settings.METRICS_SINKS:
+            if path not in _sinks:
+                _sinks[path] = import_string(path)()
+        return [_sinks[path] for path in settings.METRICS_SINKS]
+
+
+def get_view_name(view_func, method):
+    """
+    ViewSet.action for DRF viewsets, e.g. NewsFeedViewSet.list, the
+    module and name of the function for the other views.
+    """
+    view_class = getattr(view_func, 'cls', None)
+    if view_class is None:
+        return '{}.{}'.format(view_func.__module__, view_func.__name__)
+    action = (getattr(view_func, 'actions', None) or {}).get(method.lower())
+    if action is None:
+        return view_class.__name__
+    return '{}.{}'.format(view_class.__name__, action)
+
+
+class RequestMetrics(object):
+
+    def __init__(self):
+        self.view = None
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.render_time = 0.0
+        # set while a serializer is timed, so the nested ones are not counted twice
+        self.serializing = False
+        # statements without their parameters, which may hold user data
+        self.sql = []
+
+    def track_query(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries += 1
+            if len(self.sql) < settings.METRICS_MAX_SAMPLED_QUERIES:
+                self.sql.append(sql)
+
+
+@contextmanager
+def serializer_timer():
+    """
+    adds the time spent in the block, e.g. in serializer.data, to the
+    serializer time of the current request. It includes the queries the
+    serializers run. Blocks nested in another one are counted once.
+    """
+    metrics = getattr(_state, 'metrics', None)
+    if metrics is None or metrics.serializing:
+        yield
+        return
+    metrics.serializing = True
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.serializing = False
+        metrics.serializer_time += time.perf_counter() - start
+
+
+class MetricsMiddleware(object):
+    """
+    records for every request handled by a view the number of queries, the
+    time spent in the database, in the serializers (serializer.data of the
+    TimedSerializerMixin ones) and rendering, and sends them to the
+    settings.METRICS_SINKS. Requests running more queries than their budget
+    are sampled with their SQL.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics = RequestMetrics()
+        request._metrics = metrics
+        _state.metrics = metrics
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for conn in connections.all():
+                    stack.enter_context(conn.execute_wrapper(metrics.track_query))
+                response = self.get_response(request)
+        finally:
+            _state.metrics = None
+        total_time = time.perf_counter() - start
+
+        if metrics.view is not None:
+            self.report(metrics, total_time)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._metrics.view = get_view_name(view_func, request.method)
+
+    def process_template_response(self, request, response):
+        # called right before the response is rendered
+        metrics = request._metrics
+        start = time.perf_counter()
+
+        def stop_timer(response):
+            metrics.render_time += time.perf_counter() - start
+        response.add_post_render_callback(stop_timer)
+        return response
+
+    def report(self, metrics, total_time):
+        values = {
+            'queries': metrics.queries,
+            'db_time': metrics.db_time,
+            'serializer_time': metrics.serializer_time,
+            'render_time': metrics.render_time,
+            'total_time': total_time,
+        }
+        budget = settings.METRICS_QUERY_BUDGETS.get(metrics.view, settings.METRICS_QUERY_BUDGET)
+        over_budget = (
+            metrics.queries > budget
+            and random.random() < settings.METRICS_OVER_BUDGET_SAMPLE_RATE
+        )
+        for sink in get_sinks():
+            try:
+                sink.record(metrics.view, values)
+                if over_budget:
+                    sink.sample(metrics.view, values, metrics.sql)
+            except Exception:
+                # metrics never fail a request
+                logger.exception('metrics sink %s failed', sink)
+
+
+class MetricsView(APIView):
+    """
+    the histograms and over budget samples of the MemorySink, for the staff.
+    """
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request):
+        for sink in get_sinks():
+            if isinstance(sink, MemorySink):
+                return Response(sink.snapshot())
+        return Response({
+            'success': False,
+            'message': 'utils.metrics.MemorySink is not in settings.METRICS_SINKS.',
+        }, status=404)
@@ -0,0 +1,156 @@
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from utils.storage import MAX_COLUMN
+from utils.time_helpers import datetime_to_microseconds
+
+
+def split_cursor(cursor):
+    """
+    (created_at, id) of a cursor. A bare created_at cursor has no id and
+    covers all the items created at that time.
+    """
+    if isinstance(cursor, tuple):
+        return cursor
+    return cursor, None
+
+
+def get_cursor_q(created_at__lt=None, created_at__gt=None, field='created_at', tiebreaker='id'):
+    # the items between the cursors, ordered by (field, tiebreaker)
+    q = Q()
+    for lookup, cursor in (('lt', created_at__lt), ('gt', created_at__gt)):
+        if cursor is None:
+            continue
+        created_at, item_id = split_cursor(cursor)
+        cursor_q = Q(**{'{}__{}'.format(field, lookup): created_at})
+        if item_id is not None:
+            cursor_q |= Q(**{field: created_at, '{}__{}'.format(tiebreaker, lookup): item_id})
+        q &= cursor_q
+    return q
+
+
+def get_cursor_keys(created_at__lt=None, created_at__gt=None):
+    """
+    exclusive (microseconds, id) bounds of the cursors, the keys of the
+    utils.storage tables. Ids are positive, so a bare created_at__lt is
+    (created_at, 0) and a bare created_at__gt is (created_at, MAX_COLUMN).
+    """
+    keys = []
+    for cursor, default_id in ((created_at__lt, 0), (created_at__gt, MAX_COLUMN)):
+        if cursor is None:
+            keys.append(None)
+            continue
+        created_at, item_id = split_cursor(cursor)
+        keys.append((
+            datetime_to_microseconds(created_at),
+            default_id if item_id is None else item_id,
+        ))
+    return tuple(keys)
+
+
+class EndlessPagination(BasePagination):
+    """
+    keyset pagination on (created_at, id), backed by the (xxx, created_at)
+    indexes.
+    - created_at__lt: items before the cursor
+    - created_at__gt: items after the cursor
+    A cursor is the created_at of an item, optionally followed by a comma
+    and its id, e.g. created_at__lt=2020-12-01T10:00:00Z,42. With the id,
+    the items created at the same time as the cursor are split by id
+    instead of being all skipped. Both cursors can be combined to fill the
+    gap between two pages.
+    The cost of a page does not depend on how deep the client has scrolled,
+    since no OFFSET is used.
+    """
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'size'
+    max_page_size = 100
+    cursor_params = ('created_at__lt', 'created_at__gt')
+    # most recent first
+    ordering = ('-created_at', '-id')
+
+    def __init__(self):
+        self.has_next_page = False
+
+    def get_page_size(self, request):
+        if self.page_size_query_param not in request.query_params:
+            return self.page_size
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except ValueError:
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def parse_cursor(self, param, value):
+        created_at, _, item_id = value.partition(',')
+        try:
+            created_at = parse_datetime(created_at)
+        except ValueError:
+            # well formatted but out of range, e.g. month 13
+            created_at = None
+        if created_at is None:
+            raise ValidationError({
+                'message': '{} is not a valid datetime.'.format(param),
+            })
+        if timezone.is_naive(created_at):
+            created_at = timezone.make_aware(created_at, timezone.utc)
+        if not item_id:
+            return created_at, None
+        try:
+            return created_at, int(item_id)
+        except ValueError:
+            raise ValidationError({
+                'message': 'the id of {} is not an integer.'.format(param),
+            })
+
+    def get_cursor_filters(self, request):
+        # {param: (created_at, id or None)}
+        return {
+            param: self.parse_cursor(param, request.query_params[param])
+            for param in self.cursor_params
+            if param in request.query_params
+        }
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page_size = self.get_page_size(request)
+        queryset = queryset.filter(
+            get_cursor_q(**self.get_cursor_filters(request))
+        ).order_by(*self.ordering)
+        # fetch one more item to know whether there is a next page
+        items = list(queryset[:page_size + 1])
+        self.has_next_page = len(items) > page_size
+        return items[:page_size]
+
+    def paginate_batches(self, batches, request):
+        """
+        batches yields lists of items sorted by self.ordering and read
+        between the cursors of the request, e.g. by a service given
+        get_cursor_filters(request), without the items the view hides. The
+        batches are read until the page and the item telling whether there
+        is a next page are filled, hidden items do not shorten the page.
+        """
+        page_size = self.get_page_size(request)
+        page = []
+        for items in batches:
+            page.extend(items)
+            if len(page) > page_size:
+                break
+        self.has_next_page = len(page) > page_size
+        return page[:page_size]
+
+    def get_paginated_response(self, data, key='results'):
+        return Response({
+            'has_next_page': self.has_next_page,
+            key: data,
+        })
+
+
+class AscendingEndlessPagination(EndlessPagination):
+    # oldest first, e.g. comments under a tweet
+    ordering = ('created_at', 'id')
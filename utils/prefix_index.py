@@ -0,0 +1,111 @@
+import bisect
+import heapq
+import threading
+import time
+
+from utils.lru_cache import LRUCache
+
+# sorts after any character, the keys starting with a prefix are in
+# [prefix, prefix + MAX_CHAR)
+MAX_CHAR = '\U0010ffff'
+
+
+class PrefixIndex(object):
+    """
+    in-process index of items by the prefixes of their keys, e.g. users by
+    username, ranked by a score. Keys are kept in a sorted array
+    of (key, item id), the items matching a prefix are a contiguous range
+    found with bisect in O(log n).
+    Ranking a range costs O(range), so the top items of ranges larger than
+    max_candidates, i.e. short prefixes, are cached for cache_timeout
+    seconds.
+    """
+
+    def __init__(self, max_candidates, cache_size, cache_timeout):
+        self.max_candidates = max_candidates
+        self.top_cache = LRUCache(max_size=cache_size, timeout=cache_timeout)
+        self.lock = threading.RLock()
+        self.entries = []
+        self.keys = {}
+        self.scores = {}
+        self.built_at = None
+
+    def rebuild(self, items):
+        """
+        items: (item id, keys, score). The new index is built aside and
+        swapped in, searches keep using the old one meanwhile.
+        """
+        keys, scores = {}, {}
+        for item_id, item_keys, score in items:
+            keys[item_id] = tuple(set(item_keys))
+            scores[item_id] = score
+        entries = sorted(
+            (key, item_id)
+            for item_id, item_keys in keys.items()
+            for key in item_keys
+        )
+        with self.lock:
+            self.entries, self.keys, self.scores = entries, keys, scores
+            self.built_at = time.monotonic()
+        self.top_cache.clear()
+
+    def clear(self):
+        with self.lock:
+            self.entries, self.keys, self.scores = [], {}, {}
+            self.built_at = None
+        self.top_cache.clear()
+
+    def set(self, item_id, keys, score=None):
+        # adds the item or replaces its keys, keeping its score by default
+        keys = tuple(set(keys))
+        with self.lock:
+            old_keys = self.keys.get(item_id, ())
+            for key in set(old_keys) - set(keys):
+                self._remove_entry(key, item_id)
+            for key in set(keys) - set(old_keys):
+                bisect.insort(self.entries, (key, item_id))
+            self.keys[item_id] = keys
+            if score is not None or item_id not in self.scores:
+                self.scores[item_id] = score or 0
+
+    def remove(self, item_id):
+        with self.lock:
+            for key in self.keys.pop(item_id, ()):
+                self._remove_entry(key, item_id)
+            self.scores.pop(item_id, None)
+
+    def _remove_entry(self, key, item_id):
+        index = bisect.bisect_left(self.entries, (key, item_id))
+        if index < len(self.entries) and self.entries[index] == (key, item_id):
+            del self.entries[index]
+
+    def incr_score(self, item_id, delta):
+        with self.lock:
+            if item_id in self.scores:
+                self.scores[item_id] += delta
+
+    def search(self, prefix, size):
+        """
+        ids of the size items with the highest score among the items with a
+        key starting with prefix, ties in key order.
+        """
+        with self.lock:
+            start = bisect.bisect_left(self.entries, (prefix,))
+            stop = bisect.bisect_left(self.entries, (prefix + MAX_CHAR,), lo=start)
+            if stop - start > self.max_candidates:
+                cache_key = (prefix, size)
+                item_ids = self.top_cache.get(cache_key)
+                if item_ids is None:
+                    item_ids = self._get_top(start, stop, size)
+                    self.top_cache.set(cache_key, item_ids)
+                return item_ids
+            return self._get_top(start, stop, size)
+
+    def _get_top(self, start, stop, size):
+        # items matching through several keys are ranked once
+        ranked = {}
+        for position in range(start, stop):
+            _, item_id = self.entries[position]
+            if item_id not in ranked:
+                ranked[item_id] = (self.scores.get(item_id, 0), -position)
+        return heapq.nlargest(size, ranked, key=ranked.get)
@@ -0,0 +1,123 @@
+import redis
+
+from utils.redis_client import RedisClient
+
+# only member of the cached sets that are empty, redis drops empty sets
+EMPTY_MARKER = 'empty'
+
+
+class RedisHelper:
+    """
+    timelines are stored as redis sorted sets: member -> integer score,
+    usually the created_at of the item in microseconds.
+    """
+    # attempts of a push transaction before the sets are invalidated
+    MAX_PUSH_ATTEMPTS = 3
+
+    @classmethod
+    def load_sorted_set(cls, key, limit=None, max_score=None, min_score=None, timeout=None,
+                        include_max=False, include_min=False):
+        """
+        returns (size of the set, lowest score in the set, [(member, score)])
+        with the highest scores first, the size being None when the set is
+        not cached, members of equal scores in reverse
+        lexicographic order. max_score and min_score are exclusive bounds.
+        With include_max / include_min, the entries of the bound score are
+        returned as well, on top of the limit, for the caller to break the
+        ties.
+        """
+        conn = RedisClient.get_connection()
+        max_bound = '+inf' if max_score is None else '({}'.format(max_score)
+        min_bound = '-inf' if min_score is None else '({}'.format(min_score)
+        pipe = conn.pipeline()
+        pipe.zcard(key)
+        pipe.zrange(key, 0, 0, withscores=True, score_cast_func=int)
+        include_max = include_max and max_score is not None
+        include_min = include_min and min_score is not None
+        if include_max:
+            pipe.zrevrangebyscore(key, max_score, max_score, withscores=True, score_cast_func=int)
+        pipe.zrevrangebyscore(
+            key,
+            max_bound,
+            min_bound,
+            start=None if limit is None else 0,
+            num=limit,
+            withscores=True,
+            score_cast_func=int,
+        )
+        if include_min:
+            pipe.zrevrangebyscore(key, min_score, min_score, withscores=True, score_cast_func=int)
+        if timeout is not None:
+            pipe.expire(key, timeout)
+        results = pipe.execute()
+        size, lowest = results[:2]
+        entries = []
+        for result in results[2:2 + 1 + include_max + include_min]:
+            entries.extend(result)
+        if size == 0:
+            return None, None, []
+        if lowest[0][0].decode() == EMPTY_MARKER:
+            return 0, None, []
+        return size, lowest[0][1], [(member.decode(), score) for member, score in entries]
+
+    @classmethod
+    def save_sorted_set(cls, key, entries, timeout=None):
+        conn = RedisClient.get_connection()
+        pipe = conn.pipeline()
+        pipe.delete(key)
+        # empty sets are cached too, with the marker
+        pipe.zadd(key, dict(entries) if entries else {EMPTY_MARKER: 0})
+        if timeout is not None:
+            pipe.expire(key, timeout)
+        pipe.execute()
+
+    @classmethod
+    def delete(cls, *keys):
+        if not keys:
+            return
+        conn = RedisClient.get_connection()
+        conn.delete(*keys)
+
+    @classmethod
+    def remove_from_sorted_sets(cls, members_by_key):
+        if not members_by_key:
+            return
+        pipe = RedisClient.get_connection().pipeline()
+        for key, members in members_by_key.items():
+            pipe.zrem(key, *members)
+        pipe.execute()
+
+    @classmethod
+    def push_to_sorted_sets(cls, entries_by_key, max_size):
+        """
+        add entries to the sets that are already cached, keeping only the
+        max_size highest scores. Sets that are not cached are left alone,
+        they are loaded lazily from the database with their full window.
+        The sets are checked and written in a WATCH / MULTI transaction, so
+        that a set expiring in between is not recreated with the new entries
+        only. Sets still changing after MAX_PUSH_ATTEMPTS are invalidated.
+        """
+        if not entries_by_key:
+            return
+        conn = RedisClient.get_connection()
+        keys = list(entries_by_key.keys())
+        for attempt in range(cls.MAX_PUSH_ATTEMPTS):
+            with conn.pipeline() as pipe:
+                try:
+                    pipe.watch(*keys)
+                    check = conn.pipeline(transaction=False)
+                    for key in keys:
+                        check.exists(key)
+                    cached_keys = [key for key, exists in zip(keys, check.execute()) if exists]
+                    if not cached_keys:
+                        return
+                    pipe.multi()
+                    for key in cached_keys:
+                        pipe.zrem(key, EMPTY_MARKER)
+                        pipe.zadd(key, dict(entries_by_key[key]))
+                        pipe.zremrangebyrank(key, 0, -max_size - 1)
+                    pipe.execute()
+                    return
+                except redis.WatchError:
+                    continue
+        cls.delete(*keys)
@@ -0,0 +1,113 @@
+from collections import OrderedDict
+from operator import attrgetter
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.fields import SkipField
+from rest_framework.relations import PKOnlyObject
+
+from utils.loaders import BatchLoadListSerializer
+from utils.metrics import serializer_timer
+
+# fields whose to_representation is a plain type conversion
+CONVERSIONS = {
+    serializers.IntegerField: int,
+    serializers.CharField: str,
+    serializers.EmailField: str,
+}
+
+
+def compile_field(field):
+    """
+    returns a function instance -> representation of the field, doing once
+    the introspection DRF does for every object.
+    """
+    if isinstance(field, serializers.SerializerMethodField):
+        return getattr(field.parent, field.method_name)
+
+    # model fields are plain attributes, anything else goes through DRF.
+    # Related fields too: they read the pk without fetching the object.
+    model = getattr(getattr(field.parent, 'Meta', None), 'model', None)
+    if model is None or len(field.source_attrs) != 1:
+        return compile_generic_field(field)
+    if isinstance(field, serializers.RelatedField):
+        return compile_generic_field(field)
+    try:
+        model._meta.get_field(field.source_attrs[0])
+    except FieldDoesNotExist:
+        return compile_generic_field(field)
+
+    get_value = attrgetter(field.source_attrs[0])
+    if isinstance(field, serializers.BaseSerializer):
+        to_representation = compile_serializer(field)
+    else:
+        to_representation = CONVERSIONS.get(type(field), field.to_representation)
+
+    def get_representation(instance):
+        value = get_value(instance)
+        if value is None:
+            return None
+        return to_representation(value)
+    return get_representation
+
+
+def compile_generic_field(field):
+    # same steps as Serializer.to_representation, for the other fields
+    def get_representation(instance):
+        attribute = field.get_attribute(instance)
+        check_for_none = attribute.pk if isinstance(attribute, PKOnlyObject) else attribute
+        if check_for_none is None:
+            return None
+        return field.to_representation(attribute)
+    return get_representation
+
+
+def compile_serializer(serializer):
+    """
+    returns a function instance -> serializer.to_representation(instance),
+    for serializers reading model instances.
+    """
+    compiled_fields = [
+        (field.field_name, compile_field(field))
+        for field in serializer._readable_fields
+    ]
+
+    def to_representation(instance):
+        ret = OrderedDict()
+        for field_name, get_representation in compiled_fields:
+            try:
+                ret[field_name] = get_representation(instance)
+            except SkipField:
+                continue
+        return ret
+    return to_representation
+
+
+class TimedSerializerMixin(object):
+    """
+    adds the time spent in serializer.data to the serializer time of the
+    request metrics. Use it for the serializers the views respond with, and
+    TimedListSerializer (or FastListSerializer) as their list_serializer_class.
+    """
+
+    @property
+    def data(self):
+        with serializer_timer():
+            return super().data
+
+
+class TimedListSerializer(TimedSerializerMixin, serializers.ListSerializer):
+    pass
+
+
+class FastListSerializer(TimedSerializerMixin, BatchLoadListSerializer):
+    """
+    BatchLoadListSerializer rendering the items with precompiled field
+    accessors. Use it for hot list endpoints whose items are plain model
+    instances, the output is the same as the regular serializers'.
+    """
+
+    def to_representation(self, data):
+        instances = self.load(data)
+        to_representation = compile_serializer(self.child)
+        return [to_representation(instance) for instance in instances]
@@ -0,0 +1,16 @@
+from collections import defaultdict
+
+
+def get_shard(shards, key):
+    """
+    shards is the list of database aliases a table is spread over, rows
+    live on the shard picked by their integer shard key, e.g. a user id.
+    """
+    return shards[key % len(shards)]
+
+
+def group_by_shard(shards, keys):
+    keys_by_shard = defaultdict(list)
+    for key in keys:
+        keys_by_shard[get_shard(shards, key)].append(key)
+    return keys_by_shard
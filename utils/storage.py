@@ -0,0 +1,389 @@
+import json
+import sqlite3
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from utils.time_helpers import datetime_to_microseconds, microseconds_to_datetime
+
+DEFAULT_STORAGE_BACKEND = 'utils.storage.OrmBackend'
+# sorts after any column value, see Table.to_key
+MAX_COLUMN = 2 ** 63 - 1
+
+
+class Table(object):
+    """
+    wide column style view of a model. Cells are model instances grouped in
+    rows by an integer row key field, e.g. user_id, and sorted inside a row
+    by (timestamp, column): a datetime field and an integer field unique
+    within the row, e.g. (created_at, tweet_id). Reads are range scans over
+    a single row.
+    The backend storing the cells is picked by settings.STORAGE_BACKENDS
+    with the table name as key, the ORM by default. get_alias(row_key)
+    picks the database of a row when the ORM table is sharded.
+    """
+
+    def __init__(self, name, model, row_key, timestamp, column, get_alias=None):
+        self.name = name
+        self.model = model
+        self.row_key = row_key
+        self.timestamp = timestamp
+        self.column = column
+        self.get_alias = get_alias
+        self._backends = {}
+
+    @property
+    def backend(self):
+        path = settings.STORAGE_BACKENDS.get(self.name, DEFAULT_STORAGE_BACKEND)
+        if path not in self._backends:
+            self._backends[path] = import_string(path)(self)
+        return self._backends[path]
+
+    def get_cell_key(self, instance):
+        return getattr(instance, self.row_key), getattr(instance, self.column)
+
+    def to_key(self, bound, reverse):
+        """
+        scan bounds are (timestamp, column) keys. A bare timestamp covers all
+        the columns of that timestamp, timestamps are datetimes or
+        microseconds.
+        """
+        if bound is None:
+            return None
+        if isinstance(bound, tuple):
+            timestamp, column = bound
+        else:
+            timestamp, column = bound, MAX_COLUMN if reverse else 0
+        if not isinstance(timestamp, int):
+            timestamp = datetime_to_microseconds(timestamp)
+        return timestamp, column
+
+    def put_many(self, instances):
+        """
+        stores the instances, cells already stored under the same
+        (row key, column) are kept. Returns the stored cells.
+        """
+        instances = [
+            instance
+            for instance in instances
+            if None not in self.get_cell_key(instance)
+        ]
+        if not instances:
+            return []
+        return self.backend.put_many(instances)
+
+    def scan(self, row_key, start=None, stop=None, limit=None, reverse=False):
+        """
+        cells of the row from start (inclusive) to stop (exclusive), ordered
+        by (timestamp, column), or the other way around when reverse is set.
+        """
+        return self.backend.scan(
+            row_key,
+            self.to_key(start, reverse),
+            self.to_key(stop, reverse),
+            limit,
+            reverse,
+        )
+
+    def delete(self, row_key, columns):
+        columns = list(columns)
+        if not columns:
+            return
+        self.backend.delete(row_key, columns)
+
+    def delete_from_rows(self, row_keys, column):
+        """
+        the cells of column in each of the rows, e.g. a tweet in many
+        inboxes. Returns the deleted cells.
+        """
+        row_keys = [row_key for row_key in row_keys if row_key is not None]
+        if not row_keys:
+            return []
+        return self.backend.delete_from_rows(row_keys, column)
+
+    def sync_saved(self, instances):
+        # mirrors model rows written through the ORM, e.g. from a post_save
+        # listener. The ORM backend already stores them.
+        if self.backend.stores_model_rows:
+            return
+        self.put_many(instances)
+
+    def sync_deleted(self, instances):
+        if self.backend.stores_model_rows:
+            return
+        columns_by_row = defaultdict(list)
+        for instance in instances:
+            row_key, column = self.get_cell_key(instance)
+            if row_key is not None and column is not None:
+                columns_by_row[row_key].append(column)
+        for row_key, columns in columns_by_row.items():
+            self.delete(row_key, columns)
+
+
+class OrmBackend(object):
+    """
+    cells are the rows of the model's own table. Instances that are already
+    saved are the cells themselves and are left alone by put_many.
+    """
+    stores_model_rows = True
+
+    def __init__(self, table):
+        self.table = table
+
+    def get_alias(self, row_key):
+        if self.table.get_alias is None:
+            return None
+        return self.table.get_alias(row_key)
+
+    def put_many(self, instances):
+        table = self.table
+        stored = [instance for instance in instances if instance.pk is not None]
+        instances_by_alias = defaultdict(list)
+        for instance in instances:
+            if instance.pk is None:
+                instances_by_alias[self.get_alias(getattr(instance, table.row_key))].append(instance)
+        for alias, new_instances in instances_by_alias.items():
+            # ignore_conflicts relies on the (row key, column) unique constraint
+            table.model.objects.db_manager(alias).bulk_create(
+                new_instances,
+                ignore_conflicts=True,
+            )
+            # bulk_create does not return the ids of the rows when ignoring conflicts
+            cell_keys = {table.get_cell_key(instance) for instance in new_instances}
+            stored.extend(
+                instance
+                for instance in table.model.objects.using(alias).filter(**{
+                    '{}__in'.format(table.row_key): {row_key for row_key, _ in cell_keys},
+                    '{}__in'.format(table.column): {column for _, column in cell_keys},
+                })
+                if table.get_cell_key(instance) in cell_keys
+            )
+        return stored
+
+    def after(self, key, inclusive):
+        table = self.table
+        timestamp = microseconds_to_datetime(key[0])
+        return Q(**{'{}__gt'.format(table.timestamp): timestamp}) | Q(**{
+            table.timestamp: timestamp,
+            '{}__{}'.format(table.column, 'gte' if inclusive else 'gt'): key[1],
+        })
+
+    def before(self, key, inclusive):
+        table = self.table
+        timestamp = microseconds_to_datetime(key[0])
+        return Q(**{'{}__lt'.format(table.timestamp): timestamp}) | Q(**{
+            table.timestamp: timestamp,
+            '{}__{}'.format(table.column, 'lte' if inclusive else 'lt'): key[1],
+        })
+
+    def scan(self, row_key, start, stop, limit, reverse):
+        table = self.table
+        queryset = table.model.objects.using(self.get_alias(row_key)).filter(**{
+            table.row_key: row_key,
+            # dangling rows, e.g. of deleted users, are not cells
+            '{}__isnull'.format(table.column): False,
+        })
+        if start is not None:
+            queryset = queryset.filter(
+                self.before(start, True) if reverse else self.after(start, True)
+            )
+        if stop is not None:
+            queryset = queryset.filter(
+                self.after(stop, False) if reverse else self.before(stop, False)
+            )
+        ordering = (table.timestamp, table.column)
+        if reverse:
+            ordering = tuple('-' + field for field in ordering)
+        queryset = queryset.order_by(*ordering)
+        if limit is not None:
+            queryset = queryset[:limit]
+        return list(queryset)
+
+    def delete(self, row_key, columns):
+        table = self.table
+        table.model.objects.using(self.get_alias(row_key)).filter(**{
+            table.row_key: row_key,
+            '{}__in'.format(table.column): columns,
+        }).delete()
+
+    def delete_from_rows(self, row_keys, column):
+        table = self.table
+        row_keys_by_alias = defaultdict(list)
+        for row_key in row_keys:
+            row_keys_by_alias[self.get_alias(row_key)].append(row_key)
+        deleted = []
+        for alias, alias_row_keys in row_keys_by_alias.items():
+            instances = list(table.model.objects.using(alias).filter(**{
+                '{}__in'.format(table.row_key): alias_row_keys,
+                table.column: column,
+            }))
+            if instances:
+                table.model.objects.using(alias).filter(
+                    pk__in=[instance.pk for instance in instances],
+                ).delete()
+            deleted.extend(instances)
+        return deleted
+
+
+class SQLiteBackend(object):
+    """
+    embedded sorted key value store. Each table is a sqlite table clustered
+    on (row_key, ts, col), so that a scan reads consecutive keys, and cells
+    are stored as JSON documents of the model fields.
+    settings.SQLITE_STORAGE_PATH is the database file, ':memory:' in tests.
+    """
+    stores_model_rows = False
+    _connections = {}
+    _lock = threading.RLock()
+
+    def __init__(self, table):
+        self.table = table
+        self.name = 'cells_{}'.format(table.name)
+        self.conn = self.get_connection(settings.SQLITE_STORAGE_PATH)
+        with self._lock, self.conn:
+            self.conn.execute(
+                'CREATE TABLE IF NOT EXISTS {} ('
+                'row_key INTEGER NOT NULL, ts INTEGER NOT NULL, '
+                'col INTEGER NOT NULL, value TEXT NOT NULL, '
+                'PRIMARY KEY (row_key, ts, col)) WITHOUT ROWID'.format(self.name)
+            )
+            self.conn.execute(
+                'CREATE UNIQUE INDEX IF NOT EXISTS {0}_col ON {0} (row_key, col)'.format(self.name)
+            )
+            self.conn.execute(
+                'CREATE TABLE IF NOT EXISTS sequences ('
+                'name TEXT PRIMARY KEY, value INTEGER NOT NULL)'
+            )
+
+    @classmethod
+    def get_connection(cls, path):
+        with cls._lock:
+            if path not in cls._connections:
+                # one connection per process, serialized by _lock
+                cls._connections[path] = sqlite3.connect(str(path), check_same_thread=False)
+            return cls._connections[path]
+
+    @classmethod
+    def clear_all(cls):
+        with cls._lock:
+            for conn in cls._connections.values():
+                with conn:
+                    tables = conn.execute(
+                        "SELECT name FROM sqlite_master WHERE type = 'table'"
+                    ).fetchall()
+                    for (name,) in tables:
+                        conn.execute('DELETE FROM {}'.format(name))
+
+    def allocate_ids(self, count):
+        self.conn.execute(
+            'INSERT OR IGNORE INTO sequences (name, value) VALUES (?, 0)',
+            (self.name,),
+        )
+        self.conn.execute(
+            'UPDATE sequences SET value = value + ? WHERE name = ?',
+            (count, self.name),
+        )
+        (last_id,) = self.conn.execute(
+            'SELECT value FROM sequences WHERE name = ?',
+            (self.name,),
+        ).fetchone()
+        return range(last_id - count + 1, last_id + 1)
+
+    def encode(self, instance):
+        value = {}
+        for field in self.table.model._meta.concrete_fields:
+            field_value = getattr(instance, field.attname)
+            if isinstance(field, models.DateTimeField) and field_value is not None:
+                field_value = datetime_to_microseconds(field_value)
+            value[field.attname] = field_value
+        return json.dumps(value)
+
+    def decode(self, value):
+        value = json.loads(value)
+        for field in self.table.model._meta.concrete_fields:
+            if isinstance(field, models.DateTimeField) and value.get(field.attname) is not None:
+                value[field.attname] = microseconds_to_datetime(value[field.attname])
+        return self.table.model(**value)
+
+    def put_many(self, instances):
+        table = self.table
+        with self._lock, self.conn:
+            new_instances = [instance for instance in instances if instance.pk is None]
+            for instance, pk in zip(new_instances, self.allocate_ids(len(new_instances))):
+                instance.pk = pk
+            for instance in instances:
+                if getattr(instance, table.timestamp) is None:
+                    setattr(instance, table.timestamp, timezone.now())
+            # the (row_key, col) unique index keeps the existing cells
+            self.conn.executemany(
+                'INSERT OR IGNORE INTO {} (row_key, ts, col, value) '
+                'VALUES (?, ?, ?, ?)'.format(self.name),
+                [
+                    (
+                        getattr(instance, table.row_key),
+                        datetime_to_microseconds(getattr(instance, table.timestamp)),
+                        getattr(instance, table.column),
+                        self.encode(instance),
+                    )
+                    for instance in instances
+                ],
+            )
+            return [
+                self.decode(value)
+                for row_key, column in {table.get_cell_key(instance) for instance in instances}
+                for (value,) in self.conn.execute(
+                    'SELECT value FROM {} WHERE row_key = ? AND col = ?'.format(self.name),
+                    (row_key, column),
+                )
+            ]
+
+    def scan(self, row_key, start, stop, limit, reverse):
+        conditions, params = ['row_key = ?'], [row_key]
+        if start is not None:
+            conditions.append('(ts, col) {} (?, ?)'.format('<=' if reverse else '>='))
+            params.extend(start)
+        if stop is not None:
+            conditions.append('(ts, col) {} (?, ?)'.format('>' if reverse else '<'))
+            params.extend(stop)
+        direction = 'DESC' if reverse else 'ASC'
+        params.append(-1 if limit is None else limit)
+        with self._lock:
+            rows = self.conn.execute(
+                'SELECT value FROM {} WHERE {} ORDER BY ts {dir}, col {dir} LIMIT ?'.format(
+                    self.name,
+                    ' AND '.join(conditions),
+                    dir=direction,
+                ),
+                params,
+            ).fetchall()
+        return [self.decode(value) for (value,) in rows]
+
+    def delete(self, row_key, columns):
+        with self._lock, self.conn:
+            self.conn.execute(
+                'DELETE FROM {} WHERE row_key = ? AND col IN ({})'.format(
+                    self.name,
+                    ', '.join('?' * len(columns)),
+                ),
+                [row_key] + list(columns),
+            )
+
+    def delete_from_rows(self, row_keys, column):
+        with self._lock, self.conn:
+            rows = self.conn.execute(
+                'SELECT value FROM {} WHERE row_key IN ({}) AND col = ?'.format(
+                    self.name,
+                    ', '.join('?' * len(row_keys)),
+                ),
+                list(row_keys) + [column],
+            ).fetchall()
+            self.conn.executemany(
+                'DELETE FROM {} WHERE row_key = ? AND col = ?'.format(self.name),
+                [(row_key, column) for row_key in row_keys],
+            )
+        return [self.decode(value) for (value,) in rows]
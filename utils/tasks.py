@@ -0,0 +1,169 @@
+import atexit
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import update_wrapper
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils.module_loading import import_string
+
+from utils.db_pool import pool_usage
+
+logger = logging.getLogger(__name__)
+
+_backends = {}
+
+
+class EagerTaskBackend(object):
+    """
+    run tasks right away in the calling thread. Used by unit tests so that
+    the task results are visible inside the test transaction.
+    """
+
+    def submit(self, func, *args, **kwargs):
+        func(*args, **kwargs)
+
+    def submit_later(self, countdown, func, *args, **kwargs):
+        func(*args, **kwargs)
+
+    def on_commit(self, func):
+        # the test transaction never commits
+        func()
+
+
+class ThreadPoolTaskBackend(object):
+    """
+    run tasks in an in-process thread pool. Tasks are only handed to the pool
+    once the current transaction commits, otherwise the workers could read
+    rows that are not visible to them yet.
+    Delayed tasks still waiting when the process exits run right away
+    instead of being lost with it.
+    """
+
+    def __init__(self):
+        self.executor = ThreadPoolExecutor(
+            max_workers=settings.TASK_THREAD_POOL_SIZE,
+            thread_name_prefix='task',
+        )
+        # id -> (func, args, kwargs) of the delayed tasks not handed to the pool yet
+        self.pending = {}
+        self.pending_ids = itertools.count()
+        self.pending_lock = threading.Lock()
+        atexit.register(self.run_pending)
+
+    def submit(self, func, *args, **kwargs):
+        transaction.on_commit(
+            lambda: self.executor.submit(self._run, func, args, kwargs)
+        )
+
+    def submit_later(self, countdown, func, *args, **kwargs):
+        transaction.on_commit(lambda: self._start_timer(countdown, func, args, kwargs))
+
+    def on_commit(self, func):
+        transaction.on_commit(func)
+
+    def _start_timer(self, countdown, func, args, kwargs):
+        with self.pending_lock:
+            pending_id = next(self.pending_ids)
+            self.pending[pending_id] = (func, args, kwargs)
+        timer = threading.Timer(countdown, self._submit_pending, args=(pending_id,))
+        timer.daemon = True
+        timer.start()
+
+    def _submit_pending(self, pending_id):
+        with self.pending_lock:
+            pending = self.pending.pop(pending_id, None)
+        if pending is not None:
+            self.executor.submit(self._run, *pending)
+
+    def run_pending(self):
+        # the pool is shut down by then, the tasks run in the exiting thread
+        with self.pending_lock:
+            pending = list(self.pending.values())
+            self.pending.clear()
+        for func, args, kwargs in pending:
+            self._run(func, args, kwargs)
+
+    def _run(self, func, args, kwargs):
+        # worker threads own their db connections, release them after each
+        # task. They count in the connection pool as the request threads do.
+        close_old_connections()
+        try:
+            with pool_usage(settings.DATABASE_POOL_TIMEOUT):
+                func(*args, **kwargs)
+        except Exception:
+            logger.exception('task %s failed', getattr(func, '__name__', func))
+        finally:
+            close_old_connections()
+
+
+def on_commit(func):
+    """
+    run func in the calling thread once the current transaction commits,
+    e.g. to mirror rows outside of the database only when they are there
+    for good. Right away with the EagerTaskBackend of the tests.
+    """
+    get_backend().on_commit(func)
+
+
+def get_backend():
+    path = settings.TASK_BACKEND
+    if path not in _backends:
+        _backends[path] = import_string(path)()
+    return _backends[path]
+
+
+class Task(object):
+
+    def __init__(self, func, max_retries=None, on_failure=None):
+        self.func = func
+        self.max_retries = max_retries
+        self.on_failure = on_failure
+        update_wrapper(self, func)
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def delay(self, *args, **kwargs):
+        get_backend().submit(self.run, *args, **kwargs)
+
+    def delay_later(self, countdown, *args, **kwargs):
+        # run the task in countdown seconds
+        get_backend().submit_later(countdown, self.run, *args, **kwargs)
+
+    def run(self, *args, **kwargs):
+        max_retries = self.max_retries
+        if max_retries is None:
+            max_retries = settings.TASK_MAX_RETRIES
+        retry_delay = settings.TASK_RETRY_DELAY
+
+        attempt = 0
+        while True:
+            try:
+                return self.func(*args, **kwargs)
+            except Exception:
+                if attempt >= max_retries:
+                    if self.on_failure is not None:
+                        self.on_failure(*args, **kwargs)
+                    raise
+                logger.warning(
+                    'task %s failed, retry %s/%s',
+                    self.__name__, attempt + 1, max_retries,
+                )
+                time.sleep(retry_delay * 2 ** attempt)
+                attempt += 1
+
+
+def task(max_retries=None, on_failure=None):
+    """
+    turn a function into a task. Calling the function still runs it
+    synchronously, .delay() hands it to the configured TASK_BACKEND.
+    - max_retries defaults to settings.TASK_MAX_RETRIES
+    - on_failure is called with the task arguments once all retries failed
+    """
+    def decorator(func):
+        return Task(func, max_retries=max_retries, on_failure=on_failure)
+    return decorator
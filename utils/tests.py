@@ -0,0 +1,282 @@
+from comments.api.serializers import CommentSerializer
+from comments.models import Comment
+import socket
+import threading
+from unittest import mock
+
+from django.db import connections
+from django.test import override_settings
+from friendships.api.serializers import FollowerSerializer
+from friendships.models import Friendship
+from newsfeeds.api.serializers import NewsFeedSerializer
+from newsfeeds.models import NewsFeed
+from newsfeeds.storages import NEWSFEED_TABLE
+from testing.testcases import TestCase
+from tweets.api.serializers import TweetSerializer
+from tweets.models import Tweet
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APIRequestFactory
+from utils.db_pool import get_pool
+from utils.loaders import BatchLoadListSerializer
+from utils.metrics import StatsdSink, get_sinks
+from utils.renderers import FastJSONRenderer
+from utils.tasks import ThreadPoolTaskBackend
+
+TWEET_LIST_API = '/api/tweets/'
+
+
+class ConnectionPoolMiddlewareTests(TestCase):
+
+    def setUp(self):
+        self.user1 = self.create_user('user1')
+        self.create_tweet(self.user1)
+
+    def test_connection_stats(self):
+        pool = get_pool()
+        requests = pool.stats['requests']
+        response = self.anonymous_client.get(TWEET_LIST_API, {'user_id': self.user1.id})
+        self.assertEqual(response.status_code, 200)
+        stats = response.wsgi_request.db_connection_stats
+        self.assertEqual(stats['acquisitions'], 1)
+        # the test connection stays open between requests
+        self.assertEqual(stats['new_connections'], 0)
+        self.assertEqual(stats['reused_connections'], 1)
+        self.assertGreaterEqual(stats['wait_time'], 0)
+        self.assertEqual(pool.stats['requests'], requests + 1)
+        self.assertEqual(pool.get_reuse_rate(), 1)
+
+    @override_settings(DATABASE_POOL_SIZE=1, DATABASE_POOL_TIMEOUT=0)
+    def test_pool_exhausted(self):
+        pool = get_pool()
+        self.assertEqual(pool.acquire(timeout=0), True)
+        try:
+            response = self.anonymous_client.get(TWEET_LIST_API, {'user_id': self.user1.id})
+            self.assertEqual(response.status_code, 503)
+        finally:
+            pool.release()
+        response = self.anonymous_client.get(TWEET_LIST_API, {'user_id': self.user1.id})
+        self.assertEqual(response.status_code, 200)
+
+    def test_health_checks_used_aliases_only(self):
+        with self.settings(DATABASE_REPLICAS=[]):
+            with mock.patch('utils.db_pool.check_connection') as check_connection:
+                self.anonymous_client.get(TWEET_LIST_API, {'user_id': self.user1.id})
+        self.assertEqual(
+            [call.args[0].alias for call in check_connection.call_args_list],
+            ['default'],
+        )
+
+    @override_settings(DATABASE_POOL_SIZE=1, DATABASE_POOL_TIMEOUT=0)
+    def test_requests_without_queries_take_no_slot(self):
+        pool = get_pool()
+        self.assertEqual(pool.acquire(timeout=0), True)
+        try:
+            response = self.anonymous_client.get('/api/trends/')
+            self.assertEqual(response.status_code, 200)
+        finally:
+            pool.release()
+
+    def test_connections_closed_over_pool_size(self):
+        with mock.patch.object(connections, 'close_all') as close_all:
+            self.anonymous_client.get(TWEET_LIST_API, {'user_id': self.user1.id})
+        close_all.assert_not_called()
+
+        with self.settings(DATABASE_POOL_SIZE=1):
+            pool = get_pool()
+            # another thread keeps a connection open
+            other_thread = threading.Thread()
+            pool.open_connections[other_thread] = 1
+            closed = pool.stats['closed_connections']
+            try:
+                with mock.patch.object(connections, 'close_all') as close_all:
+                    self.anonymous_client.get(TWEET_LIST_API, {'user_id': self.user1.id})
+            finally:
+                del pool.open_connections[other_thread]
+        close_all.assert_called_once()
+        self.assertGreater(pool.stats['closed_connections'], closed)
+
+
+class StorageTests(TestCase):
+
+    def check_table(self, table):
+        user = self.create_user('user1')
+        tweets = [self.create_tweet(user) for i in range(4)]
+        stored = table.put_many([
+            NewsFeed(user_id=user.id, tweet_id=tweet.id)
+            for tweet in tweets
+        ])
+        self.assertEqual(sorted(newsfeed.tweet_id for newsfeed in stored), [t.id for t in tweets])
+        # cells already stored are kept
+        stored_again = table.put_many([NewsFeed(user_id=user.id, tweet_id=tweets[0].id)])
+        self.assertEqual(
+            [(newsfeed.id, newsfeed.created_at) for newsfeed in stored_again],
+            [(newsfeed.id, newsfeed.created_at) for newsfeed in stored if newsfeed.tweet_id == tweets[0].id],
+        )
+
+        newsfeeds = table.scan(user.id)
+        self.assertEqual([newsfeed.tweet_id for newsfeed in newsfeeds], [t.id for t in tweets])
+        self.assertEqual(newsfeeds[0].user_id, user.id)
+        newsfeeds = table.scan(user.id, limit=3, reverse=True)
+        self.assertEqual([newsfeed.tweet_id for newsfeed in newsfeeds], [t.id for t in tweets[:0:-1]])
+
+        # start is inclusive, stop exclusive, both in the scan direction
+        keys = [(newsfeed.created_at, newsfeed.tweet_id) for newsfeed in table.scan(user.id)]
+        newsfeeds = table.scan(user.id, start=keys[1], stop=keys[3])
+        self.assertEqual([newsfeed.tweet_id for newsfeed in newsfeeds], [t.id for t in tweets[1:3]])
+        newsfeeds = table.scan(user.id, start=keys[3], stop=keys[1], reverse=True)
+        self.assertEqual([newsfeed.tweet_id for newsfeed in newsfeeds], [tweets[3].id, tweets[2].id])
+        self.assertEqual(table.scan(user.id + 1), [])
+
+        table.delete(user.id, [tweets[0].id, tweets[2].id])
+        newsfeeds = table.scan(user.id)
+        self.assertEqual([newsfeed.tweet_id for newsfeed in newsfeeds], [tweets[1].id, tweets[3].id])
+
+        # the deleted cells are returned
+        deleted = table.delete_from_rows([user.id, user.id + 1], tweets[1].id)
+        self.assertEqual(
+            [(newsfeed.id, newsfeed.user_id, newsfeed.tweet_id) for newsfeed in deleted],
+            [(newsfeeds[0].id, user.id, tweets[1].id)],
+        )
+        self.assertEqual([newsfeed.tweet_id for newsfeed in table.scan(user.id)], [tweets[3].id])
+
+    def test_orm_backend(self):
+        self.check_table(NEWSFEED_TABLE)
+
+    @override_settings(STORAGE_BACKENDS={'newsfeeds': 'utils.storage.SQLiteBackend'})
+    def test_sqlite_backend(self):
+        self.check_table(NEWSFEED_TABLE)
+        self.assertEqual(NewsFeed.objects.count(), 0)
+
+
+class FastRenderingTests(TestCase):
+
+    def setUp(self):
+        self.user1 = self.create_user('user1')
+        self.user2 = self.create_user('user2')
+        Friendship.objects.create(from_user=self.user2, to_user=self.user1)
+        tweet = self.create_tweet(self.user1, 'caf\xe9 \U0001f600 "quoted" \u2028 line')
+        self.create_tweet(self.user1)
+        self.create_comment(self.user2, tweet)
+        NewsFeed.objects.create(user=self.user2, tweet=tweet)
+
+    def check_rendering(self, serializer_class, instances):
+        request = APIRequestFactory().get('/')
+        request.user = self.user2
+        fast = serializer_class(instances, many=True, context={'request': request}).data
+        regular = BatchLoadListSerializer(
+            child=serializer_class(),
+            instance=instances,
+            context={'request': request},
+        ).data
+        self.assertEqual(fast, regular)
+        self.assertEqual(
+            FastJSONRenderer().render(fast),
+            JSONRenderer().render(regular),
+        )
+
+    def test_same_output(self):
+        self.check_rendering(TweetSerializer, Tweet.objects.all())
+        self.check_rendering(NewsFeedSerializer, NewsFeed.objects.all())
+        self.check_rendering(CommentSerializer, Comment.objects.all())
+        self.check_rendering(FollowerSerializer, Friendship.objects.all())
+
+    def test_renderer_escaping(self):
+        data = {'content': '\u2028\u2029 caf\xe9 </script>', 'count': 1, 'none': None}
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+
+@override_settings(METRICS_SINKS=['utils.metrics.MemorySink'])
+class MetricsMiddlewareTests(TestCase):
+
+    def setUp(self):
+        self.user1 = self.create_user('user1')
+        for i in range(3):
+            self.create_tweet(self.user1)
+        self.sink = get_sinks()[0]
+
+    def get_view_metrics(self, view):
+        return self.sink.snapshot()['views'].get(view)
+
+    def test_record(self):
+        before = self.get_view_metrics('TweetViewSet.list')
+        count = before['queries']['count'] if before else 0
+        response = self.anonymous_client.get(TWEET_LIST_API, {'user_id': self.user1.id})
+        self.assertEqual(response.status_code, 200)
+        metrics = self.get_view_metrics('TweetViewSet.list')
+        self.assertEqual(metrics['queries']['count'], count + 1)
+        self.assertGreater(metrics['queries']['max'], 0)
+        self.assertGreater(metrics['serializer_time']['sum'], 0)
+        self.assertGreater(metrics['render_time']['sum'], 0)
+        self.assertGreaterEqual(
+            metrics['total_time']['max'],
+            metrics['db_time']['max'],
+        )
+
+    def test_record_write_action(self):
+        client = APIClient()
+        client.force_authenticate(self.user1)
+        response = client.post(TWEET_LIST_API, {'content': 'timed tweet'})
+        self.assertEqual(response.status_code, 201)
+        metrics = self.get_view_metrics('TweetViewSet.create')
+        self.assertGreater(metrics['serializer_time']['sum'], 0)
+
+    @override_settings(METRICS_QUERY_BUDGET=0, METRICS_OVER_BUDGET_SAMPLE_RATE=1)
+    def test_over_budget_sample(self):
+        self.anonymous_client.get(TWEET_LIST_API, {'user_id': self.user1.id})
+        sample = self.sink.snapshot()['samples'][-1]
+        self.assertEqual(sample['view'], 'TweetViewSet.list')
+        self.assertEqual(len(sample['sql']), sample['values']['queries'])
+        self.assertIn('tweets_tweet', ' '.join(sample['sql']))
+
+    @override_settings(METRICS_QUERY_BUDGETS={'TweetViewSet.list': 100}, METRICS_QUERY_BUDGET=0)
+    def test_view_budget(self):
+        samples = len(self.sink.snapshot()['samples'])
+        self.anonymous_client.get(TWEET_LIST_API, {'user_id': self.user1.id})
+        self.assertEqual(len(self.sink.snapshot()['samples']), samples)
+
+    def test_metrics_view(self):
+        response = self.anonymous_client.get('/admin/metrics/')
+        self.assertEqual(response.status_code, 403)
+        admin = self.create_user('admin')
+        admin.is_staff = True
+        admin.save()
+        admin_client = APIClient()
+        admin_client.force_authenticate(admin)
+        admin_client.get(TWEET_LIST_API, {'user_id': self.user1.id})
+        response = admin_client.get('/admin/metrics/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('TweetViewSet.list', response.data['views'])
+
+    def test_statsd_sink(self):
+        server = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        server.bind(('127.0.0.1', 0))
+        server.settimeout(1)
+        try:
+            with self.settings(METRICS_STATSD_PORT=server.getsockname()[1]):
+                StatsdSink().record('TweetViewSet.list', {
+                    'queries': 3,
+                    'db_time': 0.002,
+                    'serializer_time': 0.001,
+                    'render_time': 0.001,
+                    'total_time': 0.005,
+                })
+            lines = server.recv(4096).decode().split('\n')
+        finally:
+            server.close()
+        self.assertIn('twitter.TweetViewSet.list.queries:3.000|ms', lines)
+        self.assertIn('twitter.TweetViewSet.list.db_time:2.000|ms', lines)
+
+
+class ThreadPoolTaskBackendTests(TestCase):
+
+    def test_pending_tasks_run_at_exit(self):
+        backend = ThreadPoolTaskBackend()
+        calls = []
+        backend._start_timer(3600, calls.append, ('flush',), {})
+        # run by the atexit handler
+        backend.run_pending()
+        self.assertEqual(calls, ['flush'])
+        # the timer finds nothing left to submit
+        backend._submit_pending(0)
+        self.assertEqual(calls, ['flush'])
+        backend.executor.shutdown()
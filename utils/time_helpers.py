@@ -1,4 +1,4 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 import pytz
 
 
@@ -9,3 +9,14 @@ def utc_now():
 def hours_to_now(self):
     return (utc_now() - self.created_at).second // 3600
 
+
+EPOCH = datetime(1970, 1, 1, tzinfo=pytz.utc)
+
+
+def datetime_to_microseconds(value):
+    # exact integer, unlike value.timestamp() which goes through a float
+    return (value - EPOCH) // timedelta(microseconds=1)
+
+
+def microseconds_to_datetime(value):
+    return EPOCH + timedelta(microseconds=value)